@@ -4,10 +4,7 @@ Automated Live Stream Refresh System
 Provides multiple ways to refresh and monitor live streams continuously
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import re
 import time
 import schedule
 import threading
@@ -15,67 +12,80 @@ from datetime import datetime, timedelta
 import argparse
 import os
 
+from daemon_control import (DEFAULT_LOCK_FILE, DEFAULT_SOCKET, DaemonLock, SweepControl,
+                            start_control_server, stop_control_server)
+from detectors import watch_url
+from feed_precheck import FeedPrecheck
+from scan_engine import ScanEngine
+from stream_record import LiveStream, streams_to_dicts
+from sweep_checkpoint import DEFAULT_FRESHNESS_MINUTES, SweepCheckpoint
+from scan_metrics import start_metrics_server
+from scan_profiler import DEFAULT_PROFILE_DIR, SweepProfiler
+from scan_trace import TRACER, traced
+from scan_transport import format_connection_stats
+from spike_detector import SpikeDetector, format_event, record_events
+from stream_identity import dedupe_streams, group_by_title
+from viewer_rollups import ViewerRollups, format_duration
+
 class AutoRefreshLiveStreamScanner:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-        })
+    def __init__(self, engine=None, concurrency=1):
+        self.engine = engine or ScanEngine()
+        self.concurrency = concurrency
+        self.network_list_file = 'network_list.txt'
+        self.video_delay = 0.3  # Faster between videos for refresh
+        self.network_delay = 1  # Brief delay between networks
+        self.checkpoint_file = 'refresh_checkpoint.jsonl'
+        self.freshness_minutes = DEFAULT_FRESHNESS_MINUTES
+        self.resume = False  # Pick up an interrupted sweep on the next scan
+        self.checkpoint = None
+        self.session = self.engine.session
         self.latest_results = []
+        self.network_streams = []  # Every network's own streams from the last sweep, before deduplication
         self.scan_count = 0
         self.start_time = datetime.now()
+        self.profiler = SweepProfiler()
+        self.mode = 'single'
+        self.control = None  # SweepControl while running as a daemon
+        self.sweeping = False
+        self.last_sweep = None
+        self.rollups = ViewerRollups()
+        self.spikes = SpikeDetector()
+        self.rescan_delay = 0  # Seconds between a spike and the re-scan of its network
+        self.group_titles = False  # Record groups of streams with near-identical titles
+        self.feed_precheck = None  # FeedPrecheck: skip channels whose feed shows no change
         
     def parse_network_list(self, filename):
         """Parse the network list file to extract channel URLs"""
-        networks = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        for i, line in enumerate(lines):
-            line = line.strip()
-            # Skip first line (header) and any empty lines
-            if i == 0 or not line:
-                continue
-            # Process lines with tab-separated values
-            if '\t' in line:
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    network_name = parts[0].strip()
-                    url = parts[1].strip()
-                    if url.startswith('https://www.youtube.com/'):
-                        networks.append((network_name, url))
-        
-        return networks
+        return self.engine.parse_network_list(filename)
     
+    @traced('channel', 'network', 'url')
     def quick_scan_network(self, network_name, channel_url, max_videos=5):
         """Quick scan of a network (fewer videos for faster refresh)"""
         try:
-            response = self.session.get(channel_url, timeout=15)
-            response.raise_for_status()
-            
-            content = response.text
-            video_ids = self._extract_video_ids(content)
+            video_ids = self.engine.run(channel_url, 'video_ids', timeout=15, require_ok=True, circuit=channel_url)
             
             live_streams = []
             videos_to_check = min(max_videos, len(video_ids))
             
+            skipped = failed = False
             for video_id in video_ids[:videos_to_check]:
+                if self.engine.circuit_open(channel_url):
+                    print(f"   ⛔ Circuit open for {network_name} - skipping its remaining videos")
+                    skipped = True
+                    break
                 video_url = f"https://www.youtube.com/watch?v={video_id}"
-                live_info = self._check_video_live_status(video_url)
+                live_info = self._check_video_live_status(video_url, channel_url)
+                failed = failed or live_info.get('error', False)
                 
                 if live_info['is_live']:
-                    live_streams.append({
-                        'video_id': video_id,
-                        'url': video_url,
-                        'title': live_info['title'],
-                        'viewers': live_info['viewers'],
-                        'network': network_name,
-                        'detected_at': datetime.now().isoformat()
-                    })
+                    live_streams.append(LiveStream.detected_now(
+                        video_id, live_info['title'], live_info['viewers'], network_name))
                 
-                time.sleep(0.3)  # Faster between videos for refresh
+                self.engine.pause(self.video_delay)
+            
+            # A channel cut short by its breaker or a failed video check is left for --resume to finish
+            if self.checkpoint and not skipped and not failed:
+                self.checkpoint.record_channel(network_name, channel_url, live_streams)
             
             return live_streams
             
@@ -83,108 +93,56 @@ class AutoRefreshLiveStreamScanner:
             print(f"   ⚠️ Error scanning {network_name}: {e}")
             return []
     
-    def _extract_video_ids(self, content):
-        """Extract video IDs from channel content"""
-        video_ids = []
-        
-        # Multiple extraction methods
-        patterns = [
-            r'/watch\?v=([a-zA-Z0-9_-]{11})',
-            r'"videoId"\s*:\s*"([a-zA-Z0-9_-]{11})"',
-            r'[?&]v=([a-zA-Z0-9_-]{11})'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, content)
-            video_ids.extend(matches)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_ids = []
-        for vid_id in video_ids:
-            if vid_id not in seen:
-                seen.add(vid_id)
-                unique_ids.append(vid_id)
-        
-        return unique_ids
-    
-    def _check_video_live_status(self, video_url):
+    @traced('video', 'url')
+    def _check_video_live_status(self, video_url, channel_url=None):
         """Check if a video is live"""
+        if self.checkpoint:
+            status = self.checkpoint.video_status(video_url)
+            if status is not None:
+                return status
         try:
-            response = self.session.get(video_url, timeout=8)
-            
-            if response.status_code != 200:
-                return {'is_live': False, 'title': 'Unavailable', 'viewers': 0}
-            
-            content = response.text
-            
-            # Extract title
-            title_match = re.search(r'"title":"([^"]+)"', content)
-            title = title_match.group(1) if title_match else "Unknown Title"
-            title = title.replace('\\u0026', '&').replace('\\"', '"')
-            
-            # Check for live indicators
-            is_live = False
-            viewers = 0
-            
-            live_patterns = [
-                r'"isLiveContent"\s*:\s*true',
-                r'"liveBroadcastDetails"\s*:',
-                r'"isLive"\s*:\s*true'
-            ]
-            
-            for pattern in live_patterns:
-                if re.search(pattern, content):
-                    is_live = True
-                    break
-            
-            # Extract viewer count
-            if is_live:
-                viewer_patterns = [
-                    r'"concurrentViewers"\s*:\s*"(\d+)"',
-                    r'(\d+(?:,\d+)*)\s+watching now'
-                ]
-                
-                for pattern in viewer_patterns:
-                    match = re.search(pattern, content, re.IGNORECASE)
-                    if match:
-                        viewers = int(match.group(1).replace(',', ''))
-                        break
-            
-            return {
-                'is_live': is_live,
-                'title': title[:150],  # Limit title length
-                'viewers': viewers
-            }
-            
+            status = self.engine.run(video_url, 'watch_status', timeout=8, circuit=channel_url)
         except Exception:
-            return {'is_live': False, 'title': 'Error', 'viewers': 0}
+            return {'is_live': False, 'title': 'Error', 'viewers': 0, 'error': True}
+        if self.checkpoint:
+            self.checkpoint.record_video(video_url, status)
+        return status
     
+    @traced('sweep', 'quick_mode')
     def perform_refresh_scan(self, quick_mode=True):
         """Perform a refresh scan of all networks"""
         print(f"\n🔄 Refresh Scan #{self.scan_count + 1} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 60)
         
-        networks = self.parse_network_list('network_list.txt')
-        all_live_streams = []
+        self.engine.begin_sweep()
+        sweep_start = time.perf_counter()
+        networks = self.parse_network_list(self.network_list_file)
         
-        max_videos = 5 if quick_mode else 15
+        # Progress is checkpointed as it happens; only the first scan may resume an interrupted one
+        self.checkpoint = SweepCheckpoint(self.checkpoint_file, 'quick' if quick_mode else 'full',
+                                          self.freshness_minutes, resume=self.resume)
+        self.resume = False
+        if self.checkpoint.resumed:
+            print(f"♻️ Resuming with {self.checkpoint.summary()}")
         
-        for i, (network_name, channel_url) in enumerate(networks):
-            print(f"[{i+1}/{len(networks)}] {network_name}...", end=" ")
-            
-            live_streams = self.quick_scan_network(network_name, channel_url, max_videos)
-            
-            if live_streams:
-                print(f"✅ {len(live_streams)} live")
-                all_live_streams.extend(live_streams)
-            else:
-                print("⚪ none")
-            
-            time.sleep(1)  # Brief delay between networks
+        max_videos = 5 if quick_mode else 15
+        if self.feed_precheck is not None:
+            all_live_streams = self._feed_checked_scan(networks, max_videos)
+        else:
+            all_live_streams = self.scan_networks(networks, max_videos)
+        # Per-network statistics see every network's streams; results list each video once
+        unique_streams, surfaced_by = dedupe_streams(all_live_streams)
         
-        self.latest_results = all_live_streams
+        self.latest_results = unique_streams
+        self.network_streams = all_live_streams
         self.scan_count += 1
+        self.rollups.observe_sweep(unique_streams, network_streams=all_live_streams)
+        self.rollups.save()
+        self._handle_spikes(self.spikes.observe_sweep(all_live_streams, [name for name, _ in networks]))
+        self.engine.metrics.observe_sweep(time.perf_counter() - sweep_start, all_live_streams,
+                                          [network_name for network_name, _ in networks],
+                                          'quick' if quick_mode else 'full')
+        print(f"🔌 {format_connection_stats(self.engine.connection_stats())}")
         
         # Save results with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -195,10 +153,11 @@ class AutoRefreshLiveStreamScanner:
                 'scan_number': self.scan_count,
                 'timestamp': datetime.now().isoformat(),
                 'scan_type': 'quick' if quick_mode else 'full',
-                'total_live_streams': len(all_live_streams),
-                'total_networks': len(networks)
+                'total_live_streams': len(unique_streams),
+                'total_networks': len(networks),
+                **self._identity_info(unique_streams, surfaced_by)
             },
-            'live_streams': all_live_streams
+            'live_streams': streams_to_dicts(unique_streams)
         }
         
         with open(filename, 'w', encoding='utf-8') as f:
@@ -208,7 +167,232 @@ class AutoRefreshLiveStreamScanner:
         with open('latest_live_streams.json', 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
         
-        self._print_refresh_summary(all_live_streams)
+        self._print_refresh_summary(unique_streams)
+        if surfaced_by:
+            shared = {}
+            for sharing in surfaced_by.values():
+                shared[', '.join(sharing)] = shared.get(', '.join(sharing), 0) + 1
+            print(f"🔗 {len(surfaced_by)} stream(s) surfaced by several networks: "
+                  + "; ".join(f"{names} ({count})" for names, count in shared.items()))
+        self.last_sweep = {
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'duration_seconds': round(time.perf_counter() - sweep_start, 3),
+            'scan_type': 'quick' if quick_mode else 'full',
+            'live_streams': len(unique_streams),
+            'total_viewers': sum(stream.viewers or 0 for stream in unique_streams),
+        }
+        
+        self.checkpoint.complete()
+        self.checkpoint = None
+        
+        return unique_streams
+    
+    def _feed_checked_scan(self, networks, max_videos):
+        """Scan only the networks whose feeds changed or are due; the rest keep their last full scan's streams"""
+        to_scan, carried = self.feed_precheck.partition(networks)
+        print(f"📰 Feed pre-check: {self.feed_precheck.summary()}")
+        by_network = dict(carried)
+        for stream in self.scan_networks(to_scan, max_videos):
+            by_network.setdefault(stream.network, []).append(stream)
+        
+        # Only channels that completed (as recorded in the checkpoint) move their feed state forward
+        for network_name, channel_url in to_scan:
+            done = self.checkpoint.channel_streams(channel_url, network_name)
+            if done is not None:
+                self.feed_precheck.record_scan(channel_url, done, self._resolve_channel_id)
+        self.feed_precheck.save()
+        return [stream for network_name, _ in networks for stream in by_network.pop(network_name, [])]
+    
+    def _resolve_channel_id(self, channel_url):
+        # The channel page was fetched by this sweep's scan, so this is served from the page cache
+        try:
+            return self.engine.run(channel_url, 'channel_id', timeout=15, require_ok=True)
+        except Exception:
+            return None
+    
+    def _identity_info(self, unique_streams, surfaced_by):
+        """scan_info entries naming the networks that share a stream, and similar-title groups if enabled"""
+        info = {}
+        if surfaced_by:
+            info['surfaced_by'] = surfaced_by
+        if self.group_titles:
+            info['title_groups'] = [[stream.video_id for stream in group] for group in group_by_title(unique_streams)]
+        return info
+    
+    def profiled_refresh_scan(self, quick_mode=True):
+        """Run a refresh scan under any profiling armed by flags or signals"""
+        self.sweeping = True
+        try:
+            return self.profiler.run_sweep(self.scan_count + 1, self.perform_refresh_scan, quick_mode=quick_mode)
+        finally:
+            self.sweeping = False
+    
+    def _handle_spikes(self, events):
+        """Log and promote detected spikes, and re-scan their networks out of cycle when running as a daemon"""
+        self.spikes.save()
+        if not events:
+            return
+        for event in events:
+            print(format_event(event))
+        record_events(events)
+        self.engine.metrics.observe_spikes(events)
+        if self.control is not None:
+            self.control.request_rescan({event['network'] for event in events}, self.rescan_delay)
+    
+    def rescan_networks(self, network_names):
+        """Out-of-cycle full scan of some networks; their streams replace those in the latest results"""
+        wanted = set(network_names)
+        network_list = self.parse_network_list(self.network_list_file)
+        networks = [(name, url) for name, url in network_list if name in wanted]
+        if not networks:
+            return []
+        print(f"\n⚡ Re-scanning {', '.join(name for name, _ in networks)}")
+        # Pages and results cached by the last sweep would only repeat its viewer counts
+        self.engine.begin_sweep()
+        rescan_start = time.perf_counter()
+        self.sweeping = True
+        try:
+            live_streams = self.scan_networks(networks, 15)
+        finally:
+            self.sweeping = False
+        
+        # Deduplicate again from every network's own streams (in list order, so the same network
+        # keeps a shared video): one the rescanned network dropped stays under the others surfacing it
+        order = {}
+        for index, (name, _) in enumerate(network_list):
+            order.setdefault(name, index)
+        kept = [stream for stream in self.network_streams if stream.network not in wanted]
+        self.network_streams = sorted(kept + live_streams, key=lambda stream: order.get(stream.network, len(order)))
+        self.latest_results, surfaced_by = dedupe_streams(self.network_streams)
+        self.rollups.observe_sweep(dedupe_streams(live_streams)[0], network_streams=live_streams)
+        self.rollups.save()
+        # A re-scan follows a spike, so it is scored but kept out of the baseline
+        self._handle_spikes(self.spikes.observe_sweep(live_streams, [name for name, _ in networks],
+                                                      update_baseline=False))
+        self.engine.metrics.observe_sweep(time.perf_counter() - rescan_start, self.network_streams,
+                                          [name for name, _ in network_list], 'rescan')
+        
+        results = {
+            'scan_info': {
+                'scan_number': self.scan_count,
+                'timestamp': datetime.now().isoformat(),
+                'scan_type': 'rescan',
+                'rescanned_networks': [name for name, _ in networks],
+                'total_live_streams': len(self.latest_results),
+                **self._identity_info(self.latest_results, surfaced_by)
+            },
+            'live_streams': streams_to_dicts(self.latest_results)
+        }
+        with open('latest_live_streams.json', 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        return live_streams
+    
+    def _wait_for_next_sweep(self, since):
+        """Wait for the next sweep, running any spike re-scans that fall due meanwhile"""
+        while True:
+            reason = self.control.wait_for_next_sweep(since)
+            if reason != 'rescan':
+                return reason
+            self.rescan_networks(self.control.due_rescans())
+    
+    def scan_networks(self, networks, max_videos=5):
+        """Live streams for the given (network name, channel URL) pairs, pipelined when concurrency > 1"""
+        if self.concurrency > 1:
+            return self._pipelined_refresh(networks, max_videos)
+        return self._sequential_refresh(networks, max_videos)
+    
+    def _sequential_refresh(self, networks, max_videos):
+        """Scan networks one at a time with polite delays"""
+        all_live_streams = []
+        
+        for i, (network_name, channel_url) in enumerate(networks):
+            print(f"[{i+1}/{len(networks)}] {network_name}...", end=" ")
+            
+            done = self.checkpoint.channel_streams(channel_url, network_name) if self.checkpoint else None
+            if done is not None:
+                print(f"♻️ {len(done)} live (checkpoint)")
+                all_live_streams.extend(done)
+                continue
+            
+            live_streams = self.quick_scan_network(network_name, channel_url, max_videos)
+            
+            if live_streams:
+                print(f"✅ {len(live_streams)} live")
+                all_live_streams.extend(live_streams)
+            else:
+                print("⚪ none")
+            
+            self.engine.pause(self.network_delay)
+        
+        return all_live_streams
+    
+    def _pipelined_refresh(self, networks, max_videos):
+        """Scan all networks concurrently: channel pages first, then their watch pages"""
+        by_network = {network_name: [] for network_name, _ in networks}
+        
+        pending = []
+        for network_name, channel_url in networks:
+            done = self.checkpoint.channel_streams(channel_url, network_name) if self.checkpoint else None
+            if done is not None:
+                by_network[network_name] = done
+            else:
+                pending.append((network_name, channel_url))
+        
+        channel_results = self.engine.analyze_many(
+            [(channel_url, ['video_ids'], 15, True) for _, channel_url in pending],
+            concurrency=self.concurrency)
+        
+        completed = []
+        candidates = []
+        for (network_name, channel_url), result in zip(pending, channel_results):
+            if isinstance(result, Exception):
+                print(f"   ⚠️ Error scanning {network_name}: {result}")
+                continue
+            completed.append((network_name, channel_url))
+            for video_id in result['video_ids'][:max_videos]:
+                candidates.append((network_name, video_id))
+        
+        statuses = {}
+        to_fetch = []
+        for network_name, video_id in candidates:
+            if video_id in statuses or video_id in to_fetch:
+                continue  # Surfaced by another network too; verify it once
+            status = self.checkpoint.video_status(watch_url(video_id)) if self.checkpoint else None
+            if status is not None:
+                statuses[video_id] = status
+            else:
+                to_fetch.append(video_id)
+        
+        watch_results = self.engine.analyze_many(
+            [(watch_url(video_id), ['watch_status'], 8, False) for video_id in to_fetch],
+            concurrency=self.concurrency)
+        
+        failed = set()
+        for video_id, result in zip(to_fetch, watch_results):
+            if isinstance(result, Exception):
+                failed.add(video_id)
+                continue
+            statuses[video_id] = result['watch_status']
+            if self.checkpoint:
+                self.checkpoint.record_video(watch_url(video_id), result['watch_status'])
+        
+        for network_name, video_id in candidates:
+            live_info = statuses.get(video_id)
+            if live_info and live_info['is_live']:
+                by_network[network_name].append(LiveStream.detected_now(
+                    video_id, live_info['title'], live_info['viewers'], network_name))
+        
+        if self.checkpoint:
+            incomplete = {network_name for network_name, video_id in candidates if video_id in failed}
+            for network_name, channel_url in completed:
+                if network_name not in incomplete:
+                    self.checkpoint.record_channel(network_name, channel_url, by_network[network_name])
+        
+        all_live_streams = []
+        for i, (network_name, streams) in enumerate(by_network.items()):
+            status = f"✅ {len(streams)} live" if streams else "⚪ none"
+            print(f"[{i+1}/{len(by_network)}] {network_name}... {status}")
+            all_live_streams.extend(streams)
         
         return all_live_streams
     
@@ -223,50 +407,62 @@ class AutoRefreshLiveStreamScanner:
         # Group by network
         by_network = {}
         for stream in live_streams:
-            network = stream['network']
+            network = stream.network
             if network not in by_network:
                 by_network[network] = []
             by_network[network].append(stream)
         
         print(f"📊 Networks with live content: {len(by_network)}")
         for network, streams in by_network.items():
-            total_viewers = sum(s['viewers'] for s in streams)
+            total_viewers = sum(s.viewers for s in streams)
             print(f"   • {network}: {len(streams)} stream(s) ({total_viewers:,} viewers)")
         
         # Top streams
-        sorted_streams = sorted(live_streams, key=lambda x: x['viewers'], reverse=True)
+        sorted_streams = sorted(live_streams, key=lambda x: x.viewers, reverse=True)
         print(f"\n🔴 Top 5 live streams:")
         for i, stream in enumerate(sorted_streams[:5], 1):
-            print(f"   {i}. {stream['network']}: {stream['viewers']:,} viewers")
+            print(f"   {i}. {stream.network}: {stream.viewers:,} viewers")
     
     def continuous_monitoring(self, interval_minutes=15):
         """Run continuous monitoring with specified interval"""
         print(f"🚀 Starting continuous monitoring (every {interval_minutes} minutes)")
         print("Press Ctrl+C to stop")
+        self.mode = 'continuous'
+        if self.control is None:
+            self.control = SweepControl(interval_minutes * 60)
+        self.control.set_interval(interval_minutes * 60)
+        self.engine.metrics.sweep_interval.set(interval_minutes * 60)
+        self._announce_profiling()
         
         try:
             while True:
-                self.perform_refresh_scan(quick_mode=True)
+                self.profiled_refresh_scan(quick_mode=True)
                 
-                print(f"\n⏰ Next scan in {interval_minutes} minutes...")
+                print(f"\n⏰ Next scan in {self.control.interval_seconds / 60:g} minutes...")
                 print(f"📊 Total scans completed: {self.scan_count}")
                 print(f"🕐 Running since: {self.start_time.strftime('%H:%M:%S')}")
                 
-                time.sleep(interval_minutes * 60)
+                # Waits out the interval, but wakes for control commands (trigger, pause, stop) and re-scans
+                reason = self._wait_for_next_sweep(time.time())
+                if reason == 'stop':
+                    break
+                if reason == 'triggered':
+                    print("▶️ Sweep triggered via control socket")
                 
         except KeyboardInterrupt:
-            print(f"\n🛑 Monitoring stopped after {self.scan_count} scans")
-            print(f"📊 Total runtime: {datetime.now() - self.start_time}")
+            pass
+        print(f"\n🛑 Monitoring stopped after {self.scan_count} scans")
+        print(f"📊 Total runtime: {datetime.now() - self.start_time}")
     
     def scheduled_monitoring(self):
         """Set up scheduled monitoring at specific times"""
         print("📅 Setting up scheduled monitoring...")
         
         # Schedule scans every 15 minutes during peak hours
-        schedule.every(15).minutes.do(lambda: self.perform_refresh_scan(quick_mode=True))
+        schedule.every(15).minutes.do(lambda: self.profiled_refresh_scan(quick_mode=True))
         
         # Schedule full scans every 2 hours
-        schedule.every(2).hours.do(lambda: self.perform_refresh_scan(quick_mode=False))
+        schedule.every(2).hours.do(lambda: self.profiled_refresh_scan(quick_mode=False))
         
         # Schedule daily summary at midnight
         schedule.every().day.at("00:00").do(self.daily_summary)
@@ -276,13 +472,91 @@ class AutoRefreshLiveStreamScanner:
         print("   • Full scan: Every 2 hours") 
         print("   • Daily summary: Midnight")
         print("\nPress Ctrl+C to stop scheduled monitoring")
+        self.mode = 'scheduled'
+        if self.control is None:
+            self.control = SweepControl(15 * 60)
+        self.engine.metrics.sweep_interval.set(15 * 60)
+        self._announce_profiling()
         
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+            while not self.control.stopping:
+                if not self.control.paused:
+                    schedule.run_pending()
+                # Check every minute; a triggered sweep runs straight away
+                if self.control.sleep(60):
+                    print("▶️ Sweep triggered via control socket")
+                    self.profiled_refresh_scan(quick_mode=True)
+                if not self.control.paused:
+                    due = self.control.due_rescans()
+                    if due:
+                        self.rescan_networks(due)
         except KeyboardInterrupt:
-            print("\n🛑 Scheduled monitoring stopped")
+            pass
+        print("\n🛑 Scheduled monitoring stopped")
+    
+    def control_handlers(self):
+        """Commands answered over the control socket, from in-memory state"""
+        def status():
+            state = 'sweeping' if self.sweeping else 'paused' if self.control.paused else 'waiting'
+            next_at = self.control.next_sweep_at
+            return {
+                'pid': os.getpid(),
+                'mode': self.mode,
+                'state': state,
+                'started_at': self.start_time.isoformat(timespec='seconds'),
+                'scan_count': self.scan_count,
+                'interval_seconds': self.control.interval_seconds,
+                'next_sweep_in': None if next_at is None else max(next_at - time.time(), 0),
+                'last_sweep': self.last_sweep,
+            }
+        
+        def trigger():
+            self.control.trigger()
+            return 'sweep queued' if self.sweeping else 'sweep starting'
+        
+        def rescan(network):
+            known = {name for name, _ in self.parse_network_list(self.network_list_file)}
+            if network not in known:
+                raise ValueError(f"unknown network {network!r}")
+            self.control.request_rescan([network])
+            return f"re-scan of {network} queued"
+        
+        def pause():
+            self.control.pause()
+            return 'paused after the current sweep' if self.sweeping else 'paused'
+        
+        def resume():
+            self.control.resume()
+            return 'resumed'
+        
+        def interval(minutes):
+            self.control.set_interval(minutes * 60)
+            self.engine.metrics.sweep_interval.set(minutes * 60)
+            return f"interval set to {minutes:g} minutes"
+        
+        def stats():
+            top = sorted(self.latest_results, key=lambda stream: stream.viewers or 0, reverse=True)[:10]
+            return {
+                'status': status(),
+                'engine': dict(self.engine.stats),
+                'fetcher': dict(self.engine.fetcher.stats),
+                'open_breakers': self.engine.fetcher.open_breakers(),
+                'connections': self.engine.connection_stats(),
+                'top_streams': streams_to_dicts(top),
+            }
+        
+        def stop():
+            self.control.stop()
+            return 'stopping after the current sweep' if self.sweeping else 'stopping'
+        
+        return {'status': status, 'trigger': trigger, 'rescan': rescan, 'pause': pause, 'resume': resume,
+                'interval': interval, 'stats': stats, 'stop': stop}
+    
+    def _announce_profiling(self):
+        """Enable the profiling signals for a long-running daemon"""
+        if self.profiler.install_signal_handlers():
+            print(f"🔬 Profiling: kill -USR1 {os.getpid()} (CPU, next {self.profiler.signal_sweeps} sweep(s)), "
+                  f"kill -USR2 {os.getpid()} (toggle memory diffs) → {self.profiler.output_dir}/")
     
     def daily_summary(self):
         """Generate a daily summary report"""
@@ -292,9 +566,17 @@ class AutoRefreshLiveStreamScanner:
         print(f"Total scans today: {self.scan_count}")
         
         if self.latest_results:
-            total_viewers = sum(s['viewers'] for s in self.latest_results)
+            total_viewers = sum(s.viewers for s in self.latest_results)
             print(f"Current live streams: {len(self.latest_results)}")
             print(f"Total viewers: {total_viewers:,}")
+        
+        # Runs at midnight, so report the day that just ended
+        day = self.rollups.top('network', 'day', at=time.time() - 60, limit=None)
+        if day:
+            print("Peak viewers by network:")
+            for network, rollup in day:
+                print(f"   • {network}: peak {rollup.max:,}, average {rollup.mean:,.0f}, "
+                      f"live {format_duration(rollup.uptime)}")
     
     def compare_with_previous(self, previous_file='latest_live_streams.json'):
         """Compare current results with previous scan"""
@@ -320,7 +602,7 @@ class AutoRefreshLiveStreamScanner:
             
             # Find new and ended streams
             prev_video_ids = set(s['video_id'] for s in previous_streams)
-            curr_video_ids = set(s['video_id'] for s in current_streams)
+            curr_video_ids = set(s.video_id for s in current_streams)
             
             new_streams = curr_video_ids - prev_video_ids
             ended_streams = prev_video_ids - curr_video_ids
@@ -341,21 +623,107 @@ def main():
                        help='Interval in minutes for continuous mode')
     parser.add_argument('--quick', action='store_true', 
                        help='Use quick scan (fewer videos per channel)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                       help='Pages fetched in parallel (1 = sequential with polite delays)')
+    parser.add_argument('--workers', type=int, default=0,
+                       help='Worker processes for page parsing (0 = parse in-process)')
+    
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted sweep from its checkpoint')
+    parser.add_argument('--freshness', type=float, default=DEFAULT_FRESHNESS_MINUTES,
+                       help='Minutes a checkpointed result stays valid when resuming')
+    parser.add_argument('--memory-budget-mb', type=float,
+                       help='Cap on page bytes held in memory; concurrent fetches wait for room')
+    parser.add_argument('--network-list', default='network_list.txt',
+                       help='Network list file to scan')
+    parser.add_argument('--base-url',
+                       help='Fetch from this host instead of YouTube (e.g. the stand-in server)')
+    parser.add_argument('--http2', action='store_true',
+                       help='Multiplex requests over HTTP/2 (needs httpx[http2]; also SCANNER_HTTP2=1)')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                       help='Serve Prometheus metrics on this port (0 = disabled)')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                       help='Interface for the metrics server (0.0.0.0 = every interface)')
+    parser.add_argument('--lock-file', default=DEFAULT_LOCK_FILE,
+                       help='Lock file that keeps a second monitor from starting')
+    parser.add_argument('--control-socket', default=DEFAULT_SOCKET,
+                       help='Unix socket for daemon_control.py (status, trigger, pause, interval, stats, stop)')
+    parser.add_argument('--spike-rescan-delay', type=float, default=0,
+                       help='Seconds after a viewer spike before its network is re-scanned')
+    parser.add_argument('--group-titles', action='store_true',
+                       help='Record groups of streams with near-identical titles in the results')
+    parser.add_argument('--feed-precheck', action='store_true',
+                       help='Poll channel feeds first and fully scan only channels that changed (see feed_precheck.py)')
+    parser.add_argument('--feed-max-age', type=float, default=60,
+                       help='Minutes before a channel with an unchanged feed is fully scanned anyway')
+    parser.add_argument('--trace',
+                       help='Append per-request trace spans to this JSONL file (see scan_trace.py)')
+    parser.add_argument('--profile-sweeps', type=int, default=0,
+                       help='Profile the first N sweeps (SIGUSR1 profiles more while running)')
+    parser.add_argument('--profile-mode', choices=['cprofile', 'sample'], default='cprofile',
+                       help='cProfile (main thread, exact) or a stack sampler (all threads, low overhead)')
+    parser.add_argument('--tracemalloc', action='store_true',
+                       help='Write tracemalloc diffs between sweeps (SIGUSR2 toggles while running)')
+    parser.add_argument('--profile-dir', default=DEFAULT_PROFILE_DIR,
+                       help='Directory for timestamped profile and memory files')
     
     args = parser.parse_args()
     
-    scanner = AutoRefreshLiveStreamScanner()
+    if args.trace:
+        TRACER.open(args.trace)
+    
+    memory_budget = int(args.memory_budget_mb * 1024 * 1024) if args.memory_budget_mb else None
+    engine = ScanEngine(workers=args.workers, fetch_threads=max(args.concurrency, 1),
+                        base_url=args.base_url, memory_budget=memory_budget, http2=args.http2 or None)
+    scanner = AutoRefreshLiveStreamScanner(engine, concurrency=args.concurrency)
+    scanner.network_list_file = args.network_list
+    scanner.resume = args.resume
+    scanner.freshness_minutes = args.freshness
+    scanner.rescan_delay = args.spike_rescan_delay
+    scanner.group_titles = args.group_titles
+    if args.feed_precheck:
+        scanner.feed_precheck = FeedPrecheck(engine, max_age_seconds=args.feed_max_age * 60,
+                                             concurrency=max(args.concurrency, 1),
+                                             network_list=args.network_list)
+    scanner.profiler = SweepProfiler(args.profile_dir, mode=args.profile_mode)
+    scanner.profiler.signal_sweeps = max(args.profile_sweeps, 1)
+    scanner.profiler.request_cpu(args.profile_sweeps)
+    if args.tracemalloc:
+        scanner.profiler.request_memory(True)
+    
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port, args.metrics_host, metrics=engine.metrics)
+        print(f"📈 Metrics at http://{args.metrics_host}:{args.metrics_port}/metrics")
     
     if args.mode == 'single':
         print("🔄 Single Refresh Scan")
-        scanner.perform_refresh_scan(quick_mode=args.quick)
+        scanner.profiled_refresh_scan(quick_mode=args.quick)
         scanner.compare_with_previous()
-        
-    elif args.mode == 'continuous':
-        scanner.continuous_monitoring(interval_minutes=args.interval)
-        
-    elif args.mode == 'scheduled':
-        scanner.scheduled_monitoring()
+        engine.close()
+        return
+    
+    # Only one monitor may sweep at a time
+    lock = DaemonLock(args.lock_file)
+    if not lock.acquire():
+        holder = lock.holder() or {}
+        print(f"❌ A monitor is already running (PID {holder.get('pid', '?')}, since {holder.get('started_at', '?')})")
+        print("   Use daemon_control.py status|trigger|pause|interval|stop to manage it")
+        engine.close()
+        raise SystemExit(1)
+    
+    scanner.control = SweepControl(args.interval * 60)
+    control_server = start_control_server(args.control_socket, scanner.control_handlers())
+    print(f"🎛️ Control socket: {args.control_socket} (python3 daemon_control.py status)")
+    
+    try:
+        if args.mode == 'continuous':
+            scanner.continuous_monitoring(interval_minutes=args.interval)
+        elif args.mode == 'scheduled':
+            scanner.scheduled_monitoring()
+    finally:
+        stop_control_server(control_server)
+        lock.release()
+        engine.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Scanner Benchmark Suite
+Times the scanner hot paths and a full sweep against the offline fixture corpus, with JSON output for comparing runs
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+from auto_refresh_scanner import AutoRefreshLiveStreamScanner
+from detectors import detect_live_badge_streams, detect_live_in_initial_data, detect_video_ids
+from fixture_corpus import DEFAULT_FIXTURE_DIR, FixtureCorpus, FixtureSession
+from precise_live_scanner import PreciseLiveStreamScanner
+from scan_engine import PageModel, ScanEngine
+
+
+class BenchmarkContext:
+    """Fixture-backed engine and scanners shared by all benchmarks"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.engine = ScanEngine(session=FixtureSession(corpus))
+        self.auto = AutoRefreshLiveStreamScanner(self.engine)
+        self.auto.video_delay = 0
+        self.auto.network_delay = 0
+        self.precise = PreciseLiveStreamScanner(self.engine)
+
+    def page(self, url):
+        status_code, raw = self.corpus.load(url)
+        return PageModel(url, raw, status_code)
+
+
+def bench_extract_video_ids(ctx, url):
+    return detect_video_ids(ctx.page(url))
+
+
+def bench_find_live_streams_in_json(ctx, url):
+    return detect_live_in_initial_data(ctx.page(url))
+
+
+def bench_find_live_badge_streams(ctx, url):
+    return detect_live_badge_streams(ctx.page(url))
+
+
+def bench_verify_stream_is_live(ctx, url):
+    ctx.engine.begin_sweep()
+    return ctx.precise._verify_stream_is_live({'title': url, 'url': url})
+
+
+def bench_check_video_live_status(ctx, url):
+    ctx.engine.begin_sweep()
+    return ctx.auto._check_video_live_status(url)
+
+
+# Hot path name -> (page kinds it runs on, benchmark function)
+HOT_PATHS = {
+    '_extract_video_ids': (('channel', 'streams'), bench_extract_video_ids),
+    '_find_live_streams_in_json': (('channel', 'streams'), bench_find_live_streams_in_json),
+    '_find_live_badge_streams': (('channel', 'streams'), bench_find_live_badge_streams),
+    '_verify_stream_is_live': (('watch',), bench_verify_stream_is_live),
+    '_check_video_live_status': (('watch',), bench_check_video_live_status),
+}
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_function(ctx, func, urls, repeat):
+    """Wall-clock timings over `repeat` passes plus a separate traced pass for allocations"""
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for url in urls:
+                start = time.perf_counter()
+                func(ctx, url)
+                samples.append(time.perf_counter() - start)
+
+        peaks = []
+        tracemalloc.start()
+        try:
+            for url in urls:
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                func(ctx, url)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - baseline)
+        finally:
+            tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'calls': len(samples),
+        'pages': len(urls),
+        'total_s': round(sum(samples), 6),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+        'peak_alloc_kb_mean': round(statistics.mean(peaks) / 1024, 1),
+        'peak_alloc_kb_max': round(max(peaks) / 1024, 1),
+    }
+
+
+def measure_sweep(ctx, repeat, max_videos):
+    """End-to-end sweep over the recorded networks with delays disabled"""
+    networks = [tuple(network) for network in ctx.corpus.manifest.get('networks', [])]
+    durations = []
+    live_found = 0
+    fetches_before = ctx.engine.stats['fetches']
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            ctx.engine.begin_sweep()
+            start = time.perf_counter()
+            live_found = len(ctx.auto._sequential_refresh(networks, max_videos))
+            durations.append(time.perf_counter() - start)
+
+    return {
+        'networks': len(networks),
+        'runs': repeat,
+        'best_s': round(min(durations), 4),
+        'mean_s': round(statistics.mean(durations), 4),
+        'pages_fetched': (ctx.engine.stats['fetches'] - fetches_before) // max(repeat, 1),
+        'live_streams': live_found,
+    }
+
+
+def run_benchmarks(corpus, repeat=5, only=None, max_videos=5):
+    ctx = BenchmarkContext(corpus)
+    functions = {}
+
+    for name, (kinds, func) in HOT_PATHS.items():
+        if only and name not in only:
+            continue
+
+        urls = [url for kind in kinds for url in corpus.urls(kind)]
+        if not urls:
+            print(f"   ⚪ {name}: no {'/'.join(kinds)} fixtures")
+            continue
+
+        functions[name] = measure_function(ctx, func, urls, repeat)
+        result = functions[name]
+        print(f"   ⏱️ {name}: {result['mean_ms']:.2f} ms mean, {result['p95_ms']:.2f} ms p95, "
+              f"{result['peak_alloc_kb_max']:,.0f} KB peak ({result['pages']} pages)")
+
+    sweep = None
+    if not only or 'sweep' in only:
+        sweep = measure_sweep(ctx, repeat, max_videos)
+        print(f"   🔄 sweep: {sweep['best_s']:.3f} s best over {sweep['networks']} networks "
+              f"({sweep['pages_fetched']} pages, {sweep['live_streams']} live)")
+
+    return {
+        'benchmark': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'corpus': {
+                'recorded_at': corpus.manifest.get('recorded_at'),
+                'pages': len(corpus),
+            },
+        },
+        'functions': functions,
+        'sweep': sweep,
+    }
+
+
+def print_comparison(baseline, current):
+    """Print mean-time and allocation deltas against an earlier run"""
+    print(f"\n📈 Compared with run from {baseline['benchmark']['timestamp']}:")
+
+    for name, result in current['functions'].items():
+        before = baseline.get('functions', {}).get(name)
+        if not before:
+            print(f"   • {name}: new")
+            continue
+        change = (result['mean_ms'] - before['mean_ms']) / before['mean_ms'] * 100 if before['mean_ms'] else 0
+        print(f"   • {name}: {before['mean_ms']:.2f} → {result['mean_ms']:.2f} ms ({change:+.1f}%), "
+              f"peak {before['peak_alloc_kb_max']:,.0f} → {result['peak_alloc_kb_max']:,.0f} KB")
+
+    if current.get('sweep') and baseline.get('sweep'):
+        before, after = baseline['sweep']['best_s'], current['sweep']['best_s']
+        change = (after - before) / before * 100 if before else 0
+        print(f"   • sweep: {before:.3f} → {after:.3f} s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scanner Benchmark Suite')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURE_DIR, help='Fixture corpus directory')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes per benchmark')
+    parser.add_argument('--only', help='Comma-separated hot paths to run (add "sweep" for the sweep)')
+    parser.add_argument('--max-videos', type=int, default=5, help='Videos checked per network in the sweep')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+
+    args = parser.parse_args()
+
+    corpus = FixtureCorpus(args.fixtures)
+    if not len(corpus):
+        print(f"❌ No fixtures in {args.fixtures}/ - run: python3 fixture_corpus.py record")
+        return
+
+    only = set(name.strip() for name in args.only.split(',')) if args.only else None
+
+    print("🏁 Scanner Benchmark Suite")
+    print("=" * 60)
+    print(f"Corpus: {len(corpus)} pages recorded at {corpus.manifest.get('recorded_at')}")
+
+    results = run_benchmarks(corpus, repeat=args.repeat, only=only, max_videos=args.max_videos)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Channel ID Cache
+Durable handle-to-channel-ID resolutions with long TTLs, served stale while a background thread revalidates them
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_CACHE_FILE = 'channel_ids.json'
+DEFAULT_TTL_DAYS = 90
+DEFAULT_REVALIDATE_DAYS = 14
+# Wait before retrying a revalidation that failed
+RETRY_SECONDS = 3600
+
+DAY = 86400
+
+
+class ChannelIdCache:
+    """Channel URL -> channel ID map persisted as JSON
+
+    A handle's channel ID practically never changes, so entries are trusted for ttl_days.
+    Entries older than revalidate_days are still returned immediately; when the caller passes
+    a revalidator they are re-resolved with it on a background thread and the file is updated
+    when that finishes. Resolvers are per call, so callers sharing the cache keep their own.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_days=DEFAULT_TTL_DAYS, revalidate_days=DEFAULT_REVALIDATE_DAYS):
+        self.path = path
+        self.ttl = ttl_days * DAY
+        self.revalidate_age = revalidate_days * DAY
+        self.stats = {'hits': 0, 'misses': 0, 'resolved': 0, 'revalidated': 0, 'changed': 0}
+        self._entries = self._load()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._queue = None
+        self._pending = set()
+        self._retry_after = {}
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def get(self, channel_url, revalidator=None):
+        """Cached channel ID (None if unknown or expired); aging entries are revalidated with revalidator"""
+        entry = self._entries.get(channel_url)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        age = time.time() - entry['checked_at']
+        if age >= self.ttl:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        if age >= self.revalidate_age and revalidator is not None:
+            self._schedule_revalidation(channel_url, revalidator)
+        return entry['channel_id']
+
+    def peek(self, channel_url):
+        """Cached channel ID if unexpired, without counting a lookup or scheduling revalidation"""
+        entry = self._entries.get(channel_url)
+        if entry is None or time.time() - entry['checked_at'] >= self.ttl:
+            return None
+        return entry['channel_id']
+
+    def store(self, channel_url, channel_id, save=True):
+        with self._lock:
+            previous = self._entries.get(channel_url)
+            if previous is not None and previous['channel_id'] != channel_id:
+                self.stats['changed'] += 1
+                print(f"🆔 Channel ID changed for {channel_url}: {previous['channel_id']} -> {channel_id}")
+            self._entries[channel_url] = {'channel_id': channel_id, 'checked_at': int(time.time())}
+            self._dirty = True
+        if save:
+            self.save()
+
+    def resolve(self, channel_url, resolver, revalidator=None):
+        """Cached channel ID, or resolve (and remember) it now with resolver(channel_url)
+
+        revalidator(channel_url) re-resolves an aging entry in the background; it runs on another
+        thread, so it must not share state with the caller (default: no revalidation).
+        """
+        channel_id = self.get(channel_url, revalidator)
+        if channel_id:
+            return channel_id
+        channel_id = resolver(channel_url)
+        if channel_id:
+            self.stats['resolved'] += 1
+            self.store(channel_url, channel_id)
+        return channel_id
+
+    def _schedule_revalidation(self, channel_url, revalidator):
+        if time.time() < self._retry_after.get(channel_url, 0):
+            return
+        with self._lock:
+            if channel_url in self._pending:
+                return
+            self._pending.add(channel_url)
+            if self._queue is None:
+                self._queue = queue.Queue()
+                threading.Thread(target=self._revalidate_loop, name='channel-id-revalidate', daemon=True).start()
+        self._queue.put((channel_url, revalidator))
+
+    def _revalidate_loop(self):
+        while True:
+            channel_url, revalidator = self._queue.get()
+            try:
+                channel_id = revalidator(channel_url)
+            except Exception:
+                channel_id = None
+            if channel_id:
+                self.stats['revalidated'] += 1
+                self.store(channel_url, channel_id)
+            else:
+                # Keep serving the old ID; try again later
+                self._retry_after[channel_url] = time.time() + RETRY_SECONDS
+            with self._lock:
+                self._pending.discard(channel_url)
+            self._queue.task_done()
+
+    def wait_for_revalidation(self):
+        """Block until queued background revalidations have finished"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def entries(self):
+        return dict(self._entries)
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_id_cache(path=DEFAULT_CACHE_FILE):
+    """The shared cache for a file (one per path per process)"""
+    key = os.path.abspath(path)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = ChannelIdCache(path)
+        return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Channel ID Cache')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help='Cache file to inspect')
+
+    args = parser.parse_args()
+
+    cache = ChannelIdCache(args.cache)
+    entries = cache.entries()
+    if not entries:
+        print(f"⚪ No cached channel IDs in {args.cache}")
+        return
+
+    now = time.time()
+    for url, entry in sorted(entries.items()):
+        age_days = (now - entry['checked_at']) / DAY
+        if age_days >= cache.ttl / DAY:
+            state = 'expired'
+        elif age_days >= cache.revalidate_age / DAY:
+            state = 'revalidate'
+        else:
+            state = 'fresh'
+        print(f"{entry['channel_id']}  {age_days:6.1f}d  {state:<10}  {url}")
+    newest = max(entry['checked_at'] for entry in entries.values())
+    print(f"\n🆔 {len(entries)} channel IDs, last checked {datetime.fromtimestamp(newest).isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
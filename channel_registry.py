@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Channel Registry
+Parses the network list once into indexed channel records, hot-reloads it when the file changes and caches resolved channel IDs
+"""
+
+import argparse
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from channel_id_cache import DEFAULT_CACHE_FILE, ChannelIdCache, get_id_cache
+
+YOUTUBE_PREFIX = 'https://www.youtube.com/'
+DEFAULT_IDS_FILE = DEFAULT_CACHE_FILE
+
+
+class Channel:
+    """One network from the list: display name, channel URL, @handle and (once resolved) channel ID"""
+
+    __slots__ = ('name', 'url', 'handle', 'channel_id')
+
+    def __init__(self, name, url, channel_id=None):
+        self.name = name
+        self.url = url
+        if url.startswith(YOUTUBE_PREFIX):
+            path = url[len(YOUTUBE_PREFIX):].split('?', 1)[0].strip('/')
+        else:
+            path = urlsplit(url).path.strip('/')
+        self.handle = path.split('/')[0][1:] if path.startswith('@') else None
+        # /channel/UC... URLs carry their ID already
+        if channel_id is None and path.startswith('channel/'):
+            channel_id = path.split('/')[1]
+        self.channel_id = channel_id
+
+    def as_network(self):
+        return (self.name, self.url)
+
+    def __repr__(self):
+        return f"Channel({self.name!r}, {self.url!r}, channel_id={self.channel_id!r})"
+
+
+def _normalize(text):
+    return re.sub(r'[^a-z0-9]', '', text.casefold())
+
+
+def parse_channels(lines):
+    """Channels plus validation warnings from network list lines (first line is the header)"""
+    channels = []
+    warnings = []
+    seen_names = {}
+    seen_urls = {}
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if number == 1 or not line:
+            continue
+        if '\t' not in line:
+            warnings.append(f"line {number}: no tab between network name and URL")
+            continue
+        parts = line.split('\t')
+        name, url = parts[0].strip(), parts[1].strip()
+        if not url.startswith(YOUTUBE_PREFIX):
+            warnings.append(f"line {number}: not a YouTube channel URL: {url}")
+            continue
+        if name.casefold() in seen_names:
+            warnings.append(f"line {number}: duplicate network name {name!r} (first on line {seen_names[name.casefold()]})")
+        if url.casefold() in seen_urls:
+            warnings.append(f"line {number}: duplicate channel URL {url} (first on line {seen_urls[url.casefold()]})")
+        seen_names.setdefault(name.casefold(), number)
+        seen_urls.setdefault(url.casefold(), number)
+        channels.append(Channel(name, url))
+    return channels, warnings
+
+
+class ChannelRegistry:
+    """The network list compiled into O(1) indexes by name, @handle, channel ID and URL
+
+    refresh() re-reads the file only when its mtime or size changed, so callers can ask
+    for the networks every sweep and pick up edits without restarting.
+    """
+
+    def __init__(self, path='network_list.txt', ids_file=DEFAULT_IDS_FILE):
+        self.path = path
+        self.ids_file = ids_file
+        self.channels = []
+        self.warnings = []
+        self.loads = 0
+        self._networks = []
+        self._by_name = {}
+        self._by_handle = {}
+        self._by_id = {}
+        self._by_url = {}
+        self._signature = None
+        self._lock = threading.Lock()
+        # Resolved IDs outlive the list itself (see channel_id_cache.py)
+        self.id_cache = get_id_cache(ids_file) if ids_file else ChannelIdCache(None)
+
+    def refresh(self):
+        """Reload the list if the file changed; True when a reload happened"""
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            if signature == self._signature:
+                return False
+            with open(self.path, 'r', encoding='utf-8') as f:
+                channels, warnings = parse_channels(f)
+            for channel in channels:
+                if channel.channel_id is None:
+                    channel.channel_id = self.id_cache.peek(channel.url)
+            self._index(channels)
+            self.warnings = warnings
+            self._signature = signature
+            self.loads += 1
+
+        if self.loads > 1:
+            print(f"🔁 Reloaded {self.path}: {len(channels)} channels")
+        for warning in warnings:
+            print(f"⚠️ {self.path} {warning}")
+        return True
+
+    def _index(self, channels):
+        # Build complete new indexes, then swap them in so readers never see a half-built registry
+        by_name, by_handle, by_id, by_url = {}, {}, {}, {}
+        for channel in channels:
+            by_name.setdefault(_normalize(channel.name), channel)
+            by_url.setdefault(channel.url.rstrip('/').casefold(), channel)
+            if channel.handle:
+                by_handle.setdefault(channel.handle.casefold(), channel)
+            if channel.channel_id:
+                by_id.setdefault(channel.channel_id, channel)
+        self.channels = channels
+        self._networks = [channel.as_network() for channel in channels]
+        self._by_name, self._by_handle, self._by_id, self._by_url = by_name, by_handle, by_id, by_url
+
+    def networks(self):
+        """(network name, channel URL) pairs, reloading first if the file changed"""
+        self.refresh()
+        return list(self._networks)
+
+    def lookup(self, key):
+        """Find a channel by @handle, channel ID, channel URL or network name"""
+        self.refresh()
+        key = key.strip()
+        if key.startswith(YOUTUBE_PREFIX):
+            return self._by_url.get(key.rstrip('/').casefold())
+        if key.startswith('@'):
+            return self._by_handle.get(key[1:].casefold())
+        if key.startswith('UC') and key in self._by_id:
+            return self._by_id[key]
+        return self._by_name.get(_normalize(key)) or self._by_handle.get(key.casefold())
+
+    def set_channel_id(self, channel, channel_id, save=True):
+        with self._lock:
+            channel.channel_id = channel_id
+            self._by_id[channel_id] = channel
+        self.id_cache.store(channel.url, channel_id, save=save)
+
+    def resolve_ids(self, resolve):
+        """Fill in missing channel IDs with resolve(channel_url); returns how many were resolved"""
+        self.refresh()
+        resolved = 0
+        for channel in self.channels:
+            if channel.channel_id:
+                continue
+            channel_id = resolve(channel.url)
+            if channel_id:
+                resolved += 1
+                # Save in batches so a long first resolve keeps its progress without rewriting the file each time
+                self.set_channel_id(channel, channel_id, save=resolved % 25 == 0)
+        self.id_cache.save()
+        return resolved
+
+    def __len__(self):
+        self.refresh()
+        return len(self.channels)
+
+    def __iter__(self):
+        self.refresh()
+        return iter(self.channels)
+
+    def check_drift(self, news_file='news_networks.txt', index_file='index.html'):
+        """Differences between this list and news_networks.txt / the index.html newsChannels labels"""
+        self.refresh()
+        problems = []
+
+        if news_file and os.path.exists(news_file):
+            listed = {}
+            with open(news_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.strip().split('\t')
+                    if len(parts) >= 2:
+                        listed[_normalize(parts[0])] = (parts[0].strip(), parts[1].strip())
+            for channel in self.channels:
+                entry = listed.pop(_normalize(channel.name), None)
+                if entry is None:
+                    problems.append(f"{news_file}: missing {channel.name}")
+                elif channel.handle and entry[1].lstrip('@').casefold() != channel.handle.casefold():
+                    problems.append(f"{news_file}: {channel.name} is {entry[1]}, network list has @{channel.handle}")
+            for name, handle in listed.values():
+                problems.append(f"{news_file}: {name} ({handle}) is not in {self.path}")
+
+        if index_file and os.path.exists(index_file):
+            with open(index_file, 'r', encoding='utf-8') as f:
+                block = re.search(r'const newsChannels = \[(.*?)\];', f.read(), re.S)
+            names = [_normalize(channel.name) for channel in self.channels]
+            handles = {channel.handle.casefold() for channel in self.channels if channel.handle}
+            for label in re.findall(r"label:\s*'([^']*)'", block.group(1) if block else ''):
+                key = _normalize(label)
+                # Labels are often shortened ("ABC News" for "ABC News Live")
+                if key in handles or any(name.startswith(key) or key.startswith(name) for name in names):
+                    continue
+                problems.append(f"{index_file}: newsChannels label {label!r} matches no network")
+
+        return problems
+
+
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_registry(path='network_list.txt'):
+    """The shared registry for a network list file (one per path per process)"""
+    key = os.path.abspath(path)
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(key)
+        if registry is None:
+            ids_file = os.path.join(os.path.dirname(key), DEFAULT_IDS_FILE)
+            registry = _REGISTRIES[key] = ChannelRegistry(path, ids_file)
+        return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Channel Registry')
+    parser.add_argument('command', choices=['list', 'lookup', 'check', 'resolve'],
+                        help='list channels, look one up, check drift against other lists, or resolve channel IDs')
+    parser.add_argument('key', nargs='?', help='Handle, channel ID, URL or name for lookup')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--news-file', default='news_networks.txt', help='Handle list to compare in check')
+    parser.add_argument('--index-file', default='index.html', help='Page whose newsChannels are compared in check')
+
+    args = parser.parse_args()
+
+    registry = get_registry(args.network_list)
+    registry.refresh()
+
+    if args.command == 'list':
+        for channel in registry.channels:
+            print(f"{channel.name}\t@{channel.handle or '-'}\t{channel.channel_id or '-'}")
+        print(f"\n📋 {len(registry.channels)} channels")
+
+    elif args.command == 'lookup':
+        if not args.key:
+            parser.error('lookup needs a key')
+        channel = registry.lookup(args.key)
+        if channel is None:
+            print(f"❌ No channel matches {args.key}")
+        else:
+            print(f"📺 {channel.name}\n   URL: {channel.url}\n   Handle: @{channel.handle or '-'}\n"
+                  f"   Channel ID: {channel.channel_id or '(not resolved)'}")
+
+    elif args.command == 'check':
+        problems = registry.check_drift(args.news_file, args.index_file)
+        for problem in problems:
+            print(f"⚠️ {problem}")
+        if problems or registry.warnings:
+            print(f"\n❌ {len(problems)} drift problems, {len(registry.warnings)} list warnings")
+        else:
+            print(f"✅ {len(registry.channels)} channels, no drift")
+
+    elif args.command == 'resolve':
+        # Imported here: the engine itself reads network lists through this module
+        from scan_engine import ScanEngine
+
+        engine = ScanEngine()
+
+        def resolve(url):
+            try:
+                return engine.run(url, 'channel_id', timeout=15, require_ok=True)
+            except Exception as e:
+                print(f"⚠️ {url}: {e}")
+                return None
+
+        missing = sum(1 for channel in registry.channels if not channel.channel_id)
+        print(f"🔎 Resolving {missing} channel IDs...")
+        resolved = registry.resolve_ids(resolve)
+        print(f"✅ Resolved {resolved}; cached in {registry.ids_file}")
+
+
+if __name__ == "__main__":
+    main()
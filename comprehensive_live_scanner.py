@@ -4,49 +4,27 @@ Final Comprehensive Live Stream Scanner
 Uses proven video-by-video checking method that successfully detected live streams
 """
 
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
-import re
-import time
 from datetime import datetime
 
+from scan_engine import ScanEngine
+from stream_record import LiveStream, streams_to_dicts
+from sweep_checkpoint import DEFAULT_FRESHNESS_MINUTES, SweepCheckpoint
+from scan_trace import traced
+
 class ComprehensiveLiveStreamScanner:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+    def __init__(self, engine=None):
+        self.engine = engine or ScanEngine()
+        self.session = self.engine.session
         self.all_live_streams = []
+        self.checkpoint = None
         
     def parse_network_list(self, filename):
         """Parse the network list file to extract channel URLs"""
-        networks = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        for i, line in enumerate(lines):
-            line = line.strip()
-            # Skip first line (header) and any empty lines
-            if i == 0 or not line:
-                continue
-            # Process lines with tab-separated values
-            if '\t' in line:
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    network_name = parts[0].strip()
-                    url = parts[1].strip()
-                    if url.startswith('https://www.youtube.com/'):
-                        networks.append((network_name, url))
-        
-        return networks
+        return self.engine.parse_network_list(filename)
     
+    @traced('channel', 'network', 'url')
     def scan_channel_for_live_streams(self, network_name, channel_url, max_videos=15):
         """Scan a channel by checking individual videos for live status"""
         print(f"\n🔍 Scanning {network_name}")
@@ -54,14 +32,12 @@ class ComprehensiveLiveStreamScanner:
         
         try:
             # Get the channel page
-            response = self.session.get(channel_url, timeout=20)
-            response.raise_for_status()
-            
-            content = response.text
-            print(f"   ✅ Page loaded ({len(content):,} characters)")
+            page = self.engine.fetch(channel_url, timeout=20, circuit=channel_url)
+            page.raise_for_status()
+            print(f"   ✅ Page loaded ({len(page.raw):,} bytes)")
             
             # Extract video IDs from the page
-            video_ids = self._extract_video_ids(content)
+            video_ids = self.engine.run(channel_url, 'video_ids')
             print(f"   📹 Found {len(video_ids)} video IDs")
             
             if not video_ids:
@@ -74,22 +50,23 @@ class ComprehensiveLiveStreamScanner:
             
             print(f"   🎥 Checking first {videos_to_check} videos for live status...")
             
+            skipped = failed = 0
             for i, video_id in enumerate(video_ids[:videos_to_check]):
                 video_url = f"https://www.youtube.com/watch?v={video_id}"
                 
+                # Repeated failures opened this channel's breaker - don't keep hammering it
+                if self.engine.circuit_open(channel_url):
+                    skipped = videos_to_check - i
+                    print(f"      ⛔ Circuit open for {network_name} - skipping remaining {skipped} videos")
+                    break
+                
                 try:
-                    live_info = self._check_video_live_status(video_url)
+                    live_info = self._check_video_live_status(video_url, channel_url)
+                    failed += live_info.get('error', False)
                     
                     if live_info['is_live']:
-                        live_stream = {
-                            'video_id': video_id,
-                            'url': video_url,
-                            'title': live_info['title'],
-                            'viewers': live_info['viewers'],
-                            'network': network_name,
-                            'detected_at': datetime.now().isoformat()
-                        }
-                        live_streams.append(live_stream)
+                        live_streams.append(LiveStream.detected_now(
+                            video_id, live_info['title'], live_info['viewers'], network_name))
                         print(f"      🔴 LIVE [{i+1}/{videos_to_check}]: {live_info['title'][:60]}... ({live_info['viewers']} viewers)")
                     else:
                         # Only show first few non-live videos to avoid spam
@@ -99,9 +76,10 @@ class ComprehensiveLiveStreamScanner:
                             print(f"      ⚪ (Checking remaining {videos_to_check-3} videos silently...)")
                     
                     # Small delay between video checks
-                    time.sleep(0.5)
+                    self.engine.pause(0.5)
                     
                 except Exception as e:
+                    failed += 1
                     if i < 3:  # Only show errors for first few videos
                         print(f"      ❌ Error checking video {i+1}: {e}")
             
@@ -111,124 +89,32 @@ class ComprehensiveLiveStreamScanner:
             else:
                 print(f"   ⚪ No live streams found")
             
+            # A channel cut short by its breaker or a failed video check is left for --resume to finish
+            if self.checkpoint and not skipped and not failed:
+                self.checkpoint.record_channel(network_name, channel_url, live_streams)
+            
             return live_streams
             
         except Exception as e:
             print(f"   ❌ Error scanning channel: {e}")
             return []
     
-    def _extract_video_ids(self, content):
-        """Extract video IDs from channel content using multiple methods"""
-        video_ids = []
-        
-        # Method 1: Direct regex for /watch?v= URLs
-        matches = re.findall(r'/watch\?v=([a-zA-Z0-9_-]{11})', content)
-        video_ids.extend(matches)
-        
-        # Method 2: JSON videoId fields
-        matches = re.findall(r'"videoId"\s*:\s*"([a-zA-Z0-9_-]{11})"', content)
-        video_ids.extend(matches)
-        
-        # Method 3: Various URL parameter patterns
-        matches = re.findall(r'[?&]v=([a-zA-Z0-9_-]{11})', content)
-        video_ids.extend(matches)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_video_ids = []
-        for video_id in video_ids:
-            if video_id not in seen:
-                seen.add(video_id)
-                unique_video_ids.append(video_id)
-        
-        return unique_video_ids
-    
-    def _check_video_live_status(self, video_url):
+    @traced('video', 'url')
+    def _check_video_live_status(self, video_url, channel_url=None):
         """Check if a specific video is currently live"""
+        if self.checkpoint:
+            status = self.checkpoint.video_status(video_url)
+            if status is not None:
+                return status
         try:
-            response = self.session.get(video_url, timeout=12)
-            
-            if response.status_code != 200:
-                return {'is_live': False, 'title': 'Unavailable', 'viewers': 0}
-            
-            content = response.text
-            
-            # Extract title
-            title = self._extract_video_title(content)
-            
-            # Check for live indicators
-            is_live = False
-            viewers = 0
-            
-            # Primary live detection methods
-            live_patterns = [
-                r'"isLiveContent"\s*:\s*true',
-                r'"liveBroadcastDetails"\s*:',
-                r'"isLive"\s*:\s*true',
-                r'isLivePlayback.*?true'
-            ]
-            
-            for pattern in live_patterns:
-                if re.search(pattern, content):
-                    is_live = True
-                    break
-            
-            # Extract viewer count if live
-            if is_live:
-                viewers = self._extract_viewer_count(content)
-            
-            # Secondary check: look for "watching now" which is a strong live indicator
-            watching_match = re.search(r'(\d+(?:,\d+)*)\s+watching now', content, re.IGNORECASE)
-            if watching_match:
-                is_live = True
-                viewers = max(viewers, int(watching_match.group(1).replace(',', '')))
-            
-            return {
-                'is_live': is_live,
-                'title': title,
-                'viewers': viewers
-            }
-            
-        except Exception as e:
-            return {'is_live': False, 'title': 'Error', 'viewers': 0}
-    
-    def _extract_video_title(self, content):
-        """Extract video title from page content"""
-        # Method 1: JSON title field
-        title_match = re.search(r'"title":"([^"]+)"', content)
-        if title_match:
-            title = title_match.group(1)
-            # Decode common escape sequences
-            title = title.replace('\\u0026', '&').replace('\\"', '"').replace('\\n', ' ')
-            return title[:200]  # Limit length
-        
-        # Method 2: HTML title tag
-        title_match = re.search(r'<title>([^<]+)</title>', content)
-        if title_match:
-            return title_match.group(1)[:200]
-        
-        return "Unknown Title"
-    
-    def _extract_viewer_count(self, content):
-        """Extract current viewer count from live stream"""
-        viewer_patterns = [
-            r'"concurrentViewers"\s*:\s*"(\d+)"',
-            r'"viewCount"\s*:\s*"(\d+)"',
-            r'(\d+(?:,\d+)*)\s+watching now',
-            r'(\d+(?:,\d+)*)\s+viewers watching'
-        ]
-        
-        for pattern in viewer_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                viewer_str = match.group(1).replace(',', '')
-                try:
-                    return int(viewer_str)
-                except ValueError:
-                    continue
-        
-        return 0
+            status = self.engine.run(video_url, 'watch_status_comprehensive', timeout=12, circuit=channel_url)
+        except Exception:
+            return {'is_live': False, 'title': 'Error', 'viewers': 0, 'error': True}
+        if self.checkpoint:
+            self.checkpoint.record_video(video_url, status)
+        return status
     
+    @traced('sweep')
     def scan_all_networks(self, network_list_file):
         """Scan all networks for live streams"""
         networks = self.parse_network_list(network_list_file)
@@ -243,12 +129,19 @@ class ComprehensiveLiveStreamScanner:
         for i, (network_name, channel_url) in enumerate(networks):
             print(f"\n[{i+1}/{len(networks)}]")
             
+            if self.checkpoint:
+                done = self.checkpoint.channel_streams(channel_url, network_name)
+                if done is not None:
+                    print(f"♻️ {network_name}: {len(done)} live stream(s) from checkpoint")
+                    self.all_live_streams.extend(done)
+                    continue
+            
             try:
                 live_streams = self.scan_channel_for_live_streams(network_name, channel_url)
                 
                 # Delay between channels to be respectful
                 if i < len(networks) - 1:  # Don't delay after the last one
-                    time.sleep(2)
+                    self.engine.pause(2)
                     
             except Exception as e:
                 print(f"   ❌ Failed to scan {network_name}: {e}")
@@ -277,14 +170,14 @@ class ComprehensiveLiveStreamScanner:
             return
         
         # Sort by viewer count
-        sorted_streams = sorted(self.all_live_streams, key=lambda x: x['viewers'], reverse=True)
+        sorted_streams = sorted(self.all_live_streams, key=lambda x: x.viewers, reverse=True)
         
         print(f"✅ Found {len(self.all_live_streams)} live streams!")
         
         # Group by network
         by_network = {}
         for stream in self.all_live_streams:
-            network = stream['network']
+            network = stream.network
             if network not in by_network:
                 by_network[network] = []
             by_network[network].append(stream)
@@ -296,12 +189,12 @@ class ComprehensiveLiveStreamScanner:
         print(f"\n🔴 Live streams (sorted by viewer count):")
         
         for i, stream in enumerate(sorted_streams, 1):
-            print(f"\n{i}. 🔴 {stream['network']}")
-            print(f"   📺 {stream['title']}")
-            print(f"   👥 {stream['viewers']:,} viewers")
-            print(f"   🔗 {stream['url']}")
+            print(f"\n{i}. 🔴 {stream.network}")
+            print(f"   📺 {stream.title}")
+            print(f"   👥 {stream.viewers:,} viewers")
+            print(f"   🔗 {stream.url}")
         
-        total_viewers = sum(s['viewers'] for s in self.all_live_streams)
+        total_viewers = sum(s.viewers for s in self.all_live_streams)
         print(f"\n📈 Total viewers across all live streams: {total_viewers:,}")
         
         if total_viewers > 0:
@@ -314,13 +207,13 @@ class ComprehensiveLiveStreamScanner:
             'scan_info': {
                 'timestamp': datetime.now().isoformat(),
                 'scanner_type': 'comprehensive_video_checking',
-                'total_networks_scanned': len(set(s['network'] for s in self.all_live_streams)),
+                'total_networks_scanned': len(set(s.network for s in self.all_live_streams)),
                 'total_live_streams': len(self.all_live_streams)
             },
-            'live_streams': self.all_live_streams,
+            'live_streams': streams_to_dicts(self.all_live_streams),
             'summary': {
-                'networks_with_live_content': list(set(s['network'] for s in self.all_live_streams)),
-                'total_viewers': sum(s['viewers'] for s in self.all_live_streams)
+                'networks_with_live_content': list(set(s.network for s in self.all_live_streams)),
+                'total_viewers': sum(s.viewers for s in self.all_live_streams)
             }
         }
         
@@ -330,13 +223,28 @@ class ComprehensiveLiveStreamScanner:
         print(f"\n💾 Comprehensive results saved to: {filename}")
 
 def main():
+    parser = argparse.ArgumentParser(description='Comprehensive Live Stream Scanner')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file to scan')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted scan from its checkpoint')
+    parser.add_argument('--checkpoint', default='comprehensive_checkpoint.jsonl',
+                        help='Checkpoint file for completed channels and videos')
+    parser.add_argument('--freshness', type=float, default=DEFAULT_FRESHNESS_MINUTES,
+                        help='Minutes a checkpointed result stays valid when resuming')
+    
+    args = parser.parse_args()
+    
     print("🚀 Starting Comprehensive Live Stream Detection")
     print("=" * 60)
     
     scanner = ComprehensiveLiveStreamScanner()
+    scanner.checkpoint = SweepCheckpoint(args.checkpoint, 'comprehensive', args.freshness, resume=args.resume)
+    if scanner.checkpoint.resumed:
+        print(f"♻️ Resuming with {scanner.checkpoint.summary()}")
     
     # Scan all networks
-    live_streams = scanner.scan_all_networks('network_list.txt')
+    live_streams = scanner.scan_all_networks(args.network_list)
+    scanner.checkpoint.complete()
     
     # Print comprehensive summary
     scanner.print_summary()
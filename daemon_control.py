@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Daemon Control
+Single-instance lock file and a Unix-domain control socket for the refresh daemon (status, trigger, rescan, pause, interval, stats)
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_LOCK_FILE = 'auto_refresh.lock'
+DEFAULT_SOCKET = 'auto_refresh.sock'
+
+
+class DaemonLock:
+    """Exclusive flock on a file holding the owner's PID; the OS drops it if the process dies"""
+
+    def __init__(self, path=DEFAULT_LOCK_FILE):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """True if this process now holds the lock, False if another process does"""
+        handle = open(self.path, 'a+', encoding='utf-8')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(json.dumps({'pid': os.getpid(), 'started_at': datetime.now().isoformat()}))
+        handle.flush()
+        self._file = handle
+        return True
+
+    def holder(self):
+        """{'pid', 'started_at'} of the process holding the lock, or None if it is free"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                handle.seek(0)
+                try:
+                    return json.loads(handle.read() or '{}')
+                except json.JSONDecodeError:
+                    return {}
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        return None
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class SweepControl:
+    """Shared state between the sweep loop and control commands
+
+    The loop waits on this instead of sleeping, so a trigger, pause, interval change or
+    stop takes effect immediately rather than after the current sleep.
+    """
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self.paused = False
+        self.stopping = False
+        self.next_sweep_at = None
+        self._triggered = False
+        self._rescans = {}  # network name -> when its out-of-cycle re-scan is due
+        self._changed = threading.Condition()
+
+    def trigger(self):
+        with self._changed:
+            self._triggered = True
+            self._changed.notify_all()
+
+    def pause(self):
+        with self._changed:
+            self.paused = True
+            self._changed.notify_all()
+
+    def resume(self):
+        with self._changed:
+            self.paused = False
+            self._changed.notify_all()
+
+    def set_interval(self, seconds):
+        with self._changed:
+            self.interval_seconds = seconds
+            self._changed.notify_all()
+
+    def stop(self):
+        with self._changed:
+            self.stopping = True
+            self._changed.notify_all()
+
+    def request_rescan(self, network_names, delay=0):
+        """Ask for an out-of-cycle re-scan of some networks `delay` seconds from now"""
+        with self._changed:
+            due = time.time() + delay
+            for name in network_names:
+                self._rescans[name] = min(self._rescans.get(name, due), due)
+            self._changed.notify_all()
+
+    def due_rescans(self):
+        """Networks whose re-scan is due (each is returned once)"""
+        with self._changed:
+            now = time.time()
+            due = [name for name, at in self._rescans.items() if at <= now]
+            for name in due:
+                del self._rescans[name]
+            return due
+
+    def wait_for_next_sweep(self, since):
+        """Block until interval_seconds after `since`, a trigger, a due re-scan or a stop
+
+        Returns 'due', 'triggered', 'rescan' or 'stop'.
+        """
+        with self._changed:
+            while True:
+                if self.stopping:
+                    reason = 'stop'
+                elif self._triggered:
+                    self._triggered = False
+                    reason = 'triggered'
+                elif self.paused:
+                    self.next_sweep_at = None
+                    self._changed.wait()
+                    continue
+                else:
+                    now = time.time()
+                    self.next_sweep_at = since + self.interval_seconds
+                    next_rescan = min(self._rescans.values()) if self._rescans else None
+                    if next_rescan is not None and next_rescan <= now:
+                        return 'rescan'
+                    remaining = self.next_sweep_at - now
+                    if remaining > 0:
+                        self._changed.wait(remaining if next_rescan is None else min(remaining, next_rescan - now))
+                        continue
+                    reason = 'due'
+                self.next_sweep_at = None
+                return reason
+
+    def sleep(self, seconds):
+        """Sleep up to `seconds`; True if a sweep was triggered meanwhile"""
+        with self._changed:
+            if not (self._triggered or self.stopping):
+                self._changed.wait(seconds)
+            triggered, self._triggered = self._triggered, False
+            return triggered
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(65536)
+        try:
+            request = json.loads(line)
+            handler = self.server.handlers.get(request.get('command'))
+            if handler is None:
+                response = {'ok': False, 'error': f"unknown command {request.get('command')!r}",
+                            'commands': sorted(self.server.handlers)}
+            else:
+                response = {'ok': True, 'result': handler(**request.get('args', {}))}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response, default=str) + '\n').encode('utf-8'))
+
+
+class _ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def start_control_server(path, handlers):
+    """Serve {command: callable(**args)} on a Unix socket from a daemon thread; returns the server
+
+    Only call while holding the DaemonLock: a leftover socket file from a crashed daemon is replaced.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    server = _ControlServer(path, _ControlHandler)
+    server.handlers = handlers
+    os.chmod(path, 0o600)
+    threading.Thread(target=server.serve_forever, name='control-socket', daemon=True).start()
+    return server
+
+
+def stop_control_server(server):
+    server.shutdown()
+    server.server_close()
+    if os.path.exists(server.server_address):
+        os.remove(server.server_address)
+
+
+def send_command(path, command, timeout=5, **args):
+    """Send one command to a running daemon and return its result (raises ConnectionError if none answers)"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(f"No daemon listening on {path}") from e
+        client.sendall((json.dumps({'command': command, 'args': args}) + '\n').encode('utf-8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    response = json.loads(data)
+    if not response['ok']:
+        raise RuntimeError(response['error'])
+    return response['result']
+
+
+def _print_status(status):
+    state = {'sweeping': '🔄 sweeping', 'waiting': '⏳ waiting', 'paused': '⏸️ paused'}.get(status['state'], status['state'])
+    print(f"✅ Monitor running (PID {status['pid']}, {status['mode']} mode) - {state}")
+    print(f"   Running since: {status['started_at']}")
+    print(f"   Sweeps completed: {status['scan_count']} (interval {status['interval_seconds'] / 60:g} min)")
+    last = status.get('last_sweep')
+    if last:
+        print(f"   Last sweep: {last['finished_at']} in {last['duration_seconds']:.1f}s - "
+              f"{last['live_streams']} live streams, {last['total_viewers']:,} viewers")
+    if status.get('next_sweep_in') is not None:
+        print(f"   Next sweep in: {status['next_sweep_in']:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daemon Control')
+    parser.add_argument('command', choices=['status', 'trigger', 'rescan', 'pause', 'resume', 'interval', 'stats',
+                                            'stop', 'pid'],
+                        help='Command for the running refresh daemon')
+    parser.add_argument('value', nargs='?', help='Minutes between sweeps (interval) or a network name (rescan)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Control socket of the daemon')
+    parser.add_argument('--lock-file', default=DEFAULT_LOCK_FILE, help='Lock file of the daemon')
+    parser.add_argument('--json', action='store_true', help='Print the raw JSON result')
+
+    args = parser.parse_args()
+
+    if args.command == 'pid':
+        holder = DaemonLock(args.lock_file).holder()
+        if holder is None:
+            sys.exit(1)
+        print(holder.get('pid', ''))
+        return
+
+    command_args = {}
+    if args.command == 'interval':
+        try:
+            minutes = float(args.value)
+        except (TypeError, ValueError):
+            minutes = 0
+        if minutes <= 0:
+            parser.error('interval needs a positive number of minutes')
+        command_args['minutes'] = minutes
+    elif args.command == 'rescan':
+        if not args.value:
+            parser.error('rescan needs a network name')
+        command_args['network'] = args.value
+
+    try:
+        result = send_command(args.socket, args.command, **command_args)
+    except ConnectionError:
+        holder = DaemonLock(args.lock_file).holder()
+        if holder:
+            print(f"⚠️ Monitor PID {holder.get('pid')} holds the lock but is not answering on {args.socket}")
+        else:
+            print("⚪ No monitor running")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.json or args.command == 'stats':
+        print(json.dumps(result, indent=2, default=str))
+    elif args.command == 'status':
+        _print_status(result)
+    else:
+        print(f"📨 {result}")
+
+
+if __name__ == "__main__":
+    main()
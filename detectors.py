@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+"""
+Live Stream Detector Plugins
+Detection strategies shared by all scanners, registered by name and run against a parsed page
+"""
+
+import json
+import re
+
+# Registry of detector name -> Detector, filled in by @register_detector
+DETECTORS = {}
+
+VIDEO_ID_PATTERNS = [
+    re.compile(r'/watch\?v=([a-zA-Z0-9_-]{11})'),
+    re.compile(r'"videoId"\s*:\s*"([a-zA-Z0-9_-]{11})"'),
+    re.compile(r'[?&]v=([a-zA-Z0-9_-]{11})'),
+]
+WATCH_HREF = re.compile(r'/watch\?v=')
+HREF_VIDEO_ID = re.compile(r'v=([a-zA-Z0-9_-]{11})')
+JSON_TITLE = re.compile(r'"title":"([^"]+)"')
+HTML_TITLE = re.compile(r'<title>([^<]+)</title>')
+WATCHING_NOW = re.compile(r'(\d+(?:,\d+)*)\s+watching now', re.IGNORECASE)
+NUMBER = re.compile(r'(\d+(?:,\d+)*)')
+INITIAL_DATA_MARKER = 'var ytInitialData = '
+
+
+class Detector:
+    """A named detection strategy and the kind of page it understands"""
+
+    def __init__(self, name, page_type, func):
+        self.name = name
+        self.page_type = page_type
+        self.func = func
+
+    def __call__(self, page):
+        return self.func(page)
+
+    def __repr__(self):
+        return f"Detector({self.name!r}, {self.page_type!r})"
+
+
+def register_detector(name, page_type='any'):
+    """Register a detection strategy under a name so the scan engine can run it"""
+    def decorator(func):
+        DETECTORS[name] = Detector(name, page_type, func)
+        return func
+    return decorator
+
+
+def get_detector(name):
+    """Look up a registered detector by name"""
+    try:
+        return DETECTORS[name]
+    except KeyError:
+        raise KeyError(f"Unknown detector: {name} (registered: {', '.join(sorted(DETECTORS))})")
+
+
+def extract_initial_data(text):
+    """Decode the ytInitialData object embedded in a YouTube page, or None"""
+    start = text.find(INITIAL_DATA_MARKER)
+    if start == -1:
+        return None
+
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text, start + len(INITIAL_DATA_MARKER))
+    except json.JSONDecodeError:
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def watch_url(video_id):
+    """Canonical watch URL for a video ID"""
+    return f'https://www.youtube.com/watch?v={video_id}'
+
+
+def classify_url(url):
+    """Endpoint type of a YouTube URL: channel, streams, watch, feed or other"""
+    if '/watch?' in url:
+        return 'watch'
+    if '/feeds/' in url:
+        return 'feed'
+    if url.rstrip('/').endswith('/streams'):
+        return 'streams'
+    if '/@' in url or '/channel/' in url or '/c/' in url:
+        return 'channel'
+    return 'other'
+
+
+def _to_int(text):
+    return int(text.replace(',', ''))
+
+
+def _first_match(patterns, content, flags=0):
+    """Return the first group of the first pattern that matches, or None"""
+    for pattern in patterns:
+        match = re.search(pattern, content, flags)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _any_match(patterns, content, flags=0):
+    return any(re.search(pattern, content, flags) for pattern in patterns)
+
+
+def _json_title(content):
+    match = JSON_TITLE.search(content)
+    return match.group(1) if match else None
+
+
+def _unescape_title(title):
+    return title.replace('\\u0026', '&').replace('\\"', '"')
+
+
+# ---------------------------------------------------------------------------
+# Channel page detectors
+# ---------------------------------------------------------------------------
+
+@register_detector('video_ids', 'channel')
+def detect_video_ids(page):
+    """Extract video IDs from channel content, preserving page order"""
+    content = page.text
+    seen = set()
+    unique_ids = []
+
+    for pattern in VIDEO_ID_PATTERNS:
+        for video_id in pattern.findall(content):
+            if video_id not in seen:
+                seen.add(video_id)
+                unique_ids.append(video_id)
+
+    return unique_ids
+
+
+@register_detector('live_indicator_counts', 'channel')
+def detect_live_indicator_counts(page):
+    """Count loose live-content phrases on a page (threshold heuristic)"""
+    content = page.text.lower()
+    return {
+        'live_now': content.count('live now'),
+        'watching_now': content.count('watching now'),
+        'viewers_watching': content.count('viewers watching'),
+        'streaming_live': content.count('streaming live'),
+        'live_badge': content.count('live'),
+        'concurrent_viewers': content.count('concurrent')
+    }
+
+
+@register_detector('channel_id', 'channel')
+def detect_channel_id(page):
+    """Find the canonical channel ID (UC...) for a channel page"""
+    content = page.text
+
+    # Method 1: og:url meta tag
+    meta_match = re.search(r'<meta property="og:url" content="([^"]+)"', content)
+    if meta_match and '/channel/' in meta_match.group(1):
+        return meta_match.group(1).split('/channel/')[-1].split('/')[0]
+
+    # Method 2: channelId in embedded JavaScript
+    channel_id = _first_match([r'"channelId":"([^"]+)"', r'"externalId":"([^"]+)"'], content)
+    return channel_id
+
+
+def _extract_video_id(href):
+    """Extract video ID from YouTube URL"""
+    if not href:
+        return None
+
+    match = HREF_VIDEO_ID.search(href)
+    return match.group(1) if match else None
+
+
+def _extract_title_from_link(link):
+    """Extract title from a video link element"""
+    title = (link.get('title') or
+             link.get('aria-label') or
+             link.get_text(strip=True) or
+             "Unknown Title")
+
+    return title[:100]
+
+
+def _check_live_badge_near_element(element):
+    """Check if there's a LIVE badge near an element"""
+    for level in range(3):
+        if not element:
+            break
+
+        if element.get_text and 'LIVE' in element.get_text():
+            return True
+
+        if element.get('overlay-style') == 'LIVE':
+            return True
+
+        if element.find_all('div', class_='badge-shape-wiz__text', string='LIVE'):
+            return True
+
+        element = element.parent
+
+    return False
+
+
+def _find_video_link_near_element(element):
+    """Find a video link near a given element"""
+    current = element
+    for level in range(10):
+        if not current:
+            break
+
+        video_link = current.find('a', href=WATCH_HREF)
+        if video_link:
+            return video_link
+
+        if getattr(current, 'parent', None):
+            sibling = current.parent.find('a', href=WATCH_HREF)
+            if sibling:
+                return sibling
+
+        current = getattr(current, 'parent', None)
+
+    return None
+
+
+def _badge_stream(link, method):
+    video_id = _extract_video_id(link.get('href', ''))
+    if not video_id:
+        return None
+
+    return {
+        'video_id': video_id,
+        'title': _extract_title_from_link(link),
+        'url': watch_url(video_id),
+        'detection_method': method,
+        'has_live_badge': True
+    }
+
+
+@register_detector('live_now_section', 'channel')
+def detect_live_now_section(page):
+    """Find streams with a LIVE badge inside the 'Live now' shelf"""
+    soup = page.soup
+    live_streams = []
+
+    for element in soup.find_all(string=re.compile(r'Live now', re.IGNORECASE)):
+        parent = element.parent
+
+        for level in range(5):
+            if not parent:
+                break
+
+            for link in parent.find_all('a', href=WATCH_HREF):
+                if _check_live_badge_near_element(link):
+                    stream = _badge_stream(link, 'live_now_section')
+                    if stream:
+                        live_streams.append(stream)
+
+            parent = parent.parent
+
+    return live_streams
+
+
+@register_detector('live_badge', 'channel')
+def detect_live_badge_streams(page):
+    """Find streams with LIVE overlay badges, badge divs or standalone LIVE text"""
+    soup = page.soup
+    live_streams = []
+
+    candidates = [
+        ('live_overlay', soup.find_all(attrs={'overlay-style': 'LIVE'})),
+        ('live_badge', soup.find_all('div', class_='badge-shape-wiz__text', string='LIVE')),
+        ('live_text', [text.parent for text in soup.find_all(string=re.compile(r'^LIVE$')) if text.parent]),
+    ]
+
+    for method, elements in candidates:
+        for element in elements:
+            video_link = _find_video_link_near_element(element)
+            if video_link:
+                stream = _badge_stream(video_link, method)
+                if stream:
+                    live_streams.append(stream)
+
+    return live_streams
+
+
+def _is_live_renderer(renderer):
+    """Check if a renderer represents a live stream"""
+    for badge in renderer.get('badges', []):
+        badge_renderer = badge.get('metadataBadgeRenderer', {})
+        if badge_renderer.get('label', '').upper() == 'LIVE':
+            return True
+        if badge_renderer.get('style', '') == 'BADGE_STYLE_TYPE_LIVE_NOW':
+            return True
+
+    if 'liveBroadcastDetails' in renderer:
+        return True
+
+    return renderer.get('isLiveContent') is True
+
+
+def _renderer_text(obj):
+    if 'runs' in obj:
+        return ''.join(run.get('text', '') for run in obj['runs'])
+    return obj.get('simpleText')
+
+
+def _extract_title_from_renderer(renderer):
+    """Extract title from a video renderer"""
+    title = _renderer_text(renderer.get('title', {}))
+    return title if title is not None else "Unknown Title"
+
+
+def _renderer_view_text(renderer):
+    for key in ['viewCountText', 'shortViewCountText']:
+        if key in renderer:
+            text = _renderer_text(renderer[key])
+            if text is not None:
+                return text
+    return ''
+
+
+def _extract_viewers_from_renderer(renderer):
+    """Extract viewer count from text like '1,234 watching now'"""
+    for key in ['viewCountText', 'shortViewCountText']:
+        if key not in renderer:
+            continue
+
+        text = _renderer_text(renderer[key])
+        if text and 'watching' in text.lower():
+            numbers = NUMBER.findall(text)
+            if numbers:
+                return _to_int(numbers[0])
+
+    return 0
+
+
+def _walk_dicts(obj):
+    """Yield every dict nested anywhere inside a decoded JSON value"""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            yield current
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+@register_detector('initial_data_live', 'channel')
+def detect_live_in_initial_data(page):
+    """Find renderers flagged live (badge, broadcast details) in ytInitialData"""
+    data = page.initial_data
+    if data is None:
+        return []
+
+    live_streams = []
+    for obj in _walk_dicts(data):
+        if not _is_live_renderer(obj):
+            continue
+
+        video_id = obj.get('videoId')
+        if video_id:
+            live_streams.append({
+                'video_id': video_id,
+                'title': _extract_title_from_renderer(obj),
+                'url': watch_url(video_id),
+                'viewers': _extract_viewers_from_renderer(obj),
+                'detection_method': 'json_data',
+                'has_live_badge': True
+            })
+
+    return live_streams
+
+
+def _parse_video_renderer_for_live(renderer):
+    """Parse a *VideoRenderer looking for live badges, 'live' titles or watching counts"""
+    video_id = renderer.get('videoId', '')
+    if not video_id:
+        return None
+
+    title = _renderer_text(renderer.get('title', {})) or ''
+
+    is_live = False
+    for badge in renderer.get('badges', []):
+        label = badge.get('metadataBadgeRenderer', {}).get('label', '').upper()
+        if 'LIVE' in label:
+            is_live = True
+            break
+
+    if not is_live and 'live' in title.lower():
+        is_live = True
+
+    viewer_count = 0
+    view_count_text = _renderer_view_text(renderer)
+    if 'watching' in view_count_text.lower():
+        numbers = NUMBER.findall(view_count_text)
+        if numbers:
+            viewer_count = _to_int(numbers[0])
+            is_live = True
+
+    if is_live or viewer_count > 0:
+        return {
+            'video_id': video_id,
+            'title': title,
+            'is_live': is_live,
+            'viewer_count': viewer_count,
+            'view_count_text': view_count_text,
+            'url': watch_url(video_id)
+        }
+
+    return None
+
+
+def _live_streams_from_html(soup):
+    """Fallback: video links near LIVE / watching now / viewers text"""
+    streams = []
+
+    for element in soup.find_all(string=re.compile(r'(LIVE|watching now|viewers)', re.IGNORECASE)):
+        parent = element.parent
+        for _ in range(5):
+            if not parent:
+                break
+
+            video_link = parent.find('a', href=WATCH_HREF)
+            if video_link:
+                video_id_match = re.search(r'v=([^&]+)', video_link.get('href', ''))
+                if video_id_match:
+                    video_id = video_id_match.group(1)
+                    viewer_text = element.strip()
+                    numbers = NUMBER.findall(viewer_text)
+
+                    streams.append({
+                        'video_id': video_id,
+                        'title': video_link.get('title', '') or video_link.get_text(strip=True),
+                        'is_live': True,
+                        'viewer_count': _to_int(numbers[0]) if numbers else 0,
+                        'view_count_text': viewer_text,
+                        'url': watch_url(video_id)
+                    })
+                    break
+            parent = parent.parent
+
+    return streams
+
+
+@register_detector('streams_tab_live', 'channel')
+def detect_streams_tab_live(page):
+    """Find live candidates on a /streams tab via renderers, falling back to HTML"""
+    streams = []
+
+    data = page.initial_data
+    if data is not None:
+        for obj in _walk_dicts(data):
+            for key, value in obj.items():
+                if key.endswith('VideoRenderer') and isinstance(value, dict):
+                    stream_info = _parse_video_renderer_for_live(value)
+                    if stream_info and stream_info.get('is_live'):
+                        streams.append(stream_info)
+
+    if not streams:
+        streams.extend(_live_streams_from_html(page.soup))
+
+    return streams
+
+
+# ---------------------------------------------------------------------------
+# Watch page detectors
+# ---------------------------------------------------------------------------
+
+@register_detector('watch_status', 'watch')
+def detect_watch_status(page):
+    """Quick watch-page check: live flags plus concurrent/watching viewer count"""
+    if page.status_code != 200:
+        return {'is_live': False, 'title': 'Unavailable', 'viewers': 0}
+
+    content = page.text
+    title = _unescape_title(_json_title(content) or "Unknown Title")
+
+    is_live = _any_match([
+        r'"isLiveContent"\s*:\s*true',
+        r'"liveBroadcastDetails"\s*:',
+        r'"isLive"\s*:\s*true'
+    ], content)
+
+    viewers = 0
+    if is_live:
+        viewer_text = _first_match([
+            r'"concurrentViewers"\s*:\s*"(\d+)"',
+            r'(\d+(?:,\d+)*)\s+watching now'
+        ], content, re.IGNORECASE)
+        if viewer_text:
+            viewers = _to_int(viewer_text)
+
+    return {
+        'is_live': is_live,
+        'title': title[:150],
+        'viewers': viewers
+    }
+
+
+def _comprehensive_title(content):
+    title = _json_title(content)
+    if title:
+        return _unescape_title(title).replace('\\n', ' ')[:200]
+
+    match = HTML_TITLE.search(content)
+    if match:
+        return match.group(1)[:200]
+
+    return "Unknown Title"
+
+
+@register_detector('watch_status_comprehensive', 'watch')
+def detect_watch_status_comprehensive(page):
+    """Thorough watch-page check that also trusts isLivePlayback and 'watching now'"""
+    if page.status_code != 200:
+        return {'is_live': False, 'title': 'Unavailable', 'viewers': 0}
+
+    content = page.text
+    title = _comprehensive_title(content)
+
+    is_live = _any_match([
+        r'"isLiveContent"\s*:\s*true',
+        r'"liveBroadcastDetails"\s*:',
+        r'"isLive"\s*:\s*true',
+        r'isLivePlayback.*?true'
+    ], content)
+
+    viewers = 0
+    if is_live:
+        viewer_text = _first_match([
+            r'"concurrentViewers"\s*:\s*"(\d+)"',
+            r'"viewCount"\s*:\s*"(\d+)"',
+            r'(\d+(?:,\d+)*)\s+watching now',
+            r'(\d+(?:,\d+)*)\s+viewers watching'
+        ], content, re.IGNORECASE)
+        if viewer_text:
+            viewers = _to_int(viewer_text)
+
+    watching_match = WATCHING_NOW.search(content)
+    if watching_match:
+        is_live = True
+        viewers = max(viewers, _to_int(watching_match.group(1)))
+
+    return {
+        'is_live': is_live,
+        'title': title,
+        'viewers': viewers
+    }
+
+
+@register_detector('watch_status_advanced', 'watch')
+def detect_watch_status_advanced(page):
+    """Debug watch-page check where any single live signal wins"""
+    if page.status_code != 200:
+        return {'is_live': False, 'title': 'Unknown', 'viewers': 0}
+
+    content = page.text
+    title = _unescape_title(_json_title(content) or "Unknown Title")
+
+    is_live = _any_match([
+        r'"isLiveContent"\s*:\s*true',
+        r'"liveBroadcastDetails"\s*:',
+        r'"isLive"\s*:\s*true'
+    ], content)
+    viewers = 0
+
+    watching_match = WATCHING_NOW.search(content)
+    if watching_match:
+        is_live = True
+        viewers = _to_int(watching_match.group(1))
+
+    concurrent_match = re.search(r'"concurrentViewers"\s*:\s*"(\d+)"', content)
+    if concurrent_match:
+        is_live = True
+        viewers = int(concurrent_match.group(1))
+
+    return {
+        'is_live': is_live,
+        'title': title,
+        'viewers': viewers
+    }
+
+
+@register_detector('watch_live_manual', 'watch')
+def detect_watch_live_manual(page):
+    """Manual-scanner watch-page check; returns None unless the video is live"""
+    if page.status_code != 200:
+        return None
+
+    content = page.text
+    title = _json_title(content) or "Unknown"
+
+    is_live = _any_match([
+        r'"isLiveContent":true',
+        r'"isLive":true',
+        r'isLivePlayback.*?true',
+        r'"liveBroadcastDetails"'
+    ], content)
+
+    if not is_live:
+        return None
+
+    viewer_text = _first_match([
+        r'"viewCount":"(\d+)"',
+        r'(\d+(?:,\d+)*)\s+watching now',
+        r'(\d+(?:,\d+)*)\s+viewers'
+    ], content, re.IGNORECASE)
+
+    return {
+        'title': title,
+        'is_live': True,
+        'viewers': _to_int(viewer_text) if viewer_text else 0
+    }
+
+
+@register_detector('watch_info', 'watch')
+def detect_watch_info(page):
+    """Basic title and total view count for a watch page"""
+    if page.status_code != 200:
+        return None
+
+    content = page.text
+    view_match = re.search(r'"viewCount":"(\d+)"', content)
+
+    return {
+        'title': _json_title(content) or "Unknown",
+        'views': int(view_match.group(1)) if view_match else 0
+    }
+
+
+@register_detector('watch_verify_precise', 'watch')
+def detect_watch_verify_precise(page):
+    """Verification pass for badge/JSON candidates; viewers is None when not shown"""
+    if page.status_code != 200:
+        return {'is_live': False, 'viewers': None}
+
+    content = page.text
+    is_live = _any_match([
+        r'"isLiveContent":true',
+        r'"isLive":true',
+        r'"liveBroadcastDetails"',
+        r'watching now',
+        r'viewers watching now'
+    ], content, re.IGNORECASE)
+
+    viewers = None
+    if is_live:
+        viewer_match = WATCHING_NOW.search(content)
+        if viewer_match:
+            viewers = _to_int(viewer_match.group(1))
+
+    return {'is_live': is_live, 'viewers': viewers}
+
+
+@register_detector('watch_verify_enhanced', 'watch')
+def detect_watch_verify_enhanced(page):
+    """Verification pass for /streams candidates with a best-effort viewer count"""
+    if page.status_code != 200:
+        return {'is_live': False, 'viewer_count': 0}
+
+    content = page.text
+    is_live = _any_match([
+        r'"isLiveContent":true',
+        r'"isLive":true',
+        r'watching now',
+        r'viewers watching',
+        r'"liveBroadcastDetails"'
+    ], content, re.IGNORECASE)
+
+    viewer_count = 0
+    if is_live:
+        viewer_text = _first_match([
+            r'(\d+(?:,\d+)*)\s+watching now',
+            r'(\d+(?:,\d+)*)\s+viewers watching',
+            r'"viewCount"\s*:\s*"(\d+)"',
+            r'"concurrentViewers"\s*:\s*"(\d+)"'
+        ], content, re.IGNORECASE)
+        if viewer_text:
+            viewer_count = _to_int(viewer_text)
+
+    return {'is_live': is_live, 'viewer_count': viewer_count}
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Feed Pre-check
+Polls each channel's Atom feed with conditional requests and escalates only changed or due channels to the full channel and watch page scan
+"""
+
+import argparse
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from channel_registry import Channel, get_registry
+from scan_engine import YOUTUBE_BASE_URL, ScanEngine
+from stream_record import LiveStream
+
+DEFAULT_STATE_FILE = 'feed_state.json'
+FEED_URL = YOUTUBE_BASE_URL + '/feeds/videos.xml?channel_id={}'
+
+_ATOM = '{http://www.w3.org/2005/Atom}'
+_YT = '{http://www.youtube.com/xml/schemas/2015}'
+
+
+def feed_url(channel_id):
+    return FEED_URL.format(channel_id)
+
+
+def parse_feed(raw):
+    """{video_id: <updated> timestamp} for every entry of an Atom feed"""
+    root = ET.fromstring(raw)
+    entries = {}
+    for entry in root.iter(_ATOM + 'entry'):
+        video_id = entry.findtext(_YT + 'videoId')
+        if video_id:
+            entries[video_id] = entry.findtext(_ATOM + 'updated') or entry.findtext(_ATOM + 'published') or ''
+    return entries
+
+
+class FeedState:
+    """What one channel's feed looked like at its last full scan"""
+
+    __slots__ = ('etag', 'last_modified', 'entries', 'scanned_at', 'streams')
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.entries = {}
+        self.scanned_at = 0
+        self.streams = []
+
+    def to_list(self):
+        return [self.etag, self.last_modified, self.entries, self.scanned_at, self.streams]
+
+    @classmethod
+    def from_list(cls, values):
+        state = cls()
+        state.etag, state.last_modified, state.entries, state.scanned_at, state.streams = values
+        return state
+
+
+class FeedCheck:
+    """Outcome of one channel's pre-check; reason is None when the full scan can be skipped"""
+
+    __slots__ = ('channel_url', 'channel_id', 'reason', 'status', 'etag', 'last_modified', 'entries')
+
+    def __init__(self, channel_url, channel_id, reason=None, status=None, etag=None, last_modified=None,
+                 entries=None):
+        self.channel_url = channel_url
+        self.channel_id = channel_id
+        self.reason = reason
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.entries = entries
+
+
+class FeedPrecheck:
+    """Conditional feed polling in front of the channel-page scan
+
+    Feeds are keyed by resolved channel ID (channel_id_cache.py). A channel is escalated when
+    its ID is unknown, its feed fails, the feed lists a new video or a changed <updated>
+    time (uploads, live broadcasts starting or ending), it had live streams at its last scan
+    and live_recheck_seconds has passed (0 = every sweep, which keeps viewer counts current),
+    or max_age_seconds has passed since its last full scan. Other channels keep the streams
+    of their last full scan. A feed's validators and entries are only committed once the
+    escalated scan completes, so a failed scan is escalated again next sweep.
+
+    Channel IDs come from the network list's registry, so they share its channel_ids.json.
+    """
+
+    def __init__(self, engine, state_path=DEFAULT_STATE_FILE, max_age_seconds=3600, live_recheck_seconds=0,
+                 concurrency=8, network_list='network_list.txt', timeout=10):
+        self.engine = engine
+        self.state_path = state_path
+        self.max_age_seconds = max_age_seconds
+        self.live_recheck_seconds = live_recheck_seconds
+        self.concurrency = concurrency
+        self.id_cache = get_registry(network_list).id_cache
+        self.timeout = timeout
+        self.feeds = {}
+        self.pending = {}
+        self.stats = {}
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def channel_id(self, channel_url):
+        return Channel('', channel_url).channel_id or self.id_cache.peek(channel_url)
+
+    def check(self, channel_url, now=None):
+        """Fetch one channel's feed conditionally and decide whether it needs a full scan"""
+        now = time.time() if now is None else now
+        channel_id = self.channel_id(channel_url)
+        if not channel_id:
+            return FeedCheck(channel_url, None, 'no_channel_id')
+        state = self.feeds.get(channel_id) or FeedState()
+        check = self.read_feed(channel_url, channel_id, state)
+        if check.reason:
+            return check
+
+        if not state.scanned_at or (state.etag is None and not state.entries):
+            # Never scanned, or scanned before its channel ID (and so its feed) was known
+            check.reason = 'first_scan'
+        elif any(video_id not in state.entries for video_id in check.entries):
+            check.reason = 'new_entries'
+        elif any(state.entries[video_id] != updated for video_id, updated in check.entries.items()):
+            check.reason = 'updated_entries'
+        elif state.streams and now - state.scanned_at >= self.live_recheck_seconds:
+            check.reason = 'live'
+        elif now - state.scanned_at >= self.max_age_seconds:
+            check.reason = 'max_age'
+        elif check.status == 200:
+            # Same entries under new validators (e.g. view counts moved): remember them straight away
+            state.etag, state.last_modified = check.etag, check.last_modified
+        return check
+
+    def read_feed(self, channel_url, channel_id, state):
+        """Conditional fetch of one feed; the check carries its entries, or reason 'feed_error'"""
+        try:
+            page = self.engine.fetch_conditional(feed_url(channel_id), state.etag, state.last_modified,
+                                                 self.timeout, circuit=channel_url)
+        except Exception:
+            return FeedCheck(channel_url, channel_id, 'feed_error')
+        check = FeedCheck(channel_url, channel_id, status=page.status_code,
+                          etag=page.headers.get('ETag') or state.etag,
+                          last_modified=page.headers.get('Last-Modified') or state.last_modified)
+
+        if page.status_code == 304:
+            check.entries = state.entries
+        elif page.status_code == 200:
+            try:
+                check.entries = parse_feed(page.raw)
+            except ET.ParseError:
+                check.reason = 'feed_error'
+        else:
+            check.reason = 'feed_error'
+        return check
+
+    def partition(self, networks):
+        """(networks to scan fully, {network name: carried-over streams}) for (network name, channel URL) pairs
+
+        Each distinct channel URL is checked once, concurrently.
+        """
+        urls = list(dict.fromkeys(channel_url for _, channel_url in networks))
+        now = time.time()
+        with ThreadPoolExecutor(max_workers=max(self.concurrency, 1)) as pool:
+            checks = dict(zip(urls, pool.map(lambda url: self.check(url, now), urls)))
+
+        self.pending = {}
+        self.stats = {'feeds': 0, 'not_modified': 0, 'escalated': {}, 'skipped': 0}
+        to_scan = []
+        carried = {}
+        for channel_url, check in checks.items():
+            if check.status is not None:
+                self.stats['feeds'] += 1
+                self.stats['not_modified'] += check.status == 304
+            if check.reason:
+                self.pending[channel_url] = check
+                self.stats['escalated'][check.reason] = self.stats['escalated'].get(check.reason, 0) + 1
+            else:
+                self.stats['skipped'] += 1
+        for network_name, channel_url in networks:
+            check = checks[channel_url]
+            if check.reason:
+                to_scan.append((network_name, channel_url))
+            else:
+                carried[network_name] = self._carried_streams(self.feeds[check.channel_id], network_name)
+        return to_scan, carried
+
+    def _carried_streams(self, state, network_name):
+        streams = [LiveStream.from_dict(data) for data in state.streams]
+        for stream in streams:
+            stream.network = network_name
+        return streams
+
+    def record_scan(self, channel_url, live_streams, resolve_id=None, now=None):
+        """Commit the feed seen before a completed full scan, with the streams that scan found
+
+        resolve_id(channel_url) fills in a channel ID that was unknown at pre-check time
+        (the scan has just fetched the channel page, which carries it). Its feed is then read
+        straight away, so the channel can be skipped from the next sweep on.
+        """
+        check = self.pending.pop(channel_url, None)
+        channel_id = check.channel_id if check else self.channel_id(channel_url)
+        if not channel_id and resolve_id is not None:
+            channel_id = self.id_cache.resolve(channel_url, resolve_id)
+        if not channel_id:
+            return
+        state = self.feeds.get(channel_id) or FeedState()
+        if (check is None or check.channel_id is None) and not state.entries:
+            check = self.read_feed(channel_url, channel_id, state)
+        if check is not None and check.entries is not None:
+            state.etag, state.last_modified, state.entries = check.etag, check.last_modified, check.entries
+        state.scanned_at = int(time.time() if now is None else now)
+        state.streams = [stream.to_dict() for stream in live_streams]
+        self.feeds[channel_id] = state
+
+    def summary(self):
+        stats = self.stats
+        if not stats:
+            return "no feeds checked"
+        escalated = sum(stats['escalated'].values())
+        reasons = ', '.join(f"{reason} {count}" for reason, count in sorted(stats['escalated'].items()))
+        return (f"{stats['feeds']} feeds ({stats['not_modified']} not modified), "
+                f"{escalated} channels escalated{f' ({reasons})' if reasons else ''}, {stats['skipped']} skipped")
+
+    def save(self):
+        if not self.state_path:
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({channel_id: state.to_list() for channel_id, state in self.feeds.items()}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.state_path)
+
+    def load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self.feeds = {channel_id: FeedState.from_list(values) for channel_id, values in data.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed Pre-check')
+    parser.add_argument('command', choices=['check', 'state'],
+                        help='check = poll every feed and show which channels would be scanned (state is left '
+                             'unchanged), state = channels remembered from previous sweeps')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help='Feed state file')
+    parser.add_argument('--base-url', help='Fetch from this host instead of YouTube (e.g. the stand-in server)')
+    parser.add_argument('--max-age', type=float, default=60, help='Minutes before a channel is scanned regardless')
+
+    args = parser.parse_args()
+
+    if args.command == 'state':
+        precheck = FeedPrecheck(None, args.state_file, network_list=args.network_list)
+        if not precheck.feeds:
+            print(f"⚪ No feed state in {args.state_file}")
+        for channel_id, state in precheck.feeds.items():
+            scanned = datetime.fromtimestamp(state.scanned_at).isoformat(timespec='seconds')
+            print(f"📰 {channel_id}: {len(state.entries)} entries, {len(state.streams)} live, scanned {scanned}")
+        return
+
+    with ScanEngine(base_url=args.base_url) as engine:
+        precheck = FeedPrecheck(engine, args.state_file, max_age_seconds=args.max_age * 60,
+                                network_list=args.network_list)
+        networks = engine.parse_network_list(args.network_list)
+        to_scan, _ = precheck.partition(networks)
+        for network_name, channel_url in networks:
+            check = precheck.pending.get(channel_url)
+            if check is not None:
+                print(f"🔎 {network_name}: scan ({check.reason})")
+            else:
+                print(f"⏭️ {network_name}: unchanged")
+        print(f"\n📰 {precheck.summary()}")
+
+
+if __name__ == "__main__":
+    main()
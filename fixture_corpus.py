@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Offline Fixture Corpus
+Records channel, /streams and watch pages once so scanners can be run and measured without hitting YouTube
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from scan_engine import ScanEngine
+from detectors import classify_url, watch_url
+
+DEFAULT_FIXTURE_DIR = 'fixtures'
+
+
+class FixtureCorpus:
+    """A directory of gzipped pages plus a manifest keyed by URL"""
+
+    def __init__(self, root=DEFAULT_FIXTURE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = {'recorded_at': None, 'networks': [], 'pages': {}}
+        self._cache = {}
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def __len__(self):
+        return len(self.manifest['pages'])
+
+    def __contains__(self, url):
+        return url in self.manifest['pages']
+
+    def urls(self, kind=None):
+        """Recorded URLs, optionally only those of one endpoint type"""
+        return [url for url, entry in self.manifest['pages'].items()
+                if kind is None or entry['kind'] == kind]
+
+    def add(self, url, status_code, raw):
+        """Store one page body (gzipped) and record it in the manifest"""
+        kind = classify_url(url)
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.html.gz'
+        os.makedirs(os.path.join(self.root, kind), exist_ok=True)
+
+        with gzip.open(os.path.join(self.root, kind, name), 'wb') as f:
+            f.write(raw)
+
+        self.manifest['pages'][url] = {
+            'kind': kind,
+            'file': f'{kind}/{name}',
+            'status': status_code,
+            'bytes': len(raw)
+        }
+        self._cache[url] = (status_code, raw)
+
+    def load(self, url):
+        """Return (status_code, raw bytes) for a recorded URL, or None"""
+        if url in self._cache:
+            return self._cache[url]
+
+        entry = self.manifest['pages'].get(url)
+        if entry is None:
+            return None
+
+        with gzip.open(os.path.join(self.root, entry['file']), 'rb') as f:
+            page = (entry['status'], f.read())
+        self._cache[url] = page
+        return page
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest['recorded_at'] = datetime.now().isoformat()
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+
+    def record(self, networks, max_videos=5, delay=1.0, engine=None):
+        """Fetch channel, /streams and the first watch pages of each network into the corpus"""
+        engine = engine or ScanEngine()
+        self.manifest['networks'] = [list(network) for network in networks]
+
+        for i, (network_name, channel_url) in enumerate(networks):
+            print(f"[{i+1}/{len(networks)}] {network_name}...", end=" ", flush=True)
+            urls = [channel_url, channel_url.rstrip('/') + '/streams']
+
+            try:
+                page = engine.fetch(channel_url)
+                self.add(channel_url, page.status_code, page.raw)
+                video_ids = engine.run(channel_url, 'video_ids')
+                urls = urls[1:] + [watch_url(video_id) for video_id in video_ids[:max_videos]]
+
+                for url in urls:
+                    page = engine.fetch(url, timeout=10)
+                    self.add(url, page.status_code, page.raw)
+                    time.sleep(delay)
+
+                print(f"✅ {len(urls) + 1} pages")
+            except Exception as e:
+                print(f"⚠️ {e}")
+
+        self.save()
+
+
+class FixtureResponse:
+    """Just enough of requests.Response for the scan engine"""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = 'utf-8'
+        self.reason = 'OK' if status_code == 200 else 'Not Recorded' if status_code == 404 else ''
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class FixtureSession:
+    """Drop-in for requests.Session that answers from a fixture corpus (404 for unknown URLs)"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.headers = {}
+        self.misses = []
+
+    def get(self, url, timeout=None, **kwargs):
+        page = self.corpus.load(url)
+        if page is None:
+            self.misses.append(url)
+            return FixtureResponse(url, 404, b'')
+        return FixtureResponse(url, page[0], page[1])
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline Fixture Corpus')
+    parser.add_argument('command', choices=['record', 'list'], help='Record a new corpus or list the current one')
+    parser.add_argument('--dir', default=DEFAULT_FIXTURE_DIR, help='Fixture directory')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--max-videos', type=int, default=5, help='Watch pages recorded per network')
+    parser.add_argument('--delay', type=float, default=1.0, help='Seconds between requests while recording')
+
+    args = parser.parse_args()
+    corpus = FixtureCorpus(args.dir)
+
+    if args.command == 'record':
+        engine = ScanEngine()
+        networks = engine.parse_network_list(args.network_list)
+        print(f"🎙️ Recording fixtures for {len(networks)} networks into {args.dir}/")
+        print("=" * 60)
+        corpus.record(networks, max_videos=args.max_videos, delay=args.delay, engine=engine)
+        print(f"\n💾 Recorded {len(corpus)} pages")
+
+    elif args.command == 'list':
+        if not len(corpus):
+            print(f"❌ No fixtures in {args.dir}/ - run: python3 fixture_corpus.py record")
+            return
+        print(f"📦 Corpus recorded at {corpus.manifest['recorded_at']}")
+        for kind in ['channel', 'streams', 'watch', 'feed', 'other']:
+            urls = corpus.urls(kind)
+            if urls:
+                total = sum(corpus.manifest['pages'][url]['bytes'] for url in urls)
+                print(f"   • {kind}: {len(urls)} pages ({total:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
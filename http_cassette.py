@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+HTTP Cassette Record/Replay
+Captures every request and response of a sweep into a compressed, content-addressed archive and replays it deterministically
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import requests
+
+# Response headers worth keeping for replay (conditional requests, rate limiting)
+KEPT_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Retry-After', 'Cache-Control']
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class CassetteResponse:
+    """Replayed response exposing the parts of requests.Response the scanners use"""
+
+    def __init__(self, url, status_code, content, reason='', encoding='utf-8', headers=None, elapsed_ms=0):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.reason = reason
+        self.encoding = encoding
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.elapsed = timedelta(milliseconds=elapsed_ms)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error: {self.reason} for url: {self.url}", response=self)
+
+
+class Cassette:
+    """Zip archive of interactions (index.json) plus deduplicated bodies stored by SHA-256"""
+
+    def __init__(self, path):
+        self.path = path
+        self.interactions = []
+        self.bodies = {}
+        self.meta = {}
+
+    @classmethod
+    def load(cls, path):
+        cassette = cls(path)
+        with zipfile.ZipFile(path) as archive:
+            index = json.loads(archive.read('index.json'))
+            cassette.meta = index.get('meta', {})
+            cassette.interactions = index['interactions']
+            for name in archive.namelist():
+                if name.startswith('bodies/'):
+                    cassette.bodies[name[len('bodies/'):]] = archive.read(name)
+        return cassette
+
+    def add(self, method, url, response, elapsed_ms, offset_ms):
+        content = response.content or b''
+        digest = hashlib.sha256(content).hexdigest()
+        self.bodies.setdefault(digest, content)
+        self.interactions.append({
+            'method': method,
+            'url': url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'encoding': response.encoding,
+            'headers': {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            'body': digest,
+            'elapsed_ms': round(elapsed_ms, 1),
+            'offset_ms': round(offset_ms, 1),
+        })
+
+    def save(self):
+        self.meta.setdefault('recorded_at', datetime.now().isoformat())
+        index = {'meta': self.meta, 'interactions': self.interactions}
+        tmp_path = self.path + '.tmp'
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            archive.writestr('index.json', json.dumps(index))
+            for digest, content in self.bodies.items():
+                archive.writestr(f'bodies/{digest}', content)
+        os.replace(tmp_path, self.path)
+
+    def response_for(self, interaction):
+        return CassetteResponse(
+            interaction['url'], interaction['status'], self.bodies[interaction['body']],
+            interaction.get('reason', ''), interaction.get('encoding') or 'utf-8',
+            interaction.get('headers'), interaction.get('elapsed_ms', 0))
+
+
+class CassetteSession:
+    """Wraps a requests.Session to record every GET, or replays them without any network access
+
+    Replay answers each URL with its recorded responses in order (repeating the last one);
+    timing='original' sleeps for the recorded elapsed time, timing='zero' returns immediately.
+    """
+
+    def __init__(self, path, mode='replay', session=None, timing='zero'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if timing not in ('zero', 'original'):
+            raise ValueError(f"Unknown cassette timing: {timing}")
+
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.session = session or requests.Session()
+        self.headers = self.session.headers
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.misses = 0
+
+        if mode == 'record':
+            self.cassette = Cassette(path)
+            atexit.register(self.save)
+        else:
+            self.cassette = Cassette.load(path)
+            self._replay = {}
+            for interaction in self.cassette.interactions:
+                self._replay.setdefault((interaction['method'], interaction['url']), []).append(interaction)
+            self._positions = {}
+
+    @property
+    def skip_delays(self):
+        """Scanners drop their politeness sleeps when replaying as fast as possible"""
+        return self.mode == 'replay' and self.timing == 'zero'
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        if self.mode == 'record':
+            start = time.monotonic()
+            response = self.session.request(method, url, **kwargs)
+            elapsed_ms = (time.monotonic() - start) * 1000
+            with self._lock:
+                self.cassette.add(method, url, response, elapsed_ms, (start - self._started) * 1000)
+            return response
+
+        key = (method, url)
+        with self._lock:
+            recorded = self._replay.get(key)
+            if not recorded:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {method} {url}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            interaction = recorded[min(position, len(recorded) - 1)]
+
+        if self.timing == 'original':
+            time.sleep(interaction.get('elapsed_ms', 0) / 1000)
+        return self.cassette.response_for(interaction)
+
+    def save(self):
+        if self.mode == 'record':
+            with self._lock:
+                self.cassette.save()
+
+    def close(self):
+        self.save()
+        self.session.close()
+
+
+def session_from_environment(session):
+    """Wrap a session according to SCANNER_CASSETTE / _MODE / _TIMING, if set"""
+    path = os.environ.get('SCANNER_CASSETTE')
+    if not path:
+        return session
+    return CassetteSession(path,
+                           mode=os.environ.get('SCANNER_CASSETTE_MODE', 'replay'),
+                           session=session,
+                           timing=os.environ.get('SCANNER_CASSETTE_TIMING', 'zero'))
+
+
+def print_info(path):
+    cassette = Cassette.load(path)
+    interactions = cassette.interactions
+    raw_bytes = sum(len(cassette.bodies[i['body']]) for i in interactions)
+    stored_bytes = sum(len(body) for body in cassette.bodies.values())
+    archive_bytes = os.path.getsize(path)
+    duration_ms = max((i['offset_ms'] + i['elapsed_ms'] for i in interactions), default=0)
+
+    print(f"📼 {path}")
+    print(f"   Recorded at: {cassette.meta.get('recorded_at', 'unknown')}")
+    print(f"   Interactions: {len(interactions)} ({len(set(i['url'] for i in interactions))} unique URLs)")
+    print(f"   Bodies: {len(cassette.bodies)} unique, {raw_bytes:,} bytes served, {stored_bytes:,} stored")
+    print(f"   Archive: {archive_bytes:,} bytes ({archive_bytes / max(raw_bytes, 1):.1%} of served)")
+    print(f"   Live duration: {duration_ms / 1000:.1f} s")
+
+    statuses = {}
+    for interaction in interactions:
+        statuses[interaction['status']] = statuses.get(interaction['status'], 0) + 1
+    print(f"   Statuses: {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+
+
+def compare_detectors(path, detector_names):
+    """Replay every recorded watch page through several detectors and report where they disagree"""
+    from detectors import get_detector
+    from scan_engine import PageModel
+
+    cassette = Cassette.load(path)
+    disagreements = 0
+    pages = 0
+
+    for interaction in cassette.interactions:
+        if '/watch?' not in interaction['url']:
+            continue
+        pages += 1
+        page = PageModel(interaction['url'], cassette.bodies[interaction['body']], interaction['status'])
+
+        verdicts = {}
+        for name in detector_names:
+            result = get_detector(name)(page) or {'is_live': False}
+            viewers = result.get('viewers', result.get('viewer_count'))
+            verdicts[name] = (bool(result.get('is_live')), viewers)
+
+        if len(set(verdicts.values())) > 1:
+            disagreements += 1
+            print(f"\n⚠️ {interaction['url']}")
+            for name, (is_live, viewers) in verdicts.items():
+                print(f"   {name:<28} live={str(is_live):<5} viewers={viewers}")
+
+    print(f"\n📊 {disagreements} of {pages} watch pages had disagreeing detectors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP Cassette Record/Replay')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a scanner script while recording or replaying',
+                                       usage='%(prog)s [--record] [--timing {zero,original}] cassette -- script [args...]')
+    run_parser.add_argument('cassette', help='Cassette file')
+    run_parser.add_argument('--record', action='store_true', help='Record instead of replay')
+    run_parser.add_argument('--timing', choices=['zero', 'original'], default='zero',
+                            help='Replay timing (zero = as fast as possible)')
+
+    info_parser = subparsers.add_parser('info', help='Summarize a cassette')
+    info_parser.add_argument('cassette', help='Cassette file')
+
+    compare_parser = subparsers.add_parser('compare', help='Run watch-page detectors over a cassette and show disagreements')
+    compare_parser.add_argument('cassette', help='Cassette file')
+    compare_parser.add_argument('--detectors',
+                                default='watch_status,watch_status_comprehensive,watch_live_manual',
+                                help='Comma-separated watch-page detectors')
+
+    # Everything after "--" is the scanner command line for `run`
+    argv = sys.argv[1:]
+    script = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, script = argv[:split], argv[split + 1:]
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        print_info(args.cassette)
+
+    elif args.command == 'compare':
+        compare_detectors(args.cassette, [name.strip() for name in args.detectors.split(',') if name.strip()])
+
+    elif args.command == 'run':
+        if not script:
+            parser.error('run needs a scanner script, e.g. run sweep.cassette -- auto_refresh_scanner.py --quick')
+
+        env = dict(os.environ,
+                   SCANNER_CASSETTE=os.path.abspath(args.cassette),
+                   SCANNER_CASSETTE_MODE='record' if args.record else 'replay',
+                   SCANNER_CASSETTE_TIMING=args.timing)
+
+        action = 'Recording' if args.record else f"Replaying ({args.timing} timing)"
+        print(f"📼 {action}: {args.cassette}")
+        start = time.monotonic()
+        code = subprocess.call([sys.executable] + script, env=env)
+        print(f"\n⏱️ Finished in {time.monotonic() - start:.1f} s (exit code {code})")
+        sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
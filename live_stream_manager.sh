@@ -19,8 +19,12 @@ PYTHON_CMD="python3"
 AUTO_SCANNER="auto_refresh_scanner.py"
 ADVANCED_DETECTOR="advanced_live_detector.py"
 COMPREHENSIVE_SCANNER="comprehensive_live_scanner.py"
+DAEMON_CONTROL="daemon_control.py"
+SCAN_ARCHIVE="scan_archive.py"
+SCAN_QUERY="scan_query.py"
 RESULTS_FILE="latest_live_streams.json"
 QUICK_RESULTS_FILE="quick_live_test_results.json"
+METRICS_PORT="${METRICS_PORT:-}"  # Set to expose Prometheus metrics from monitor/schedule
 
 # Function to print colored output
 print_header() {
@@ -89,13 +93,18 @@ quick_scan() {
     fi
 }
 
-# Full scan function
+# Full scan function (pass --resume to continue an interrupted scan)
 full_scan() {
+    local resume_flag=""
+    if [[ "$1" == "--resume" ]]; then
+        resume_flag="--resume"
+    fi
+    
     print_header
     print_info "Starting comprehensive scan (5-10 minutes)..."
     echo ""
     
-    $PYTHON_CMD "$COMPREHENSIVE_SCANNER"
+    $PYTHON_CMD "$COMPREHENSIVE_SCANNER" $resume_flag
     
     if [[ -f "comprehensive_live_streams.json" ]]; then
         echo ""
@@ -131,7 +140,7 @@ monitor() {
     print_warning "Press Ctrl+C to stop monitoring"
     echo ""
     
-    $PYTHON_CMD "$AUTO_SCANNER" --mode continuous --interval "$interval"
+    $PYTHON_CMD "$AUTO_SCANNER" --mode continuous --interval "$interval" ${METRICS_PORT:+--metrics-port "$METRICS_PORT"}
 }
 
 # Scheduled monitoring
@@ -141,7 +150,7 @@ schedule_monitor() {
     print_warning "Press Ctrl+C to stop monitoring"
     echo ""
     
-    $PYTHON_CMD "$AUTO_SCANNER" --mode scheduled
+    $PYTHON_CMD "$AUTO_SCANNER" --mode scheduled ${METRICS_PORT:+--metrics-port "$METRICS_PORT"}
 }
 
 # Show summary of results
@@ -231,6 +240,9 @@ cleanup() {
     
     local cleaned=0
     
+    # Roll refresh snapshots older than a day into the columnar archive before anything is deleted
+    $PYTHON_CMD "$SCAN_ARCHIVE" compact
+    
     # Remove old timestamped files
     find . -name "*live_streams_*.json" -mtime +7 -delete 2>/dev/null && cleaned=1
     find . -name "*scan_results_*.json" -mtime +7 -delete 2>/dev/null && cleaned=1
@@ -249,11 +261,8 @@ status() {
     print_info "Live Stream Detection System Status"
     echo ""
     
-    # Check if monitoring is running
-    if pgrep -f "$AUTO_SCANNER" > /dev/null; then
-        print_success "Monitoring is currently RUNNING"
-        echo -e "${CYAN}   Process ID: $(pgrep -f "$AUTO_SCANNER")${NC}"
-    else
+    # Ask the running monitor over its control socket (answers from memory)
+    if ! $PYTHON_CMD "$DAEMON_CONTROL" status; then
         print_info "No monitoring currently running"
     fi
     
@@ -268,6 +277,17 @@ status() {
         print_warning "No previous scan results found"
     fi
     
+    # Sweep metrics from the running daemon
+    if [[ -n "$METRICS_PORT" ]] && command -v curl &> /dev/null; then
+        local metrics=$(curl -s --max-time 2 "http://localhost:$METRICS_PORT/metrics" 2>/dev/null || true)
+        if [[ -n "$metrics" ]]; then
+            local last_sweep=$(echo "$metrics" | awk '/^scanner_last_sweep_duration_seconds /{print $2}')
+            local interval=$(echo "$metrics" | awk '/^scanner_sweep_interval_seconds /{print $2}')
+            local live_total=$(echo "$metrics" | awk '/^scanner_live_streams\{/{sum += $2} END {print sum + 0}')
+            echo -e "${CYAN}   Last sweep: ${last_sweep:-?}s (interval ${interval:-?}s), $live_total live streams${NC}"
+        fi
+    fi
+    
     # Check disk space for results
     local disk_usage=$(du -sh . 2>/dev/null | cut -f1 || echo "Unknown")
     echo -e "${CYAN}   Directory size: $disk_usage${NC}"
@@ -277,18 +297,23 @@ status() {
 stop_monitor() {
     print_header
     
-    local pids=$(pgrep -f "$AUTO_SCANNER" 2>/dev/null || true)
+    # The lock file names the one running monitor
+    local pid=$($PYTHON_CMD "$DAEMON_CONTROL" pid 2>/dev/null || true)
     
-    if [[ -n "$pids" ]]; then
-        print_info "Stopping monitoring processes..."
-        echo "$pids" | xargs kill 2>/dev/null || true
-        sleep 2
+    if [[ -n "$pid" ]]; then
+        print_info "Stopping monitor (PID $pid)..."
+        $PYTHON_CMD "$DAEMON_CONTROL" stop > /dev/null 2>&1 || kill "$pid" 2>/dev/null || true
         
-        # Force kill if still running
-        local still_running=$(pgrep -f "$AUTO_SCANNER" 2>/dev/null || true)
-        if [[ -n "$still_running" ]]; then
-            echo "$still_running" | xargs kill -9 2>/dev/null || true
-            print_warning "Force stopped monitoring processes"
+        # Give a sweep in progress a moment to finish, then terminate
+        for _ in 1 2 3 4 5 6 7 8 9 10; do
+            kill -0 "$pid" 2>/dev/null || break
+            sleep 1
+        done
+        if kill -0 "$pid" 2>/dev/null; then
+            kill "$pid" 2>/dev/null || true
+            sleep 2
+            kill -0 "$pid" 2>/dev/null && kill -9 "$pid" 2>/dev/null || true
+            print_warning "Force stopped monitoring process"
         else
             print_success "Monitoring stopped gracefully"
         fi
@@ -297,6 +322,21 @@ stop_monitor() {
     fi
 }
 
+# Profile the running monitor (CPU for the next sweep, or toggle memory diffs)
+profile_monitor() {
+    local action=${1:-cpu}
+    print_header
+    
+    local pid=$($PYTHON_CMD "$DAEMON_CONTROL" pid 2>/dev/null || true)
+    if [[ -z "$pid" ]]; then
+        print_info "No monitoring processes found running"
+        return
+    fi
+    
+    $PYTHON_CMD scan_profiler.py "$pid" "$action"
+    print_info "Output appears in profiles/ after the next sweep"
+}
+
 # Show help
 show_help() {
     print_header
@@ -306,20 +346,28 @@ show_help() {
     echo ""
     echo -e "${YELLOW}COMMANDS:${NC}"
     echo -e "  ${GREEN}quick${NC}              Quick scan (2-3 minutes, fewer videos per channel)"
-    echo -e "  ${GREEN}full${NC}               Comprehensive scan (5-10 minutes, thorough)"
+    echo -e "  ${GREEN}full [--resume]${NC}    Comprehensive scan (5-10 minutes, thorough; --resume continues an interrupted one)"
     echo -e "  ${GREEN}test${NC}               Test scan on known channels"
     echo -e "  ${GREEN}monitor [interval]${NC} Continuous monitoring (default: every 15 minutes)"
     echo -e "  ${GREEN}schedule${NC}           Scheduled monitoring (every 30 minutes)"
     echo -e "  ${GREEN}view${NC}               View latest results"
+    echo -e "  ${GREEN}query [filters]${NC}    Search scan history (--network, --video, --since 7d, --min-viewers, --group, --format)"
     echo -e "  ${GREEN}status${NC}             Show system status"
     echo -e "  ${GREEN}stop${NC}               Stop any running monitoring"
-    echo -e "  ${GREEN}cleanup${NC}            Clean up old result files"
+    echo -e "  ${GREEN}trigger${NC}            Start a sweep of the running monitor now"
+    echo -e "  ${GREEN}pause${NC} / ${GREEN}resume${NC}     Pause or resume the running monitor's sweeps"
+    echo -e "  ${GREEN}interval <minutes>${NC} Change the running monitor's sweep interval"
+    echo -e "  ${GREEN}rescan <network>${NC}   Re-scan one network now, outside the sweep cycle"
+    echo -e "  ${GREEN}stats${NC}              Dump the running monitor's in-memory stats"
+    echo -e "  ${GREEN}profile [cpu|memory]${NC} Profile the next sweep of the running monitor"
+    echo -e "  ${GREEN}cleanup${NC}            Archive old snapshots and clean up old result files"
     echo -e "  ${GREEN}help${NC}               Show this help message"
     echo ""
     echo -e "${YELLOW}EXAMPLES:${NC}"
     echo "  ./live_stream_manager.sh quick          # Run quick scan"
     echo "  ./live_stream_manager.sh monitor 10     # Monitor every 10 minutes"
     echo "  ./live_stream_manager.sh view           # View latest results"
+    echo "  ./live_stream_manager.sh query --network \"Sky News\" --group video   # When was Sky News live?"
     echo "  ./live_stream_manager.sh stop           # Stop monitoring"
     echo ""
     echo -e "${YELLOW}FILES:${NC}"
@@ -341,7 +389,7 @@ main() {
             quick_scan
             ;;
         "full")
-            full_scan
+            full_scan "$2"
             ;;
         "test")
             test_scan
@@ -355,12 +403,27 @@ main() {
         "view")
             view_results
             ;;
+        "query")
+            $PYTHON_CMD "$SCAN_QUERY" "${@:2}"
+            ;;
         "status")
             status
             ;;
         "stop")
             stop_monitor
             ;;
+        "trigger"|"pause"|"resume"|"stats")
+            $PYTHON_CMD "$DAEMON_CONTROL" "$1"
+            ;;
+        "interval")
+            $PYTHON_CMD "$DAEMON_CONTROL" interval "${2:?minutes required}"
+            ;;
+        "rescan")
+            $PYTHON_CMD "$DAEMON_CONTROL" rescan "${2:?network name required}"
+            ;;
+        "profile")
+            profile_monitor "${2:-cpu}"
+            ;;
         "cleanup")
             cleanup
             ;;
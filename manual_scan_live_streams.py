@@ -4,50 +4,23 @@ Alternative YouTube Live Stream Scanner
 Checks main channel pages and videos for live content with manual verification
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import re
-import time
 from datetime import datetime
-from urllib.parse import urljoin
+
+from scan_engine import ScanEngine
+from scan_trace import traced
 
 class ManualYouTubeLiveStreamScanner:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+    def __init__(self, engine=None):
+        self.engine = engine or ScanEngine()
+        self.session = self.engine.session
         self.results = []
         
     def parse_network_list(self, filename):
         """Parse the network list file to extract channel URLs"""
-        networks = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        for i, line in enumerate(lines):
-            line = line.strip()
-            # Skip first line (header) and any empty lines
-            if i == 0 or not line:
-                continue
-            # Process lines with tab-separated values
-            if '\t' in line:
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    network_name = parts[0].strip()
-                    url = parts[1].strip()
-                    if url.startswith('https://www.youtube.com/'):
-                        networks.append((network_name, url))
-        
-        return networks
+        return self.engine.parse_network_list(filename)
     
+    @traced('channel', 'network', 'url')
     def check_channel_for_live_content(self, network_name, channel_url):
         """Check multiple endpoints for live content"""
         print(f"\n🔍 Checking {network_name}")
@@ -73,21 +46,11 @@ class ManualYouTubeLiveStreamScanner:
         for endpoint_name, url in endpoints_to_check:
             try:
                 print(f"   📄 Checking {endpoint_name}...")
-                response = self.session.get(url, timeout=12)
+                page = self.engine.fetch(url, timeout=12)
                 
-                if response.status_code == 200:
+                if page.status_code == 200:
                     # Look for live content indicators
-                    content = response.text.lower()
-                    
-                    # Count various live indicators
-                    live_indicators = {
-                        'live_now': content.count('live now'),
-                        'watching_now': content.count('watching now'),
-                        'viewers_watching': content.count('viewers watching'),
-                        'streaming_live': content.count('streaming live'),
-                        'live_badge': content.count('live'),
-                        'concurrent_viewers': content.count('concurrent')
-                    }
+                    live_indicators = self.engine.run(url, 'live_indicator_counts')
                     
                     total_indicators = sum(live_indicators.values())
                     
@@ -95,7 +58,7 @@ class ManualYouTubeLiveStreamScanner:
                         print(f"   ✅ {endpoint_name}: Found {total_indicators} live indicators")
                         
                         # Try to extract specific video URLs
-                        video_urls = self.extract_video_urls_from_content(response.text)
+                        video_urls = self.extract_video_urls(url)
                         
                         for video_url in video_urls[:5]:  # Check top 5 videos
                             live_info = self.check_specific_video_for_live(video_url)
@@ -106,16 +69,16 @@ class ManualYouTubeLiveStreamScanner:
                         print(f"   ⚪ {endpoint_name}: {total_indicators} live indicators (below threshold)")
                         
                         # Still check recent videos
-                        video_urls = self.extract_video_urls_from_content(response.text)
+                        video_urls = self.extract_video_urls(url)
                         for video_url in video_urls[:3]:
                             video_info = self.get_basic_video_info(video_url)
                             if video_info:
                                 results['recent_videos'].append(video_info)
                 
                 else:
-                    print(f"   ❌ {endpoint_name}: HTTP {response.status_code}")
+                    print(f"   ❌ {endpoint_name}: HTTP {page.status_code}")
                 
-                time.sleep(1)  # Be respectful
+                self.engine.pause(1)  # Be respectful
                 
             except Exception as e:
                 print(f"   ⚠️  {endpoint_name}: Error - {e}")
@@ -123,81 +86,22 @@ class ManualYouTubeLiveStreamScanner:
         self.results.append(results)
         return results
     
-    def extract_video_urls_from_content(self, content):
-        """Extract video URLs from page content"""
-        video_urls = []
-        
-        # Look for video URLs in various formats
-        patterns = [
-            r'"/watch\?v=([a-zA-Z0-9_-]{11})"',
-            r'"videoId":"([a-zA-Z0-9_-]{11})"',
-            r'/watch\?v=([a-zA-Z0-9_-]{11})',
-        ]
-        
-        video_ids = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, content)
-            video_ids.update(matches)
-        
-        for video_id in list(video_ids)[:10]:  # Limit to 10 videos
-            video_urls.append(f"https://www.youtube.com/watch?v={video_id}")
-        
-        return video_urls
+    def extract_video_urls(self, page_url):
+        """Extract video URLs from an already fetched page"""
+        video_ids = self.engine.run(page_url, 'video_ids')
+        return [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids[:10]]  # Limit to 10 videos
     
+    @traced('video', 'url')
     def check_specific_video_for_live(self, video_url):
         """Check if a specific video is currently live"""
         try:
             print(f"     🎥 Checking video: {video_url}")
-            response = self.session.get(video_url, timeout=10)
-            
-            if response.status_code != 200:
-                return None
-            
-            content = response.text
+            live_info = self.engine.run(video_url, 'watch_live_manual', timeout=10)
             
-            # Look for live indicators
-            is_live = False
-            viewer_count = 0
-            title = "Unknown"
-            
-            # Extract title
-            title_match = re.search(r'"title":"([^"]+)"', content)
-            if title_match:
-                title = title_match.group(1)
-            
-            # Check for live status
-            live_patterns = [
-                r'"isLiveContent":true',
-                r'"isLive":true',
-                r'isLivePlayback.*?true',
-                r'"liveBroadcastDetails"'
-            ]
-            
-            for pattern in live_patterns:
-                if re.search(pattern, content):
-                    is_live = True
-                    break
-            
-            # Extract viewer count if live
-            if is_live:
-                viewer_patterns = [
-                    r'"viewCount":"(\d+)"',
-                    r'(\d+(?:,\d+)*)\s+watching now',
-                    r'(\d+(?:,\d+)*)\s+viewers'
-                ]
-                
-                for pattern in viewer_patterns:
-                    match = re.search(pattern, content, re.IGNORECASE)
-                    if match:
-                        viewer_count = int(match.group(1).replace(',', ''))
-                        break
-            
-            if is_live:
+            if live_info:
                 return {
                     'url': video_url,
-                    'title': title,
-                    'is_live': True,
-                    'viewers': viewer_count,
+                    **live_info,
                     'checked_at': datetime.now().isoformat()
                 }
         
@@ -209,27 +113,19 @@ class ManualYouTubeLiveStreamScanner:
     def get_basic_video_info(self, video_url):
         """Get basic info about a video"""
         try:
-            response = self.session.get(video_url, timeout=8)
-            if response.status_code == 200:
-                content = response.text
-                
-                title_match = re.search(r'"title":"([^"]+)"', content)
-                title = title_match.group(1) if title_match else "Unknown"
-                
-                view_match = re.search(r'"viewCount":"(\d+)"', content)
-                views = int(view_match.group(1)) if view_match else 0
-                
+            video_info = self.engine.run(video_url, 'watch_info', timeout=8)
+            if video_info:
                 return {
                     'url': video_url,
-                    'title': title,
-                    'views': views,
+                    **video_info,
                     'checked_at': datetime.now().isoformat()
                 }
-        except:
+        except Exception:
             pass
         
         return None
     
+    @traced('sweep')
     def scan_all_channels(self, network_list_file):
         """Scan all channels"""
         networks = self.parse_network_list(network_list_file)
@@ -252,7 +148,7 @@ class ManualYouTubeLiveStreamScanner:
                         for stream in result['live_streams']
                     ])
                 
-                time.sleep(2)  # Be respectful to servers
+                self.engine.pause(2)  # Be respectful to servers
                 
             except Exception as e:
                 print(f"   ❌ Failed to scan {network_name}: {e}")
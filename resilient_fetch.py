@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Resilient Fetching
+Classified retries with exponential backoff and jitter, plus per-host and per-channel circuit breakers that fail fast
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from http_cassette import CassetteMiss
+
+# Status codes worth another attempt: rate limiting and server-side failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of making a request while a circuit breaker is open"""
+
+
+class RetryPolicy:
+    """Which failures to retry and how long to back off between attempts"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, max_retry_after=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def retryable_error(self, error):
+        # Timeouts and dropped connections are transient; a cassette miss or open circuit is not
+        if isinstance(error, (CassetteMiss, CircuitOpenError)):
+            return False
+        return isinstance(error, (requests.Timeout, requests.ConnectionError))
+
+    def retryable_status(self, status_code):
+        return status_code in RETRYABLE_STATUS
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (1-based): Retry-After, else full jitter"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, fails fast until reset_timeout, then lets one trial through"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial that was not used"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Count a failure; returns True if this failure opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if was_open or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+            return not was_open and self.opened_at is not None
+
+
+class RateBudget:
+    """Token bucket limiting requests per minute, with bursts up to `burst` requests"""
+
+    def __init__(self, requests_per_minute, burst=None, sleep=time.sleep):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst or max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.sleep = sleep
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            self.sleep(wait)
+
+
+class ResilientFetcher:
+    """Performs GETs through retries and the breakers for the URL's host and an optional channel"""
+
+    def __init__(self, policy=None, sleep=time.sleep, host_breaker=(5, 60.0), channel_breaker=(3, 300.0),
+                 rate_limiter=None):
+        self.policy = policy or RetryPolicy()
+        self.sleep = sleep
+        # Optional RateBudget every attempt (retries included) has to pass
+        self.rate_limiter = rate_limiter
+        self.host_breaker = host_breaker
+        self.channel_breaker = channel_breaker
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.stats = {'attempts': 0, 'retries': 0, 'short_circuits': 0, 'breaker_opens': 0}
+
+    def breaker(self, scope, key):
+        with self._lock:
+            breaker = self._breakers.get((scope, key))
+            if breaker is None:
+                threshold, reset_timeout = self.host_breaker if scope == 'host' else self.channel_breaker
+                breaker = self._breakers[(scope, key)] = CircuitBreaker(threshold, reset_timeout)
+            return breaker
+
+    def is_open(self, scope, key):
+        breaker = self._breakers.get((scope, key))
+        return breaker is not None and breaker.state == 'open'
+
+    def open_breakers(self):
+        return [f"{scope}:{key}" for (scope, key), breaker in self._breakers.items() if breaker.state != 'closed']
+
+    def get(self, session, url, timeout, channel=None, on_retry=None, headers=None):
+        breakers = [self.breaker('host', urlsplit(url).netloc)]
+        if channel:
+            breakers.append(self.breaker('channel', channel))
+
+        allowed = []
+        for breaker in breakers:
+            if not breaker.allow():
+                for trial in allowed:
+                    trial.release_trial()
+                self.stats['short_circuits'] += 1
+                raise CircuitOpenError(f"Circuit open for {url} - skipping until it cools down")
+            allowed.append(breaker)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats['attempts'] += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = session.get(url, timeout=timeout, **({'headers': headers} if headers else {}))
+            except Exception as e:
+                if attempt < self.policy.max_attempts and self.policy.retryable_error(e):
+                    self._retry(attempt, None, type(e).__name__, on_retry)
+                    continue
+                self._record(breakers, False)
+                raise
+
+            if self.policy.retryable_status(response.status_code):
+                if attempt < self.policy.max_attempts:
+                    self._retry(attempt, response, str(response.status_code), on_retry)
+                    continue
+                self._record(breakers, False)
+            else:
+                # Anything else, including 4xx, means the host is answering
+                self._record(breakers, True)
+            return response
+
+    def _retry(self, attempt, response, reason, on_retry):
+        self.stats['retries'] += 1
+        if on_retry is not None:
+            on_retry(reason)
+        self.sleep(self.policy.delay(attempt, response))
+
+    def _record(self, breakers, success):
+        for breaker in breakers:
+            if success:
+                breaker.record_success()
+            elif breaker.record_failure():
+                self.stats['breaker_opens'] += 1
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Scan Archive
+Rolls old snapshot files into per-day columnar segments (dictionary-encoded, memory-mappable) with a raw-JSON retention policy
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from stream_record import LiveStream, streams_to_dicts
+
+DEFAULT_ARCHIVE_DIR = 'scan_archive'
+DEFAULT_SNAPSHOT_PATTERN = 'live_streams_refresh_*.json'
+DEFAULT_KEEP_RAW_HOURS = 24
+FORMAT_VERSION = 1
+
+# Column name -> array typecode; -1 marks a missing value
+COLUMNS = {
+    'timestamps': 'q',      # snapshot time, rows sorted by it
+    'network_ids': 'i',
+    'video_ids': 'i',
+    'title_ids': 'i',
+    'viewers': 'q',
+    'detected_at': 'q',
+    'method_ids': 'i',
+    'live_badge': 'b',
+}
+DICTIONARIES = ('networks', 'videos', 'titles', 'methods')
+
+
+def _snapshot_time(data, path):
+    stamp = data.get('scan_info', {}).get('timestamp')
+    return int(datetime.fromisoformat(stamp).timestamp()) if stamp else int(os.path.getmtime(path))
+
+
+def read_snapshot(path):
+    """(epoch, scan_info, [LiveStream]) from a snapshot file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    streams = [LiveStream.from_dict(stream) for stream in data.get('live_streams', [])]
+    return _snapshot_time(data, path), data.get('scan_info', {}), streams
+
+
+class ArchiveSegment:
+    """One day of snapshots: a column file per field plus a gzipped dictionary of the strings
+
+    Columns are mapped read-only on first use, so reading a time range only touches the
+    pages of the rows in it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('byteorder', sys.byteorder) != sys.byteorder:
+            raise ValueError(f"{path} was written on a {self.meta['byteorder']}-endian machine")
+        self._dictionary = None
+        self._columns = {}
+        self._maps = []
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    @property
+    def dictionary(self):
+        if self._dictionary is None:
+            with gzip.open(os.path.join(self.path, 'dictionary.json.gz'), 'rt', encoding='utf-8') as f:
+                self._dictionary = json.load(f)
+        return self._dictionary
+
+    def column(self, name):
+        """A memoryview over a column file (a zero-copy buffer for array libraries too)"""
+        view = self._columns.get(name)
+        if view is None:
+            if self.rows == 0:
+                view = memoryview(array(COLUMNS[name]))
+            else:
+                with open(os.path.join(self.path, f"{name}.col"), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps.append(mapped)
+                view = memoryview(mapped).cast(COLUMNS[name])
+            self._columns[name] = view
+        return view
+
+    def row_range(self, since=None, until=None):
+        """(first, end) rows with since <= timestamp < until, found by binary search"""
+        timestamps = self.column('timestamps')
+        first = 0 if since is None else bisect_left(timestamps, since)
+        end = len(timestamps) if until is None else bisect_left(timestamps, until, first)
+        return first, end
+
+    def snapshot_rows(self):
+        """Yield (meta entry, first row, end row) per snapshot; rows are stored in snapshot order"""
+        first = 0
+        for entry in self.meta['snapshots']:
+            yield entry, first, first + entry['rows']
+            first += entry['rows']
+
+    def streams(self, since=None, until=None, networks=None):
+        """Yield (snapshot epoch, LiveStream) for rows in the range, optionally for some networks"""
+        first, end = self.row_range(since, until)
+        wanted = None
+        if networks:
+            wanted = {i for i, name in enumerate(self.dictionary['networks']) if name in networks}
+            if not wanted:
+                return
+        yield from self.read_rows(first, end, wanted)
+
+    def read_rows(self, first, end, wanted=None):
+        """Yield (snapshot epoch, LiveStream) for rows first..end-1, optionally only some network ids"""
+        names = self.dictionary
+        columns = {name: self.column(name) for name in COLUMNS}
+        for row in range(first, end):
+            network_id = columns['network_ids'][row]
+            if wanted is not None and network_id not in wanted:
+                continue
+            viewers = columns['viewers'][row]
+            detected = columns['detected_at'][row]
+            method = columns['method_ids'][row]
+            badge = columns['live_badge'][row]
+            yield columns['timestamps'][row], LiveStream(
+                names['videos'][columns['video_ids'][row]], names['titles'][columns['title_ids'][row]],
+                None if viewers < 0 else viewers, names['networks'][network_id],
+                None if detected < 0 else detected, None if method < 0 else names['methods'][method],
+                None if badge < 0 else bool(badge))
+
+    def close(self):
+        for view in self._columns.values():
+            view.release()
+        self._columns = {}
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+def write_segment(path, snapshots):
+    """Write [(epoch, source name, scan_info, [LiveStream])] as a segment, replacing any existing one"""
+    snapshots = sorted(snapshots, key=lambda snapshot: snapshot[0])
+    indexes = {name: {} for name in DICTIONARIES}
+    columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+    def encode(dictionary, value):
+        return indexes[dictionary].setdefault(value, len(indexes[dictionary]))
+
+    for at, _, _, streams in snapshots:
+        for stream in streams:
+            columns['timestamps'].append(at)
+            columns['network_ids'].append(encode('networks', stream.network))
+            columns['video_ids'].append(encode('videos', stream.video_id))
+            columns['title_ids'].append(encode('titles', stream.title or ''))
+            columns['viewers'].append(-1 if stream.viewers is None else stream.viewers)
+            columns['detected_at'].append(-1 if stream.detected_epoch is None else stream.detected_epoch)
+            columns['method_ids'].append(-1 if stream.detection_method is None
+                                         else encode('methods', stream.detection_method))
+            columns['live_badge'].append(-1 if stream.has_live_badge is None else int(stream.has_live_badge))
+
+    rows = len(columns['timestamps'])
+    temp_path = path + '.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name, values in columns.items():
+        if rows:
+            with open(os.path.join(temp_path, f"{name}.col"), 'wb') as f:
+                values.tofile(f)
+    with gzip.open(os.path.join(temp_path, 'dictionary.json.gz'), 'wt', encoding='utf-8') as f:
+        json.dump({name: list(index) for name, index in indexes.items()}, f, ensure_ascii=False,
+                  separators=(',', ':'))
+    meta = {
+        'format': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': rows,
+        'first_timestamp': snapshots[0][0] if snapshots else None,
+        'last_timestamp': snapshots[-1][0] if snapshots else None,
+        'snapshots': [{'source': source, 'timestamp': at, 'rows': len(streams), 'scan_info': scan_info}
+                      for at, source, scan_info, streams in snapshots],
+    }
+    with open(os.path.join(temp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(',', ':'))
+
+    # Swap the finished directory in; the old segment is only removed once the new one is in place
+    old_path = path + '.old'
+    if os.path.exists(path):
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+    os.rename(temp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return ArchiveSegment(path)
+
+
+def _directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class ScanArchive:
+    """A directory of per-day segments named YYYY-MM-DD (local date of the snapshots)"""
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    def segment_names(self):
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(name for name in os.listdir(self.archive_dir)
+                      if os.path.exists(os.path.join(self.archive_dir, name, 'meta.json'))
+                      and not name.endswith(('.tmp', '.old')))
+
+    def segments(self, since=None, until=None):
+        """Segments overlapping [since, until), judged from their metadata alone"""
+        for name in self.segment_names():
+            segment = ArchiveSegment(os.path.join(self.archive_dir, name))
+            first, last = segment.meta['first_timestamp'], segment.meta['last_timestamp']
+            if first is None or (until is not None and first >= until) or (since is not None and last < since):
+                continue
+            yield segment
+
+    def streams(self, since=None, until=None, networks=None):
+        """Yield (snapshot epoch, LiveStream) in time order across segments"""
+        for segment in self.segments(since, until):
+            try:
+                yield from segment.streams(since, until, networks)
+            finally:
+                segment.close()
+
+    def snapshots(self, since=None, until=None):
+        """Yield snapshot dicts in the original results-file layout"""
+        for segment in self.segments(since, until):
+            for entry, first, end in segment.snapshot_rows():
+                if (since is None or entry['timestamp'] >= since) and (until is None or entry['timestamp'] < until):
+                    streams = [stream for _, stream in segment.read_rows(first, end)]
+                    yield {'scan_info': entry['scan_info'], 'live_streams': streams_to_dicts(streams)}
+            segment.close()
+
+    def archived_sources(self):
+        sources = set()
+        for segment in self.segments():
+            sources.update(entry['source'] for entry in segment.meta['snapshots'])
+        return sources
+
+    def add_snapshots(self, paths):
+        """Merge snapshot files into their day segments; returns {day: rows written}"""
+        by_day = {}
+        for path in paths:
+            try:
+                at, scan_info, streams = read_snapshot(path)
+            except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+            day = datetime.fromtimestamp(at).strftime('%Y-%m-%d')
+            by_day.setdefault(day, []).append((at, os.path.basename(path), scan_info, streams))
+
+        written = {}
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for day, snapshots in by_day.items():
+            path = os.path.join(self.archive_dir, day)
+            if os.path.exists(os.path.join(path, 'meta.json')):
+                existing = ArchiveSegment(path)
+                sources = {source for _, source, _, _ in snapshots}
+                # Each snapshot's own rows, so snapshots sharing a second keep their streams apart
+                kept = [(entry['timestamp'], entry['source'], entry['scan_info'],
+                         [stream for _, stream in existing.read_rows(first, end)])
+                        for entry, first, end in existing.snapshot_rows() if entry['source'] not in sources]
+                existing.close()
+                snapshots = kept + snapshots
+            segment = write_segment(path, snapshots)
+            written[day] = segment.rows
+        return written
+
+    def drop_before(self, cutoff):
+        """Delete whole segments whose newest snapshot is older than cutoff; returns their names"""
+        dropped = []
+        for segment in list(self.segments()):
+            if segment.meta['last_timestamp'] < cutoff:
+                shutil.rmtree(segment.path)
+                dropped.append(segment.name)
+        return dropped
+
+
+def apply_retention(archive, pattern=DEFAULT_SNAPSHOT_PATTERN, keep_raw_hours=DEFAULT_KEEP_RAW_HOURS,
+                    delete_raw=True, drop_after_days=0):
+    """Archive snapshots older than keep_raw_hours, then delete their raw JSON once archived"""
+    cutoff = time.time() - keep_raw_hours * 3600
+    candidates = []
+    for path in sorted(glob.glob(pattern)):
+        if os.path.getmtime(path) < cutoff:
+            candidates.append(path)
+    raw_bytes = sum(os.path.getsize(path) for path in candidates)
+    written = archive.add_snapshots(candidates)
+
+    deleted = []
+    if delete_raw and candidates:
+        archived = archive.archived_sources()
+        for path in candidates:
+            if os.path.basename(path) in archived:
+                os.remove(path)
+                deleted.append(path)
+
+    dropped = archive.drop_before(time.time() - drop_after_days * 86400) if drop_after_days else []
+    return {
+        'archived_files': len(candidates),
+        'raw_bytes': raw_bytes,
+        'segments_written': written,
+        'segment_bytes': sum(_directory_bytes(os.path.join(archive.archive_dir, day)) for day in written),
+        'deleted_files': len(deleted),
+        'dropped_segments': dropped,
+    }
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan Archive')
+    parser.add_argument('command', choices=['compact', 'list', 'read', 'export'],
+                        help='compact = archive old snapshots, list = segments, read = stream rows, '
+                             'export = snapshots as JSON')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR, help='Archive directory')
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOT_PATTERN, help='Glob of snapshot files to archive')
+    parser.add_argument('--keep-raw-hours', type=float, default=DEFAULT_KEEP_RAW_HOURS,
+                        help='Leave snapshots younger than this as raw JSON')
+    parser.add_argument('--keep-raw', action='store_true', help="Archive but don't delete the raw JSON")
+    parser.add_argument('--drop-after-days', type=float, default=0,
+                        help='Delete archive segments older than this (0 = keep forever)')
+    parser.add_argument('--since', help='ISO start time (read/export)')
+    parser.add_argument('--until', help='ISO end time, exclusive (read/export)')
+    parser.add_argument('--network', action='append', help='Only this network (read, repeatable)')
+
+    args = parser.parse_args()
+    archive = ScanArchive(args.archive_dir)
+
+    if args.command == 'compact':
+        summary = apply_retention(archive, args.snapshots, args.keep_raw_hours, not args.keep_raw,
+                                  args.drop_after_days)
+        if not summary['archived_files'] and not summary['dropped_segments']:
+            print(f"⚪ Nothing older than {args.keep_raw_hours:g}h to archive")
+            return
+        print(f"🗜️ Archived {summary['archived_files']} snapshots ({summary['raw_bytes']:,} bytes of JSON) "
+              f"into {len(summary['segments_written'])} day segments ({summary['segment_bytes']:,} bytes)")
+        if summary['deleted_files']:
+            print(f"🧹 Deleted {summary['deleted_files']} archived snapshot files")
+        if summary['dropped_segments']:
+            print(f"🧹 Dropped segments: {', '.join(summary['dropped_segments'])}")
+    elif args.command == 'list':
+        total_rows = total_bytes = 0
+        for segment in archive.segments():
+            size = _directory_bytes(segment.path)
+            total_rows += segment.rows
+            total_bytes += size
+            print(f"{segment.name}  {len(segment.meta['snapshots']):>4} snapshots  {segment.rows:>7,} rows  "
+                  f"{size:>10,} bytes")
+        print(f"\n📦 {total_rows:,} rows, {total_bytes:,} bytes in {args.archive_dir}")
+    elif args.command == 'read':
+        networks = set(args.network) if args.network else None
+        for at, stream in archive.streams(_parse_time(args.since), _parse_time(args.until), networks):
+            viewers = '' if stream.viewers is None else f"{stream.viewers:,}"
+            print(f"{datetime.fromtimestamp(at).isoformat(timespec='seconds')}  {stream.video_id}  "
+                  f"{viewers:>10}  {stream.network}: {stream.title[:60]}")
+    elif args.command == 'export':
+        snapshots = list(archive.snapshots(_parse_time(args.since), _parse_time(args.until)))
+        json.dump(snapshots, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+
+if __name__ == "__main__":
+    main()
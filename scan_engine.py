@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Unified Scan Engine
+Fetches each URL once per sweep, parses it once into a shared page model and runs registered detectors against it
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+
+from channel_registry import get_registry
+from detectors import DETECTORS, classify_url, extract_initial_data, get_detector, watch_url
+from http_cassette import session_from_environment
+from resilient_fetch import CircuitOpenError, ResilientFetcher
+from scan_metrics import SCANNER_METRICS
+from scan_trace import TRACER
+from scan_transport import DEFAULT_POOL_MAXSIZE, connection_stats, create_session
+
+YOUTUBE_BASE_URL = 'https://www.youtube.com'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+
+class PageModel:
+    """One fetched page: raw bytes plus lazily decoded text, embedded JSON and DOM"""
+
+    def __init__(self, url, raw, status_code=200, encoding='utf-8', reason='', headers=None):
+        self.url = url
+        self.raw = raw
+        self.status_code = status_code
+        self.encoding = encoding or 'utf-8'
+        self.reason = reason
+        self.headers = headers if headers is not None else {}
+        self._text = None
+        self._initial_data = None
+        self._initial_data_parsed = False
+        self._soup = None
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        if self._text is None:
+            with TRACER.span('decode', url=self.url, bytes=len(self.raw)):
+                self._text = self.raw.decode(self.encoding, errors='replace')
+        return self._text
+
+    @property
+    def initial_data(self):
+        """The decoded ytInitialData dict, or None if the page has none"""
+        if not self._initial_data_parsed:
+            text = self.text
+            with TRACER.span('parse_json', url=self.url):
+                self._initial_data = extract_initial_data(text)
+            self._initial_data_parsed = True
+        return self._initial_data
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            text = self.text
+            with TRACER.span('parse_html', url=self.url):
+                self._soup = BeautifulSoup(text, 'html.parser')
+        return self._soup
+
+    def release(self):
+        """Drop the decoded text, JSON and DOM, keeping only the raw bytes"""
+        if self._soup is not None:
+            self._soup.decompose()
+            self._soup = None
+        self._text = None
+        self._initial_data = None
+        self._initial_data_parsed = False
+
+    def raise_for_status(self):
+        """Raise requests.HTTPError for 4xx/5xx pages, like Response.raise_for_status"""
+        if 400 <= self.status_code < 500:
+            raise requests.HTTPError(f"{self.status_code} Client Error: {self.reason} for url: {self.url}")
+        if 500 <= self.status_code < 600:
+            raise requests.HTTPError(f"{self.status_code} Server Error: {self.reason} for url: {self.url}")
+
+
+def analyze_page(page, detector_names, timings=None):
+    """Run the named detectors against one page and return {name: result}
+
+    If a timings dict is given, each detector's run time in seconds is stored in it.
+    """
+    results = {}
+    for name in detector_names:
+        start = time.perf_counter()
+        with TRACER.span('detect', detector=name, url=page.url):
+            results[name] = get_detector(name)(page)
+        if timings is not None:
+            timings[name] = time.perf_counter() - start
+    return results
+
+
+def analyze_raw(url, raw, status_code, encoding, detector_names):
+    """Process-pool entry point: raw response bytes in, small detector results and timings out"""
+    timings = {}
+    return analyze_page(PageModel(url, raw, status_code, encoding), detector_names, timings), timings
+
+
+def parse_network_list(filename):
+    """(network name, channel URL) pairs from a network list, parsed once and reloaded when the file changes"""
+    return get_registry(filename).networks()
+
+
+class ScanEngine:
+    def __init__(self, headers=None, workers=0, fetch_threads=8, session=None, base_url=None, metrics=None,
+                 memory_budget=None, fetcher=None, http2=None):
+        # Pooled keep-alive connections (HTTP/2 with SCANNER_HTTP2=1 and httpx installed), sized
+        # so every fetch thread can hold its own connection
+        if session is None:
+            if http2 is None:
+                http2 = os.environ.get('SCANNER_HTTP2', '') not in ('', '0')
+            session = create_session(http2=http2, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, fetch_threads))
+        self.session = session
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        # SCANNER_CASSETTE records or replays every request (see http_cassette.py)
+        self.session = session_from_environment(self.session)
+        # Point every fetch at another host (e.g. the local stand-in server) while
+        # results keep canonical youtube.com URLs
+        self.base_url = (base_url or os.environ.get('SCANNER_BASE_URL') or YOUTUBE_BASE_URL).rstrip('/')
+        self.workers = workers
+        self.fetch_threads = fetch_threads
+        # Retries with backoff plus per-host/per-channel circuit breakers; backoff waits
+        # go through pause() so zero-timing cassette replays stay instant
+        self.fetcher = fetcher or ResilientFetcher(sleep=self.pause)
+        self._process_pool = None
+        self._fetch_pool = None
+        # Cached pages in least-recently-used order; only raw bytes are kept once analyzed
+        self._pages = OrderedDict()
+        self._results = {}
+        self._inflight = {}
+        # Byte budget for page bodies (None = unbounded): the cache is trimmed to fit and
+        # concurrent fetches wait while downloading/analyzing pages would exceed it
+        self.memory_budget = memory_budget
+        self._page_bytes = 0
+        self._active_bytes = 0
+        self._memory_freed = None
+        self._size_estimates = {}
+        self.stats = {'fetches': 0, 'page_hits': 0, 'detector_runs': 0, 'result_hits': 0,
+                      'evictions': 0, 'fetch_waits': 0, 'peak_page_bytes': 0}
+        self.metrics = metrics or SCANNER_METRICS
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the parse worker processes and fetch threads"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown()
+            self._fetch_pool = None
+
+    def parse_network_list(self, filename):
+        """Parse the network list file to extract channel URLs"""
+        return parse_network_list(filename)
+
+    def pause(self, seconds):
+        """Politeness delay between requests; skipped when replaying a cassette at zero timing"""
+        if seconds > 0 and not getattr(self.session, 'skip_delays', False):
+            time.sleep(seconds)
+
+    def rewrite_url(self, url):
+        """Map a canonical youtube.com URL onto the configured base URL"""
+        if self.base_url != YOUTUBE_BASE_URL and url.startswith(YOUTUBE_BASE_URL):
+            return self.base_url + url[len(YOUTUBE_BASE_URL):]
+        return url
+
+    def begin_sweep(self):
+        """Forget pages and results from the previous sweep"""
+        for page in self._pages.values():
+            page.release()
+        self._pages.clear()
+        self._page_bytes = 0
+        self._results.clear()
+        self.metrics.begin_sweep()
+
+    def connection_stats(self):
+        """Requests, connections opened and keep-alive reuse for this engine's session"""
+        stats = connection_stats(self.session)
+        self.metrics.observe_connections(stats)
+        return stats
+
+    def circuit_open(self, channel_url):
+        """True while the breaker for a channel is failing fast"""
+        return self.fetcher.is_open('channel', channel_url)
+
+    def _download(self, url, timeout, circuit=None, headers=None):
+        target = self.rewrite_url(url)
+        with TRACER.span('fetch', url=url, endpoint=classify_url(url)) as span:
+            start = time.perf_counter()
+            try:
+                response = self.fetcher.get(self.session, target, timeout, channel=circuit,
+                                            on_retry=lambda reason: self.metrics.observe_retry(target, reason),
+                                            headers=headers)
+            except CircuitOpenError:
+                self.metrics.observe_fetch(target, 'circuit_open', 0)
+                raise
+            except Exception:
+                self.metrics.observe_fetch(target, 'error', time.perf_counter() - start)
+                raise
+            size = len(response.content or b'')
+            self.metrics.observe_fetch(target, response.status_code, time.perf_counter() - start, size)
+            # requests reports time to response headers (connect + TTFB); the rest is the body download
+            elapsed = getattr(response, 'elapsed', None)
+            span.set(status=response.status_code, bytes=size,
+                     ttfb_ms=round(elapsed.total_seconds() * 1000, 3) if elapsed is not None else 0)
+        return PageModel(url, response.content, response.status_code,
+                         response.encoding, response.reason, response.headers)
+
+    def _make_room(self, size):
+        """Evict least recently used pages until size more bytes fit in the budget"""
+        if self.memory_budget is None:
+            return
+        while self._pages and self._page_bytes + self._active_bytes + size > self.memory_budget:
+            _, evicted = self._pages.popitem(last=False)
+            self._page_bytes -= len(evicted.raw)
+            self.stats['evictions'] += 1
+
+    def _cache_page(self, url, page):
+        if url in self._pages:
+            return self._pages[url]
+        self._make_room(len(page.raw))
+        self._pages[url] = page
+        self._page_bytes += len(page.raw)
+        self._note_memory()
+        return page
+
+    def _note_memory(self):
+        in_memory = self._page_bytes + self._active_bytes
+        self.stats['peak_page_bytes'] = max(self.stats['peak_page_bytes'], in_memory)
+        self.metrics.page_bytes.set(in_memory)
+
+    def _cached_page(self, url):
+        page = self._pages.get(url)
+        if page is not None:
+            self._pages.move_to_end(url)
+        return page
+
+    def fetch_uncached(self, url, timeout=15):
+        """Download a page without touching the sweep's caches (safe from background threads)"""
+        return self._download(url, timeout)
+
+    def fetch_conditional(self, url, etag=None, last_modified=None, timeout=10, circuit=None):
+        """Download a page with If-None-Match/If-Modified-Since validators, outside the sweep's caches
+
+        An unchanged page comes back with status_code 304 and no body; the new validators are in page.headers.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return self._download(url, timeout, circuit, headers)
+
+    def fetch(self, url, timeout=15, circuit=None):
+        """Fetch a URL once per sweep and return its PageModel
+
+        circuit names a channel whose breaker this fetch counts toward (and is refused by while open).
+        """
+        page = self._cached_page(url)
+        if page is not None:
+            self.stats['page_hits'] += 1
+            self.metrics.observe_cache('page', 1, 0)
+            return page
+
+        self.metrics.observe_cache('page', 0, 1)
+        page = self._download(url, timeout, circuit)
+        self.stats['fetches'] += 1
+        return self._cache_page(url, page)
+
+    def _missing_detectors(self, url, detector_names):
+        missing = [name for name in detector_names if (url, name) not in self._results]
+        self.stats['result_hits'] += len(detector_names) - len(missing)
+        self.metrics.observe_cache('result', len(detector_names) - len(missing), len(missing))
+        return missing
+
+    def _store_results(self, url, detector_names, analysis, timings=None):
+        if timings:
+            self.metrics.observe_detectors(timings)
+        for name, result in analysis.items():
+            self._results[(url, name)] = result
+        self.stats['detector_runs'] += len(analysis)
+        return {name: self._results[(url, name)] for name in detector_names}
+
+    def analyze(self, url, detector_names, timeout=15, require_ok=False, circuit=None):
+        """Run detectors against a URL, reusing any page or result already produced this sweep"""
+        page = self.fetch(url, timeout=timeout, circuit=circuit)
+        if require_ok:
+            page.raise_for_status()
+
+        missing = self._missing_detectors(url, detector_names)
+        timings = {}
+        if missing and self.workers:
+            analysis, timings = self._get_process_pool().submit(
+                analyze_raw, url, page.raw, page.status_code, page.encoding, missing).result()
+        else:
+            analysis = analyze_page(page, missing, timings)
+            # Results are extracted; only the raw bytes stay cached
+            page.release()
+
+        return self._store_results(url, detector_names, analysis, timings)
+
+    def run(self, url, detector_name, timeout=15, require_ok=False, circuit=None):
+        """Run a single detector against a URL"""
+        return self.analyze(url, [detector_name], timeout=timeout, require_ok=require_ok,
+                            circuit=circuit)[detector_name]
+
+    def check_video(self, video_id, detector_name='watch_status', timeout=10):
+        """Run a watch-page detector for a video ID"""
+        return self.run(watch_url(video_id), detector_name, timeout=timeout)
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._process_pool
+
+    def _get_fetch_pool(self):
+        if self._fetch_pool is None:
+            self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_threads)
+        return self._fetch_pool
+
+    def _estimate_size(self, url):
+        return self._size_estimates.get(classify_url(url), 512 * 1024)
+
+    async def _reserve(self, size):
+        """Backpressure: wait until a download of about size bytes fits in the budget"""
+        if self.memory_budget is not None and self._memory_freed is not None:
+            async with self._memory_freed:
+                if self._active_bytes and self._active_bytes + size > self.memory_budget:
+                    self.stats['fetch_waits'] += 1
+                await self._memory_freed.wait_for(
+                    lambda: not self._active_bytes or self._active_bytes + size <= self.memory_budget)
+        self._active_bytes += size
+        self._make_room(0)
+        self._note_memory()
+
+    async def _release_reservation(self, size):
+        self._active_bytes -= size
+        if self._memory_freed is not None:
+            async with self._memory_freed:
+                self._memory_freed.notify_all()
+
+    async def analyze_async(self, url, detector_names, timeout=15, require_ok=False):
+        """Event-loop version of analyze: blocking fetches on threads, parsing on worker processes"""
+        loop = asyncio.get_running_loop()
+
+        reserved = 0
+        page = self._cached_page(url)
+        if page is None:
+            # Concurrent jobs for the same URL share one in-flight download
+            download = self._inflight.get(url)
+            if download is None:
+                reserved = self._estimate_size(url)
+                await self._reserve(reserved)
+                download = loop.run_in_executor(self._get_fetch_pool(), self._download, url, timeout)
+                self._inflight[url] = download
+                self.stats['fetches'] += 1
+                self.metrics.observe_cache('page', 0, 1)
+            else:
+                self.stats['page_hits'] += 1
+                self.metrics.observe_cache('page', 1, 0)
+            try:
+                page = await download
+            except Exception:
+                if reserved:
+                    await self._release_reservation(reserved)
+                raise
+            finally:
+                self._inflight.pop(url, None)
+            if reserved:
+                # Swap the estimate for the real size while the page is being analyzed
+                self._size_estimates[classify_url(url)] = len(page.raw)
+                self._active_bytes += len(page.raw) - reserved
+                reserved = len(page.raw)
+                self._note_memory()
+        else:
+            self.stats['page_hits'] += 1
+            self.metrics.observe_cache('page', 1, 0)
+
+        try:
+            if require_ok:
+                page.raise_for_status()
+
+            missing = self._missing_detectors(url, detector_names)
+            timings = {}
+            if not missing:
+                analysis = {}
+            elif self.workers:
+                analysis, timings = await loop.run_in_executor(
+                    self._get_process_pool(), analyze_raw,
+                    url, page.raw, page.status_code, page.encoding, missing)
+            else:
+                analysis = analyze_page(page, missing, timings)
+                page.release()
+        finally:
+            if reserved:
+                await self._release_reservation(reserved)
+                self._cache_page(url, page)
+
+        return self._store_results(url, detector_names, analysis, timings)
+
+    async def _analyze_many(self, jobs, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        self._memory_freed = asyncio.Condition()
+
+        async def run_job(url, detector_names, timeout, require_ok):
+            async with semaphore:
+                return await self.analyze_async(url, detector_names, timeout, require_ok)
+
+        try:
+            return await asyncio.gather(
+                *(run_job(*job) for job in jobs), return_exceptions=True)
+        finally:
+            self._memory_freed = None
+
+    def analyze_many(self, jobs, concurrency=8):
+        """Analyze (url, detector_names, timeout, require_ok) jobs concurrently
+
+        Results come back in job order; a failed job yields its exception instead of a result.
+        """
+        return asyncio.run(self._analyze_many(list(jobs), concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Unified Scan Engine')
+    parser.add_argument('--list', action='store_true', help='List registered detectors and exit')
+    parser.add_argument('--detectors', default='initial_data_live,live_badge',
+                        help='Comma-separated channel detectors to run')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--base-url', help='Fetch from this host instead of https://www.youtube.com')
+
+    args = parser.parse_args()
+
+    if args.list:
+        print("🧩 Registered detectors:")
+        for name, detector in sorted(DETECTORS.items()):
+            print(f"   • {name} ({detector.page_type})")
+        return
+
+    detector_names = [name.strip() for name in args.detectors.split(',') if name.strip()]
+    for name in detector_names:
+        get_detector(name)
+
+    engine = ScanEngine(base_url=args.base_url)
+    networks = engine.parse_network_list(args.network_list)
+
+    print(f"🎯 Unified scan of {len(networks)} networks with: {', '.join(detector_names)}")
+    print("=" * 60)
+
+    for i, (network_name, channel_url) in enumerate(networks):
+        print(f"[{i+1}/{len(networks)}] {network_name}...", end=" ")
+        try:
+            results = engine.analyze(channel_url, detector_names, require_ok=True)
+        except Exception as e:
+            print(f"⚠️ {e}")
+            continue
+
+        found = {name: len(result) for name, result in results.items() if isinstance(result, list)}
+        print(", ".join(f"{name}: {count}" for name, count in found.items()))
+        engine.pause(1)
+
+    print(f"\n📊 {engine.stats['fetches']} fetches, {engine.stats['detector_runs']} detector runs")
+    print(f"✅ Completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Scanner Metrics
+Prometheus-style counters, gauges and histograms for the scan engine, served over HTTP for scraping and alerting
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from detectors import classify_url
+
+# Histogram buckets in seconds
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+PARSE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+SWEEP_BUCKETS = (10, 30, 60, 120, 300, 600, 900, 1800, 3600)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named metric family with one time series per label combination"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def replace(self, values):
+        """Swap in a whole set of series at once, e.g. {(network,): count}, dropping stale ones"""
+        with self._lock:
+            self._series = {tuple(str(part) for part in key): value for key, value in values.items()}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def _render_series(self, key, series):
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, [("le", "+Inf")])} {count}')
+        lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(round(total, 6))}')
+        lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class ScannerMetrics:
+    """The scanner's metric families plus helpers the engine and daemon call"""
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.requests = r.counter('scanner_http_requests_total',
+                                  'HTTP requests made by the scan engine', ('host', 'endpoint', 'status'))
+        self.request_seconds = r.histogram('scanner_http_request_duration_seconds',
+                                           'Time to download a page', ('host', 'endpoint'), REQUEST_BUCKETS)
+        self.response_bytes = r.counter('scanner_http_response_bytes_total',
+                                        'Response body bytes downloaded', ('host', 'endpoint'))
+        self.detector_seconds = r.histogram('scanner_detector_duration_seconds',
+                                            'Time to parse a page and run one detector (first detector includes decoding)',
+                                            ('detector',), PARSE_BUCKETS)
+        self.retries = r.counter('scanner_http_retries_total',
+                                 'Requests retried after a timeout, dropped connection or 429/5xx', ('host', 'reason'))
+        self.connections_opened = r.gauge('scanner_http_connections_opened',
+                                          'Connections opened by the engine session since start')
+        self.connection_reuse = r.gauge('scanner_http_connection_reuse_ratio',
+                                        'Share of requests sent over an already open keep-alive connection')
+        self.queue_depth = r.gauge('scanner_queue_jobs', 'Scan jobs in the job queue', ('state', 'kind'))
+        self.queue_claim_seconds = r.histogram('scanner_queue_claim_latency_seconds',
+                                               'Time from a job becoming due to a worker claiming it',
+                                               ('kind',), REQUEST_BUCKETS)
+        self.cache_lookups = r.counter('scanner_cache_lookups_total',
+                                       'Page and detector-result cache lookups', ('cache', 'outcome'))
+        self.cache_hit_ratio = r.gauge('scanner_cache_hit_ratio',
+                                       'Cache hit ratio over the last sweep', ('cache',))
+        self.sweeps = r.counter('scanner_sweeps_total', 'Completed refresh sweeps', ('scan_type',))
+        self.sweep_seconds = r.histogram('scanner_sweep_duration_seconds',
+                                         'Wall-clock duration of a refresh sweep', ('scan_type',), SWEEP_BUCKETS)
+        self.last_sweep_seconds = r.gauge('scanner_last_sweep_duration_seconds',
+                                          'Duration of the most recent sweep')
+        self.last_sweep_timestamp = r.gauge('scanner_last_sweep_timestamp_seconds',
+                                            'Unix time the most recent sweep finished')
+        self.sweep_interval = r.gauge('scanner_sweep_interval_seconds',
+                                      'Configured time between sweeps (alert when a sweep takes longer)')
+        self.page_bytes = r.gauge('scanner_page_bytes',
+                                  'Raw page bytes held by the engine (cached plus being downloaded or analyzed)')
+        self.live_streams = r.gauge('scanner_live_streams', 'Live streams found in the last sweep', ('network',))
+        self.live_viewers = r.gauge('scanner_live_viewers', 'Concurrent viewers in the last sweep', ('network',))
+        self.spike_events = r.counter('scanner_spike_events_total',
+                                      'Viewer spikes and new high-viewer streams detected', ('network', 'type'))
+        self._sweep_cache = {}
+
+    def observe_fetch(self, url, status, seconds, size=0):
+        host = urlsplit(url).netloc or 'unknown'
+        endpoint = classify_url(url)
+        self.requests.inc(host=host, endpoint=endpoint, status=status)
+        self.request_seconds.observe(seconds, host=host, endpoint=endpoint)
+        if size:
+            self.response_bytes.inc(size, host=host, endpoint=endpoint)
+
+    def observe_retry(self, url, reason):
+        self.retries.inc(host=urlsplit(url).netloc or 'unknown', reason=reason)
+
+    def observe_connections(self, stats):
+        self.connections_opened.set(stats['connections'])
+        self.connection_reuse.set(stats['reuse_ratio'])
+
+    def observe_queue_claim(self, kind, seconds):
+        self.queue_claim_seconds.observe(max(seconds, 0), kind=kind)
+
+    def observe_queue(self, stats):
+        self.queue_depth.replace({(state, kind): count for state, kinds in stats['depth'].items()
+                                  for kind, count in kinds.items()})
+
+    def observe_spikes(self, events):
+        for event in events:
+            self.spike_events.inc(network=event['network'], type=event['type'])
+
+    def observe_detectors(self, timings):
+        for name, seconds in timings.items():
+            self.detector_seconds.observe(seconds, detector=name)
+
+    def observe_cache(self, cache, hits, misses):
+        if hits:
+            self.cache_lookups.inc(hits, cache=cache, outcome='hit')
+        if misses:
+            self.cache_lookups.inc(misses, cache=cache, outcome='miss')
+
+    def begin_sweep(self):
+        """Remember the cache counters so the sweep's own hit ratio can be reported"""
+        self._sweep_cache = {(cache, outcome): self.cache_lookups.value(cache=cache, outcome=outcome)
+                             for cache in ('page', 'result') for outcome in ('hit', 'miss')}
+
+    def observe_sweep(self, seconds, live_streams, network_names, scan_type='quick'):
+        self.sweeps.inc(scan_type=scan_type)
+        self.sweep_seconds.observe(seconds, scan_type=scan_type)
+        self.last_sweep_seconds.set(round(seconds, 3))
+        self.last_sweep_timestamp.set(round(time.time(), 3))
+
+        for cache in ('page', 'result'):
+            hits = self.cache_lookups.value(cache=cache, outcome='hit') - self._sweep_cache.get((cache, 'hit'), 0)
+            misses = self.cache_lookups.value(cache=cache, outcome='miss') - self._sweep_cache.get((cache, 'miss'), 0)
+            if hits + misses:
+                self.cache_hit_ratio.set(round(hits / (hits + misses), 4), cache=cache)
+
+        counts = {(name,): 0 for name in network_names}
+        viewers = {(name,): 0 for name in network_names}
+        for stream in live_streams:
+            key = (stream.network,)
+            counts[key] = counts.get(key, 0) + 1
+            viewers[key] = viewers.get(key, 0) + (stream.viewers or 0)
+        self.live_streams.replace(counts)
+        self.live_viewers.replace(viewers)
+
+
+# Process-wide metrics shared by every engine unless one is passed in
+SCANNER_METRICS = ScannerMetrics()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1', metrics=None):
+    """Serve /metrics from a daemon thread; returns the server
+
+    Only local clients can scrape by default; pass host='0.0.0.0' to expose it on every interface.
+    """
+    handler = type('BoundMetricsHandler', (MetricsHandler,), {'registry': (metrics or SCANNER_METRICS).registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+On-Demand Sweep Profiler
+Profiles the next N sweeps of a running daemon (cProfile or a stack sampler) and writes tracemalloc diffs between sweeps
+"""
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+
+class StackSampler:
+    """Samples every thread's stack at a fixed interval and counts collapsed stacks (flame graph input)"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = {}
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            self.sample_count += 1
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit=25):
+        """Functions by samples in which they were on top of a stack (self time)"""
+        leaf_counts = {}
+        for stack, count in self.samples.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+        return sorted(leaf_counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class SweepProfiler:
+    """Wraps sweeps with CPU profiling and tracemalloc diffs when armed by a flag or a signal
+
+    SIGUSR1 profiles the next `signal_sweeps` sweeps; SIGUSR2 toggles tracemalloc diffs.
+    Signal handlers only set flags; all work happens at sweep boundaries.
+    """
+
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR, mode='cprofile', top=30):
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.top = top
+        self.cpu_sweeps_left = 0
+        self.memory_enabled = False
+        self._memory_requested = None
+        self._previous_snapshot = None
+        self.signal_sweeps = 1
+
+    def request_cpu(self, sweeps=1):
+        """Profile the next `sweeps` sweeps"""
+        self.cpu_sweeps_left = max(self.cpu_sweeps_left, sweeps)
+
+    def request_memory(self, enabled=True):
+        """Turn tracemalloc diffs on or off from the next sweep"""
+        self._memory_requested = enabled
+
+    def install_signal_handlers(self):
+        """SIGUSR1: profile the next sweeps; SIGUSR2: toggle memory diffs (POSIX only)"""
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.request_cpu(self.signal_sweeps))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.request_memory(
+            not (self.memory_enabled if self._memory_requested is None else self._memory_requested)))
+        return True
+
+    def _path(self, kind, sweep_number, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(self.output_dir, f"{kind}_{timestamp}_sweep{sweep_number}.{extension}")
+
+    def _apply_memory_request(self):
+        if self._memory_requested is None:
+            return
+        enabled, self._memory_requested = self._memory_requested, None
+        if enabled and not self.memory_enabled:
+            tracemalloc.start(25)
+            self._previous_snapshot = None
+            print("🧠 tracemalloc diffs enabled")
+        elif not enabled and self.memory_enabled:
+            tracemalloc.stop()
+            self._previous_snapshot = None
+            print("🧠 tracemalloc diffs disabled")
+        self.memory_enabled = enabled
+
+    def run_sweep(self, sweep_number, func, *args, **kwargs):
+        """Run one sweep under whatever profiling is currently armed"""
+        self._apply_memory_request()
+
+        profiler = sampler = None
+        if self.cpu_sweeps_left > 0:
+            if self.mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler()
+                sampler.start()
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._write_cprofile(profiler, sweep_number, duration)
+            if sampler is not None:
+                sampler.stop()
+                self._write_samples(sampler, sweep_number, duration)
+            if profiler is not None or sampler is not None:
+                self.cpu_sweeps_left -= 1
+            if self.memory_enabled:
+                self._write_memory_diff(sweep_number)
+
+    def _write_cprofile(self, profiler, sweep_number, duration):
+        path = self._path('cpu', sweep_number, 'prof')
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        summary.write(f"Sweep {sweep_number}: {duration:.2f} s wall\n\n")
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top)
+        with open(path[:-len('.prof')] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        print(f"🔬 CPU profile written: {path} (view with: python3 -m pstats {path})")
+
+    def _write_samples(self, sampler, sweep_number, duration):
+        path = self._path('samples', sweep_number, 'collapsed')
+        sampler.write_collapsed(path)
+
+        with open(path[:-len('.collapsed')] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Sweep {sweep_number}: {duration:.2f} s wall, {sampler.sample_count} samples "
+                    f"every {sampler.interval * 1000:.0f} ms across all threads\n\n")
+            for function, count in sampler.top_functions(self.top):
+                f.write(f"{count:>8}  {function}\n")
+        print(f"🔬 Stack samples written: {path} (flame graph: flamegraph.pl {path})")
+
+    def _write_memory_diff(self, sweep_number):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        path = self._path('memory', sweep_number, 'txt')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Sweep {sweep_number}: {current / 1024:,.0f} KB traced, {peak / 1024:,.0f} KB peak\n\n")
+            if self._previous_snapshot is None:
+                f.write("Baseline snapshot - diffs start with the next sweep\n\n")
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+            else:
+                growth = sum(stat.size_diff for stat in snapshot.compare_to(self._previous_snapshot, 'filename'))
+                f.write(f"Growth since previous sweep: {growth / 1024:+,.1f} KB\n\n")
+                for stat in snapshot.compare_to(self._previous_snapshot, 'lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+        tracemalloc.reset_peak()
+        self._previous_snapshot = snapshot
+        print(f"🧠 Memory diff written: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='On-Demand Sweep Profiler')
+    parser.add_argument('pid', type=int, help='Process ID of a running refresh daemon')
+    parser.add_argument('action', choices=['cpu', 'memory'],
+                        help='cpu = profile the next sweeps (SIGUSR1), memory = toggle tracemalloc diffs (SIGUSR2)')
+
+    args = parser.parse_args()
+
+    os.kill(args.pid, signal.SIGUSR1 if args.action == 'cpu' else signal.SIGUSR2)
+    print(f"📨 Sent {'SIGUSR1' if args.action == 'cpu' else 'SIGUSR2'} to {args.pid}")
+
+
+if __name__ == "__main__":
+    main()
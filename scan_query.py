@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Scan History Query
+Indexed queries over every snapshot and archive segment: filter by network, video, time range and viewers; table, JSON or CSV output
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from scan_archive import DEFAULT_ARCHIVE_DIR, DEFAULT_SNAPSHOT_PATTERN, ArchiveSegment, ScanArchive, read_snapshot
+
+DEFAULT_INDEX_FILE = 'scan_index.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS networks (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS videos (id INTEGER PRIMARY KEY, video_id TEXT NOT NULL UNIQUE, title TEXT);
+CREATE TABLE IF NOT EXISTS observations (
+    ts INTEGER NOT NULL,
+    network_id INTEGER NOT NULL,
+    video_id INTEGER NOT NULL,
+    viewers INTEGER,
+    PRIMARY KEY (ts, network_id, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_network ON observations (network_id, ts);
+CREATE INDEX IF NOT EXISTS observations_video ON observations (video_id, ts);
+CREATE INDEX IF NOT EXISTS observations_viewers ON observations (viewers);
+CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, signature TEXT NOT NULL, rows INTEGER NOT NULL);
+"""
+
+_RELATIVE_TIME = re.compile(r'^(\d+(?:\.\d+)?)([mhdw])$')
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO time or an age like 30m, 24h, 7d or 2w"""
+    if not value:
+        return None
+    match = _RELATIVE_TIME.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ScanIndex:
+    """SQLite index of every observation (snapshot time, network, video, viewers)
+
+    The primary key orders observations by time (the time-bucket index); secondary indexes
+    go from a network or a video to its observations. Snapshots and archive segments are
+    ingested once each and re-ingested only if they change.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_FILE):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._networks = dict(self._db.execute('SELECT name, id FROM networks'))
+        self._videos = {video_id: [row_id, title] for row_id, video_id, title
+                        in self._db.execute('SELECT id, video_id, title FROM videos')}
+
+    def close(self):
+        self._db.close()
+
+    def _network_id(self, name):
+        network_id = self._networks.get(name)
+        if network_id is None:
+            network_id = self._db.execute('INSERT INTO networks (name) VALUES (?)', (name,)).lastrowid
+            self._networks[name] = network_id
+        return network_id
+
+    def _video_id(self, video_id, title):
+        entry = self._videos.get(video_id)
+        if entry is None:
+            row_id = self._db.execute('INSERT INTO videos (video_id, title) VALUES (?, ?)',
+                                      (video_id, title)).lastrowid
+            self._videos[video_id] = [row_id, title]
+            return row_id
+        if title and title != entry[1]:
+            # Keep the most recently ingested title
+            self._db.execute('UPDATE videos SET title = ? WHERE id = ?', (title, entry[0]))
+            entry[1] = title
+        return entry[0]
+
+    def _ingest(self, name, signature, observations):
+        """observations: iterable of (epoch, LiveStream); duplicates of already indexed rows are ignored"""
+        rows = [(int(at), self._network_id(stream.network), self._video_id(stream.video_id, stream.title),
+                 stream.viewers) for at, stream in observations]
+        self._db.executemany('INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?)', rows)
+        self._db.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?)', (name, signature, len(rows)))
+        return len(rows)
+
+    def sync(self, archive_dir=DEFAULT_ARCHIVE_DIR, pattern=DEFAULT_SNAPSHOT_PATTERN):
+        """Ingest new or changed archive segments and snapshot files; returns the number of sources read"""
+        known = dict(self._db.execute('SELECT name, signature FROM sources'))
+        pending = []
+        for name in ScanArchive(archive_dir).segment_names():
+            stat = os.stat(os.path.join(archive_dir, name, 'meta.json'))
+            pending.append(('segment', f"segment:{name}", f"{stat.st_mtime_ns}:{stat.st_size}", name))
+        for path in sorted(glob.glob(pattern)):
+            stat = os.stat(path)
+            pending.append(('snapshot', f"snapshot:{os.path.basename(path)}",
+                            f"{stat.st_mtime_ns}:{stat.st_size}", path))
+
+        ingested = 0
+        with self._db:
+            for kind, name, signature, target in pending:
+                if known.get(name) == signature:
+                    continue
+                if kind == 'segment':
+                    segment = ArchiveSegment(os.path.join(archive_dir, target))
+                    self._ingest(name, signature, segment.streams())
+                    segment.close()
+                else:
+                    try:
+                        at, _, streams = read_snapshot(target)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"⚠️ Skipping {target}: {e}", file=sys.stderr)
+                        continue
+                    self._ingest(name, signature, ((at, stream) for stream in streams))
+                ingested += 1
+        return ingested
+
+    def query(self, networks=None, video_ids=None, since=None, until=None, min_viewers=None, max_viewers=None,
+              group=None, limit=100, newest_first=True):
+        """Matching observations, or one row per video / network when grouped; list of dicts"""
+        where, params = [], []
+        if networks:
+            where.append(f"o.network_id IN (SELECT id FROM networks WHERE name IN ({','.join('?' * len(networks))}))")
+            params.extend(networks)
+        if video_ids:
+            where.append(f"o.video_id IN (SELECT id FROM videos WHERE video_id IN ({','.join('?' * len(video_ids))}))")
+            params.extend(video_ids)
+        if since is not None:
+            where.append('o.ts >= ?')
+            params.append(int(since))
+        if until is not None:
+            where.append('o.ts < ?')
+            params.append(int(until))
+        if min_viewers is not None:
+            where.append('o.viewers >= ?')
+            params.append(min_viewers)
+        if max_viewers is not None:
+            where.append('o.viewers <= ?')
+            params.append(max_viewers)
+        clause = ('WHERE ' + ' AND '.join(where)) if where else ''
+        direction = 'DESC' if newest_first else 'ASC'
+
+        if group == 'video':
+            sql = (f"SELECT v.video_id, n.name AS network, v.title, MIN(o.ts) AS first_seen, MAX(o.ts) AS last_seen, "
+                   f"MAX(o.viewers) AS peak_viewers, COUNT(*) AS observations "
+                   f"FROM observations o JOIN videos v ON v.id = o.video_id JOIN networks n ON n.id = o.network_id "
+                   f"{clause} GROUP BY o.video_id, o.network_id ORDER BY last_seen {direction} LIMIT ?")
+        elif group == 'network':
+            sql = (f"SELECT n.name AS network, MIN(o.ts) AS first_seen, MAX(o.ts) AS last_seen, "
+                   f"MAX(o.viewers) AS peak_viewers, COUNT(DISTINCT o.video_id) AS videos, COUNT(*) AS observations "
+                   f"FROM observations o JOIN networks n ON n.id = o.network_id "
+                   f"{clause} GROUP BY o.network_id ORDER BY last_seen {direction} LIMIT ?")
+        else:
+            sql = (f"SELECT o.ts AS seen_at, n.name AS network, v.video_id, o.viewers, v.title "
+                   f"FROM observations o JOIN videos v ON v.id = o.video_id JOIN networks n ON n.id = o.network_id "
+                   f"{clause} ORDER BY o.ts {direction}, o.viewers DESC LIMIT ?")
+        params.append(limit)
+
+        cursor = self._db.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        rows = []
+        for values in cursor:
+            row = dict(zip(columns, values))
+            for key in ('seen_at', 'first_seen', 'last_seen'):
+                if key in row:
+                    row[key] = datetime.fromtimestamp(row[key]).isoformat(timespec='seconds')
+            rows.append(row)
+        return rows
+
+    def stats(self):
+        observations, first, last = self._db.execute('SELECT COUNT(*), MIN(ts), MAX(ts) FROM observations').fetchone()
+        sources = dict(self._db.execute(
+            "SELECT substr(name, 1, instr(name, ':') - 1), COUNT(*) FROM sources GROUP BY 1"))
+        return {'observations': observations, 'networks': len(self._networks), 'videos': len(self._videos),
+                'first': first, 'last': last, 'sources': sources}
+
+
+def print_rows(rows, output_format):
+    if output_format == 'json':
+        json.dump(rows, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    if not rows:
+        if output_format == 'table':
+            print("⚪ No matching observations")
+        return
+    columns = list(rows[0])
+    if output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, int):
+            return f"{value:,}"
+        return str(value)
+
+    # Titles go last and are cut to keep rows on one line
+    table = [[cell(row[column])[:60] if column == 'title' else cell(row[column]) for column in columns]
+             for row in rows]
+    widths = [max(len(column), *(len(values[i]) for values in table)) for i, column in enumerate(columns)]
+    numeric = [isinstance(rows[0][column], int) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+    for values in table:
+        print('  '.join(value.rjust(width) if is_number else value.ljust(width)
+                        for value, width, is_number in zip(values, widths, numeric)).rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan History Query')
+    parser.add_argument('--network', action='append', help='Only this network (repeatable)')
+    parser.add_argument('--video', action='append', help='Only this video ID (repeatable)')
+    parser.add_argument('--since', help='ISO time or age (30m, 24h, 7d, 2w)')
+    parser.add_argument('--until', help='ISO time or age, exclusive')
+    parser.add_argument('--min-viewers', type=int, help='Only observations with at least this many viewers')
+    parser.add_argument('--max-viewers', type=int, help='Only observations with at most this many viewers')
+    parser.add_argument('--group', choices=['video', 'network'],
+                        help='One row per video or network (first/last seen, peak viewers)')
+    parser.add_argument('--oldest-first', action='store_true', help='Sort oldest first')
+    parser.add_argument('--limit', type=int, default=50, help='Rows to return')
+    parser.add_argument('--format', choices=['table', 'json', 'csv'], default='table', help='Output format')
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE, help='Index database')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR, help='Archive segments to index')
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOT_PATTERN, help='Glob of snapshot files to index')
+    parser.add_argument('--no-sync', action='store_true', help="Query the index as is, without picking up new files")
+    parser.add_argument('--stats', action='store_true', help='Show what the index holds')
+
+    args = parser.parse_args()
+
+    index = ScanIndex(args.index)
+    try:
+        if not args.no_sync:
+            start = time.perf_counter()
+            ingested = index.sync(args.archive_dir, args.snapshots)
+            if ingested and args.format == 'table':
+                print(f"🗂️ Indexed {ingested} new or changed files in {time.perf_counter() - start:.2f}s\n")
+
+        if args.stats:
+            stats = index.stats()
+            span = ''
+            if stats['first'] is not None:
+                span = (f" from {datetime.fromtimestamp(stats['first']):%Y-%m-%d %H:%M}"
+                        f" to {datetime.fromtimestamp(stats['last']):%Y-%m-%d %H:%M}")
+            print(f"🗂️ {stats['observations']:,} observations{span}")
+            print(f"   {stats['networks']} networks, {stats['videos']:,} videos, sources: "
+                  + ", ".join(f"{count} {kind}s" for kind, count in sorted(stats['sources'].items())))
+            return
+
+        start = time.perf_counter()
+        rows = index.query(args.network, args.video, parse_time(args.since), parse_time(args.until),
+                           args.min_viewers, args.max_viewers, args.group, args.limit, not args.oldest_first)
+        elapsed = time.perf_counter() - start
+        print_rows(rows, args.format)
+        if args.format == 'table':
+            print(f"\n🔎 {len(rows)} rows in {elapsed * 1000:.1f} ms")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Scan Job Queue
+A durable SQLite queue of channel-scan and video-verify jobs with priorities, due times and time-limited worker leases
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from detectors import watch_url
+from scan_engine import ScanEngine, parse_network_list
+from scan_metrics import SCANNER_METRICS, start_metrics_server
+from stream_record import LiveStream, streams_to_dicts
+
+DEFAULT_QUEUE_FILE = 'scan_queue.db'
+DEFAULT_LEASE_SECONDS = 120
+# Video checks outrank channel scans so a channel's videos finish before the next channel starts
+CHANNEL_PRIORITY = 0
+VIDEO_PRIORITY = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    due_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    claimed_at REAL,
+    claim_latency REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority DESC, due_at);
+CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (state, lease_expires);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_key ON jobs (dedupe_key) WHERE state IN ('queued', 'leased');
+"""
+
+
+class Job:
+    """A claimed job: run it, then complete() or fail() it on the queue before the lease expires"""
+
+    __slots__ = ('id', 'kind', 'payload', 'attempts', 'lease_expires')
+
+    def __init__(self, job_id, kind, payload, attempts, lease_expires):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.lease_expires = lease_expires
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind!r}, {self.payload!r})"
+
+
+class ScanQueue:
+    """Lease-based job queue in one SQLite file, safe for several worker processes on one machine
+
+    A claim leases jobs to a worker for lease_seconds; jobs whose lease runs out (a crashed or
+    stuck worker) go back to the queue. Failed jobs are retried with backoff up to max_attempts.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _transaction(self, work):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(self._db)
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            return result
+
+    def enqueue(self, kind, payload, priority=0, due_at=None, dedupe_key=None, max_attempts=3):
+        """Add a job; returns its ID, or None if a job with the same dedupe_key is already pending"""
+        now = time.time()
+
+        def insert(db):
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, priority, due_at, enqueued_at, max_attempts) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, json.dumps(payload), dedupe_key, priority, due_at or now, now, max_attempts))
+            return cursor.lastrowid if cursor.rowcount else None
+
+        return self._transaction(insert)
+
+    def requeue_expired(self):
+        """Return jobs whose lease ran out to the queue; returns how many"""
+        return self._transaction(self._requeue_expired)
+
+    def _requeue_expired(self, db):
+        now = time.time()
+        cursor = db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "lease_owner = NULL, lease_expires = NULL, error = 'lease expired', "
+            "finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END "
+            "WHERE state = 'leased' AND lease_expires < ?", (now, now))
+        return cursor.rowcount
+
+    def claim(self, worker_id, limit=1, kinds=None):
+        """Lease up to `limit` due jobs, highest priority first"""
+        def take(db):
+            self._requeue_expired(db)
+            now = time.time()
+            query = "SELECT id, kind, payload, attempts, due_at FROM jobs WHERE state = 'queued' AND due_at <= ?"
+            params = [now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            query += ' ORDER BY priority DESC, due_at LIMIT ?'
+            params.append(limit)
+            rows = db.execute(query, params).fetchall()
+
+            jobs = []
+            expires = now + self.lease_seconds
+            for job_id, kind, payload, attempts, due_at in rows:
+                latency = now - due_at
+                db.execute(
+                    "UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?, claimed_at = ?, "
+                    "claim_latency = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, expires, now, latency, job_id))
+                SCANNER_METRICS.observe_queue_claim(kind, latency)
+                jobs.append(Job(job_id, kind, json.loads(payload), attempts + 1, expires))
+            return jobs
+
+        return self._transaction(take)
+
+    def extend(self, job, worker_id):
+        """Renew a lease for a job that is taking a while; False if the lease was lost"""
+        expires = time.time() + self.lease_seconds
+        cursor = self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (expires, job.id, worker_id)))
+        if cursor.rowcount:
+            job.lease_expires = expires
+        return bool(cursor.rowcount)
+
+    def complete(self, job, worker_id, result=None):
+        cursor = self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET state = 'done', finished_at = ?, result = ?, lease_owner = NULL, lease_expires = NULL "
+            "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (time.time(), json.dumps(result), job.id, worker_id)))
+        return bool(cursor.rowcount)
+
+    def fail(self, job, worker_id, error, retry_delay=30):
+        """Record a failure; the job is retried after an exponential delay until max_attempts"""
+        now = time.time()
+        cursor = self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "due_at = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+            "finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END "
+            "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (now + retry_delay * 2 ** (job.attempts - 1), str(error)[:500], now, job.id, worker_id)))
+        return bool(cursor.rowcount)
+
+    def purge(self, older_than_seconds):
+        """Delete finished jobs older than the given age"""
+        cutoff = time.time() - older_than_seconds
+        return self._transaction(lambda db: db.execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?", (cutoff,))).rowcount
+
+    def stats(self, window_seconds=3600):
+        """Queue depth by state and kind, due backlog and recent claim latency percentiles"""
+        now = time.time()
+        with self._lock:
+            depth = {}
+            for kind, state, count in self._db.execute(
+                    'SELECT kind, state, COUNT(*) FROM jobs GROUP BY kind, state'):
+                depth.setdefault(state, {})[kind] = count
+            ready, oldest_due = self._db.execute(
+                "SELECT COUNT(*), MIN(due_at) FROM jobs WHERE state = 'queued' AND due_at <= ?", (now,)).fetchone()
+            latencies = [row[0] for row in self._db.execute(
+                'SELECT claim_latency FROM jobs WHERE claimed_at >= ? ORDER BY claim_latency',
+                (now - window_seconds,))]
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        stats = {
+            'depth': depth,
+            'ready': ready,
+            'oldest_ready_seconds': round(now - oldest_due, 1) if oldest_due else 0.0,
+            'claims': len(latencies),
+            'claim_latency_p50': percentile(0.5),
+            'claim_latency_p95': percentile(0.95),
+        }
+        SCANNER_METRICS.observe_queue(stats)
+        return stats
+
+    def results(self, since):
+        """Results of video jobs that finished since the given Unix time"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT result FROM jobs WHERE kind = 'video' AND state = 'done' AND finished_at >= ? "
+                "ORDER BY finished_at", (since,)).fetchall()
+        return [json.loads(row[0]) for row in rows if row[0]]
+
+
+def seed_channels(queue, networks, due_at=None, max_videos=5):
+    """Enqueue a channel-scan job per network (skipping channels already pending)"""
+    added = 0
+    for network_name, channel_url in networks:
+        if queue.enqueue('channel', {'network': network_name, 'url': channel_url, 'max_videos': max_videos},
+                         CHANNEL_PRIORITY, due_at, dedupe_key=f"channel:{channel_url}"):
+            added += 1
+    return added
+
+
+class QueueWorker:
+    """Claims jobs and runs them through the scan engine"""
+
+    def __init__(self, queue, engine=None, worker_id=None, batch=4):
+        self.queue = queue
+        self.engine = engine or ScanEngine()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch = batch
+        self.job_delay = 0.3  # Politeness delay between jobs
+        self.completed = 0
+        self.failed = 0
+
+    def run_channel(self, job):
+        payload = job.payload
+        video_ids = self.engine.run(payload['url'], 'video_ids', timeout=15, require_ok=True,
+                                    circuit=payload['url'])
+        for video_id in video_ids[:payload.get('max_videos', 5)]:
+            self.queue.enqueue('video', {'network': payload['network'], 'video_id': video_id,
+                                         'channel_url': payload['url']},
+                               VIDEO_PRIORITY, dedupe_key=f"video:{video_id}")
+        return {'videos': len(video_ids)}
+
+    def run_video(self, job):
+        payload = job.payload
+        status = self.engine.run(watch_url(payload['video_id']), 'watch_status', timeout=8,
+                                 circuit=payload.get('channel_url'))
+        if not status['is_live']:
+            return {'is_live': False}
+        stream = LiveStream.detected_now(payload['video_id'], status['title'], status['viewers'], payload['network'])
+        return {'is_live': True, 'stream': stream.to_dict()}
+
+    def run_once(self):
+        """Claim and run one batch; returns how many jobs were claimed"""
+        jobs = self.queue.claim(self.worker_id, self.batch)
+        for job in jobs:
+            handler = self.run_channel if job.kind == 'channel' else self.run_video
+            try:
+                result = handler(job)
+            except Exception as e:
+                self.failed += 1
+                self.queue.fail(job, self.worker_id, e)
+                print(f"   ⚠️ {job.kind} job {job.id} failed (attempt {job.attempts}): {e}")
+                continue
+            if self.queue.complete(job, self.worker_id, result):
+                self.completed += 1
+            else:
+                print(f"   ⚠️ Lease on {job.kind} job {job.id} expired before it finished")
+            self.engine.pause(self.job_delay)
+        return len(jobs)
+
+    def run(self, idle_exit=False, poll_seconds=2):
+        print(f"🚀 Queue worker {self.worker_id} claiming from {self.queue.path}")
+        while True:
+            self.engine.begin_sweep()
+            if self.run_once():
+                continue
+            if idle_exit:
+                break
+            time.sleep(poll_seconds)
+        print(f"✅ {self.completed} jobs completed, {self.failed} failed")
+
+
+def export_results(queue, minutes, output):
+    """Write live streams found by video jobs in the last `minutes` in the refresh results format"""
+    streams = {}
+    for result in queue.results(time.time() - minutes * 60):
+        if result.get('is_live'):
+            streams[result['stream']['video_id']] = LiveStream.from_dict(result['stream'])
+    live_streams = list(streams.values())
+    results = {
+        'scan_info': {
+            'scan_number': 1,
+            'timestamp': datetime.now().isoformat(),
+            'scan_type': 'queue',
+            'total_live_streams': len(live_streams),
+            'total_networks': len({stream.network for stream in live_streams}),
+        },
+        'live_streams': streams_to_dicts(live_streams),
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return live_streams
+
+
+def print_stats(stats):
+    print("📬 Queue depth:")
+    if not stats['depth']:
+        print("   (empty)")
+    for state, kinds in sorted(stats['depth'].items()):
+        print(f"   {state:<7} " + ", ".join(f"{kind} {count}" for kind, count in sorted(kinds.items())))
+    print(f"⏳ Ready now: {stats['ready']} (oldest waiting {stats['oldest_ready_seconds']}s)")
+    print(f"⏱️ Claim latency over {stats['claims']} recent claims: "
+          f"p50 {stats['claim_latency_p50']}s, p95 {stats['claim_latency_p95']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan Job Queue')
+    parser.add_argument('command', choices=['seed', 'worker', 'stats', 'export', 'purge'],
+                        help='seed channel jobs, run a worker, show depth/latency, export live streams, purge old jobs')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_FILE, help='SQLite queue file')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list to seed from')
+    parser.add_argument('--every', type=float, default=0,
+                        help='seed: keep re-seeding every N minutes (0 = once)')
+    parser.add_argument('--max-videos', type=int, default=5, help='seed: videos checked per channel')
+    parser.add_argument('--worker-id', help='worker: name recorded on leases (default: host-pid)')
+    parser.add_argument('--batch', type=int, default=4, help='worker: jobs claimed at a time')
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help='Lease length in seconds')
+    parser.add_argument('--idle-exit', action='store_true', help='worker: exit when no job is due')
+    parser.add_argument('--base-url', help='worker: fetch from this host instead of YouTube')
+    parser.add_argument('--metrics-port', type=int, default=0, help='worker: serve Prometheus metrics on this port')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help='worker: interface for the metrics server (0.0.0.0 = every interface)')
+    parser.add_argument('--minutes', type=float, default=30, help='export: include results from the last N minutes')
+    parser.add_argument('--output', default='latest_live_streams.json', help='export: results file')
+    parser.add_argument('--older-than', type=float, default=24, help='purge: hours since a job finished')
+
+    args = parser.parse_args()
+
+    queue = ScanQueue(args.queue, lease_seconds=args.lease)
+
+    if args.command == 'seed':
+        while True:
+            added = seed_channels(queue, parse_network_list(args.network_list), max_videos=args.max_videos)
+            print(f"🌱 Enqueued {added} channel jobs ({datetime.now().strftime('%H:%M:%S')})")
+            if not args.every:
+                break
+            time.sleep(args.every * 60)
+
+    elif args.command == 'worker':
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port, args.metrics_host)
+        QueueWorker(queue, ScanEngine(base_url=args.base_url), args.worker_id, args.batch).run(args.idle_exit)
+
+    elif args.command == 'stats':
+        print_stats(queue.stats())
+
+    elif args.command == 'export':
+        live_streams = export_results(queue, args.minutes, args.output)
+        print(f"💾 {len(live_streams)} live streams from the last {args.minutes:g} minutes -> {args.output}")
+
+    elif args.command == 'purge':
+        print(f"🧹 Purged {queue.purge(args.older_than * 3600)} finished jobs")
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
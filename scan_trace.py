@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Scan Tracing
+Lightweight spans for sweeps, channels, videos, fetches, parses and detectors written to a JSONL trace, plus a timeline report
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class Span:
+    """One timed operation; nested spans on the same thread record it as their parent"""
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = None
+        self.parent = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.id = self.tracer._next_id()
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self._start = time.time()
+        self._perf = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._perf
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+        record = {
+            'id': self.id,
+            'parent': self.parent,
+            'name': self.name,
+            'start': round(self._start, 6),
+            'ms': round(duration * 1000, 3),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+        }
+        record.update(self.attrs)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        self.tracer._write(record)
+        return False
+
+
+class _NullSpan:
+    """Shared do-nothing span used while tracing is off"""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Writes finished spans as JSON lines; every span is a no-op until a trace file is opened"""
+
+    def __init__(self, path=None):
+        self.path = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        if path:
+            self.open(path)
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        """Start appending spans to path (also exported so parse worker processes trace too)"""
+        self.close()
+        self.path = path
+        # Unbuffered append: each span is one write, so threads and processes can share the file
+        self._file = open(path, 'ab', buffering=0)
+        os.environ['SCANNER_TRACE'] = path
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def span(self, name, **attrs):
+        if self._file is None:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _next_id(self):
+        return f'{os.getpid():x}-{next(self._ids)}'
+
+    def _write(self, record):
+        if self._file is not None:
+            self._file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+# Process-wide tracer, enabled by SCANNER_TRACE=path or a scanner's --trace flag
+TRACER = Tracer(os.environ.get('SCANNER_TRACE'))
+
+
+def traced(span_name, *arg_names):
+    """Decorator: run a method inside a span, recording its leading arguments under the given names"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not TRACER.enabled:
+                return func(self, *args, **kwargs)
+            attrs = dict(zip(arg_names, args))
+            attrs.update((name, kwargs[name]) for name in arg_names if name in kwargs)
+            with TRACER.span(span_name, **attrs):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def load_spans(path):
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    spans.sort(key=lambda span: span['start'])
+    return spans
+
+
+def _label(span):
+    return span.get('network') or span.get('url') or span['name']
+
+
+def _seconds(ms):
+    return f"{ms / 1000:.2f} s"
+
+
+def _print_slowest(title, spans, top):
+    if not spans:
+        return
+    print(f"\n🐢 {title}:")
+    for span in sorted(spans, key=lambda s: s['ms'], reverse=True)[:top]:
+        extra = f" ({span['status']})" if 'status' in span else ''
+        print(f"   {span['ms'] / 1000:7.2f} s  {_label(span)}{extra}")
+
+
+def print_report(path, top=10, sweep_index=-1, width=40, rows=40):
+    """Render one sweep's timeline, a time breakdown and the slowest channels, videos and fetches"""
+    spans = load_spans(path)
+    if not spans:
+        print(f"❌ No spans in {path}")
+        return
+
+    sweeps = [span for span in spans if span['name'] == 'sweep']
+    if sweeps:
+        sweep = sweeps[sweep_index]
+        window_start = sweep['start']
+        window_end = sweep['start'] + sweep['ms'] / 1000
+        spans = [span for span in spans if window_start <= span['start'] <= window_end]
+        print(f"🧭 {path}: sweep {sweeps.index(sweep) + 1} of {len(sweeps)}, {len(spans)} spans")
+    else:
+        window_start = spans[0]['start']
+        window_end = max(span['start'] + span['ms'] / 1000 for span in spans)
+        print(f"🧭 {path}: {len(spans)} spans (no sweep spans - showing everything)")
+
+    wall = window_end - window_start
+    print(f"⏱️ Wall time: {wall:.2f} s")
+
+    # Where the time went, by span type (overlapping spans add up past the wall time)
+    print("\n📊 Time by span type:")
+    totals = {}
+    for span in spans:
+        count, ms = totals.get(span['name'], (0, 0))
+        totals[span['name']] = (count + 1, ms + span['ms'])
+    for name, (count, ms) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True):
+        if name != 'sweep':
+            print(f"   • {name:<12} {count:>6} spans {_seconds(ms):>10}")
+
+    fetches = [span for span in spans if span['name'] == 'fetch']
+    if fetches:
+        print("\n🌐 Fetches by endpoint:")
+        endpoints = {}
+        for span in fetches:
+            endpoint = endpoints.setdefault(span.get('endpoint', 'other'), [0, 0, 0, 0])
+            endpoint[0] += 1
+            endpoint[1] += span['ms']
+            endpoint[2] += span.get('ttfb_ms', 0)
+            endpoint[3] += span.get('bytes', 0)
+        for name, (count, ms, ttfb, size) in sorted(endpoints.items(), key=lambda item: item[1][1], reverse=True):
+            print(f"   • {name:<8} {count:>5} fetches {_seconds(ms):>10} "
+                  f"(TTFB {_seconds(ttfb)}, body {_seconds(ms - ttfb)}, {size:,} bytes)")
+        errors = [span for span in fetches if span.get('error') or span.get('status', 200) >= 400]
+        if errors:
+            print(f"   ⚠️ {len(errors)} failed fetches")
+
+    # Timeline of channels (channel spans, or channel-page fetches for pipelined sweeps)
+    lanes = [span for span in spans if span['name'] == 'channel']
+    if not lanes:
+        lanes = [span for span in fetches if span.get('endpoint') in ('channel', 'streams')]
+    if lanes and wall > 0:
+        print("\n🗓️ Timeline:")
+        for span in lanes[:rows]:
+            offset = span['start'] - window_start
+            begin = int(offset / wall * width)
+            length = max(1, int(span['ms'] / 1000 / wall * width))
+            bar = ' ' * begin + '█' * min(length, width - begin)
+            print(f"   +{offset:7.2f}s |{bar:<{width}}| {span['ms'] / 1000:6.2f}s {_label(span)}")
+        if len(lanes) > rows:
+            print(f"   ... {len(lanes) - rows} more")
+
+    _print_slowest('Slowest channels', [span for span in spans if span['name'] == 'channel'], top)
+    _print_slowest('Slowest videos', [span for span in spans if span['name'] == 'video'], top)
+    _print_slowest('Slowest fetches', fetches, top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan Tracing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = subparsers.add_parser('report', help='Render a sweep timeline and the slowest spans')
+    report_parser.add_argument('trace', help='JSONL trace file')
+    report_parser.add_argument('--top', type=int, default=10, help='Slowest channels/videos/fetches to list')
+    report_parser.add_argument('--sweep', type=int, default=-1,
+                               help='Which sweep to show (1-based, negative counts from the end)')
+    report_parser.add_argument('--width', type=int, default=40, help='Timeline width in characters')
+
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        sweep_index = args.sweep - 1 if args.sweep > 0 else args.sweep
+        print_report(args.trace, top=args.top, sweep_index=sweep_index, width=args.width)
+
+
+if __name__ == "__main__":
+    main()
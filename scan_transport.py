@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Scan Transport
+Keep-alive HTTP sessions with tuned connection pools, a DNS cache, optional HTTP/2 (httpx) and connection-reuse statistics
+"""
+
+import argparse
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Hosts kept in the pool (youtube.com plus the odd redirect target) and connections kept per host;
+# the per-host size should cover the number of concurrent fetch threads
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_DNS_TTL = 300
+
+
+class DNSCache:
+    """Caches getaddrinfo() results for a TTL so new connections skip repeated lookups
+
+    Only the scanner's pooled connections consult it (see PooledAdapter); the socket module
+    is left alone. Failed lookups are never cached.
+    """
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        result = socket.getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+        return list(result)
+
+    def addresses(self, host, port):
+        """Distinct IP addresses for a host name, or None for an IP literal or a failed lookup"""
+        if not self.ttl or _is_ip(host.strip('[]')):
+            return None
+        try:
+            results = self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            return None
+        return list(dict.fromkeys(sockaddr[0] for *_, sockaddr in results)) or None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _is_ip(host):
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except OSError:
+            pass
+    return False
+
+
+# One resolver cache shared by every pooled session in the process
+DNS_CACHE = DNSCache()
+
+
+class _CachedDNSMixin:
+    """Connects to the cached addresses of the host; TLS (SNI, certificate checks) still uses the host name"""
+
+    dns_cache = DNS_CACHE
+
+    def _new_conn(self):
+        host = self._dns_host
+        addresses = self.dns_cache.addresses(host, self.port)
+        if not addresses:
+            return super()._new_conn()
+        try:
+            for address in addresses[:-1]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    continue
+            self._dns_host = addresses[-1]
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+
+class CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that reports how many requests reused a pooled keep-alive connection
+
+    With cache_dns, its new connections resolve hosts through DNS_CACHE.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, cache_dns=False):
+        self.cache_dns = cache_dns
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self._retired = {'requests': 0, 'connections': 0}
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        if self.cache_dns:
+            self.poolmanager.pool_classes_by_scheme = {'http': CachedDNSHTTPConnectionPool,
+                                                      'https': CachedDNSHTTPSConnectionPool}
+
+    def connection_stats(self):
+        # urllib3 counts new connections and requests per host pool
+        totals = dict(self._retired)
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                totals['requests'] += pool.num_requests
+                totals['connections'] += pool.num_connections
+        return totals
+
+    def close(self):
+        stats = self.connection_stats()
+        super().close()
+        self._retired = stats
+
+
+class Http2Response:
+    """The parts of a requests.Response the engine and cassettes use, backed by an httpx response"""
+
+    def __init__(self, response):
+        self.url = str(response.url)
+        self.status_code = response.status_code
+        self.content = response.content
+        self.encoding = response.encoding
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+        self.elapsed = response.elapsed
+        self.http_version = response.http_version
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error: {self.reason} for url: {self.url}", response=self)
+
+
+class Http2Session:
+    """A requests-compatible GET session on an httpx client, multiplexing requests over HTTP/2
+
+    httpx errors are re-raised as the matching requests exceptions so retries and error
+    handling behave exactly as with the default transport.
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        if httpx is None:
+            raise ImportError("HTTP/2 needs httpx with HTTP/2 support: pip install 'httpx[http2]'")
+        self.client = httpx.Client(
+            http2=True, follow_redirects=True,
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize))
+        self.headers = self.client.headers
+        self._streams = set()
+        self._requests = 0
+        self._http2_requests = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, **kwargs):
+        try:
+            response = self.client.get(url, timeout=timeout, **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        with self._lock:
+            self._requests += 1
+            if response.http_version == 'HTTP/2':
+                self._http2_requests += 1
+            stream = response.extensions.get('network_stream')
+            if stream is not None:
+                self._streams.add(id(stream))
+        return Http2Response(response)
+
+    def request(self, method, url, **kwargs):
+        if method != 'GET':
+            raise ValueError(f"Http2Session only supports GET, not {method}")
+        return self.get(url, **kwargs)
+
+    def connection_stats(self):
+        with self._lock:
+            return {'requests': self._requests, 'connections': len(self._streams),
+                    'http2_requests': self._http2_requests}
+
+    def close(self):
+        self.client.close()
+
+
+def create_session(http2=False, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   dns_ttl=DEFAULT_DNS_TTL):
+    """A session whose connections are pooled and kept alive across every fetch of a sweep
+
+    Falls back to the pooled requests transport when HTTP/2 is asked for but httpx is missing.
+    dns_ttl > 0 caches lookups for this session's pooled connections (not for httpx or anything
+    else in the process).
+    """
+    if http2:
+        if httpx is not None:
+            return Http2Session(pool_maxsize=pool_maxsize)
+        print("⚠️ httpx not installed - using HTTP/1.1 keep-alive pools instead of HTTP/2")
+
+    session = requests.Session()
+    if dns_ttl:
+        DNS_CACHE.ttl = dns_ttl
+    adapter = PooledAdapter(pool_connections, pool_maxsize, cache_dns=bool(dns_ttl))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def connection_stats(session):
+    """Requests, connections opened and reuse ratio for a session (a cassette's wrapped session included)"""
+    inner = getattr(session, 'session', None)
+    if inner is not None and not hasattr(session, 'adapters'):
+        session = inner
+
+    if hasattr(session, 'connection_stats'):
+        stats = session.connection_stats()
+    else:
+        stats = {'requests': 0, 'connections': 0}
+        seen = set()
+        for adapter in getattr(session, 'adapters', {}).values():
+            if isinstance(adapter, PooledAdapter) and id(adapter) not in seen:
+                seen.add(id(adapter))
+                for name, value in adapter.connection_stats().items():
+                    stats[name] += value
+
+    stats['reused'] = max(stats['requests'] - stats['connections'], 0)
+    stats['reuse_ratio'] = round(stats['reused'] / stats['requests'], 4) if stats['requests'] else 0.0
+    stats['dns_hits'] = DNS_CACHE.hits
+    stats['dns_misses'] = DNS_CACHE.misses
+    return stats
+
+
+def format_connection_stats(stats):
+    return (f"{stats['requests']} requests over {stats['connections']} connections "
+            f"({stats['reuse_ratio']:.0%} reused), DNS cache {stats['dns_hits']} hits / {stats['dns_misses']} lookups")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan Transport')
+    parser.add_argument('urls', nargs='+', help='URLs to fetch through one pooled session')
+    parser.add_argument('--repeat', type=int, default=5, help='Times to fetch each URL')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent fetch threads')
+    parser.add_argument('--http2', action='store_true', help='Use HTTP/2 via httpx when installed')
+    parser.add_argument('--pool-maxsize', type=int, default=DEFAULT_POOL_MAXSIZE,
+                        help='Keep-alive connections per host')
+
+    args = parser.parse_args()
+
+    session = create_session(http2=args.http2, pool_maxsize=args.pool_maxsize)
+    jobs = [url for url in args.urls for _ in range(args.repeat)]
+
+    def fetch(url):
+        try:
+            return session.get(url, timeout=15).status_code
+        except requests.RequestException as e:
+            return type(e).__name__
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = list(pool.map(fetch, jobs))
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"🌐 {len(jobs)} fetches in {elapsed:.2f}s ({ok} OK)")
+    print(f"🔌 {format_connection_stats(connection_stats(session))}")
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Sharded Sweeps
+Splits the channel registry across scanner workers by rendezvous hashing, with heartbeat membership and merged partial results
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from auto_refresh_scanner import AutoRefreshLiveStreamScanner
+from resilient_fetch import RateBudget
+from scan_engine import ScanEngine, parse_network_list
+from stream_record import LiveStream, streams_to_dicts
+
+DEFAULT_SHARD_DIR = 'shards'
+HEARTBEAT_SECONDS = 30
+# A worker that misses this many heartbeats is considered gone and its channels move
+MISSED_HEARTBEATS = 3
+
+
+def _write_json(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def shard_weight(worker_id, key):
+    digest = hashlib.blake2b(f"{worker_id}|{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_owner(key, workers):
+    """Rendezvous (highest random weight) hashing: a join or leave only moves that worker's share"""
+    return max(workers, key=lambda worker_id: shard_weight(worker_id, key))
+
+
+def assign_shards(networks, workers):
+    """{worker_id: [(network name, channel URL), ...]} for the current members"""
+    shards = {worker_id: [] for worker_id in workers}
+    for network_name, channel_url in networks:
+        shards[shard_owner(channel_url, workers)].append((network_name, channel_url))
+    return shards
+
+
+class ShardMembership:
+    """Heartbeat files in a shared directory; members are the workers that heartbeated recently"""
+
+    def __init__(self, shard_dir, worker_id, heartbeat_seconds=HEARTBEAT_SECONDS):
+        self.worker_id = worker_id
+        self.heartbeat_seconds = heartbeat_seconds
+        self.members_dir = os.path.join(shard_dir, 'members')
+        os.makedirs(self.members_dir, exist_ok=True)
+        self.path = os.path.join(self.members_dir, f"{worker_id}.json")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def heartbeat(self, **details):
+        _write_json(self.path, {'worker_id': self.worker_id, 'host': socket.gethostname(), 'pid': os.getpid(),
+                                'heartbeat_at': time.time(), **details})
+
+    def live_members(self):
+        cutoff = time.time() - self.heartbeat_seconds * MISSED_HEARTBEATS
+        members = set()
+        for filename in os.listdir(self.members_dir):
+            if not filename.endswith('.json'):
+                continue
+            entry = _read_json(os.path.join(self.members_dir, filename))
+            if entry and entry.get('heartbeat_at', 0) >= cutoff:
+                members.add(entry['worker_id'])
+        members.add(self.worker_id)
+        return sorted(members)
+
+    def start(self):
+        """Keep heartbeating from a background thread so long sweeps don't look like departures"""
+        self.heartbeat()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            self.heartbeat()
+
+    def leave(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ShardWorker:
+    """Scans this worker's share of the network list and publishes it as a partial result"""
+
+    def __init__(self, scanner, shard_dir=DEFAULT_SHARD_DIR, worker_id=None, network_list_file='network_list.txt'):
+        self.scanner = scanner
+        self.shard_dir = shard_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.network_list_file = network_list_file
+        self.membership = ShardMembership(shard_dir, self.worker_id)
+        self.results_dir = os.path.join(shard_dir, 'results')
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.previous_members = None
+
+    def sweep(self, quick_mode=True):
+        networks = parse_network_list(self.network_list_file)
+        members = self.membership.live_members()
+        if self.previous_members is not None and members != self.previous_members:
+            print(f"🔀 Membership changed: {len(self.previous_members)} -> {len(members)} workers, rebalancing")
+        self.previous_members = members
+
+        mine = assign_shards(networks, members)[self.worker_id]
+        print(f"\n🧩 {self.worker_id}: shard {members.index(self.worker_id) + 1}/{len(members)} - "
+              f"{len(mine)} of {len(networks)} networks")
+
+        self.scanner.engine.begin_sweep()
+        start = time.perf_counter()
+        streams = self.scanner.scan_networks(mine, 5 if quick_mode else 15)
+        duration = time.perf_counter() - start
+
+        _write_json(os.path.join(self.results_dir, f"{self.worker_id}.json"), {
+            'worker_id': self.worker_id,
+            'members': members,
+            'completed_at': time.time(),
+            'sweep_seconds': round(duration, 3),
+            'scan_type': 'quick' if quick_mode else 'full',
+            'channels': [channel_url for _, channel_url in mine],
+            'live_streams': streams_to_dicts(streams),
+        })
+        self.membership.heartbeat(last_sweep_seconds=round(duration, 3), channels=len(mine))
+        print(f"📤 Published {len(streams)} live streams from {len(mine)} networks in {duration:.1f}s")
+        return streams
+
+
+def merge_partials(shard_dir=DEFAULT_SHARD_DIR, network_list_file='network_list.txt',
+                   output='latest_live_streams.json', max_age_seconds=1800):
+    """Assemble the global results file from every fresh partial result"""
+    results_dir = os.path.join(shard_dir, 'results')
+    cutoff = time.time() - max_age_seconds
+    partials = []
+    for filename in sorted(os.listdir(results_dir)) if os.path.isdir(results_dir) else []:
+        partial = _read_json(os.path.join(results_dir, filename)) if filename.endswith('.json') else None
+        if partial and partial.get('completed_at', 0) >= cutoff:
+            partials.append(partial)
+
+    # During a rebalance a channel may appear in two partials; keep each video's newest detection
+    streams = {}
+    covered = set()
+    for partial in sorted(partials, key=lambda p: p['completed_at']):
+        covered.update(partial['channels'])
+        for data in partial['live_streams']:
+            streams[data['video_id']] = LiveStream.from_dict(data)
+
+    networks = parse_network_list(network_list_file)
+    missing = [network_name for network_name, channel_url in networks if channel_url not in covered]
+    live_streams = sorted(streams.values(), key=lambda stream: (stream.network, -(stream.viewers or 0)))
+
+    results = {
+        'scan_info': {
+            'scan_number': len(partials),
+            'timestamp': datetime.now().isoformat(),
+            'scan_type': 'sharded',
+            'total_live_streams': len(live_streams),
+            'total_networks': len(networks),
+            'shards': len(partials),
+            'missing_networks': missing,
+        },
+        'live_streams': streams_to_dicts(live_streams),
+    }
+    _write_json(output, results)
+    return results
+
+
+def print_status(shard_dir, network_list_file):
+    membership = ShardMembership(shard_dir, '(status)')
+    members = [member for member in membership.live_members() if member != '(status)']
+    networks = parse_network_list(network_list_file)
+    if not members:
+        print(f"⚪ No live workers in {shard_dir}")
+        return
+    shards = assign_shards(networks, members)
+    print(f"🧩 {len(members)} live workers, {len(networks)} networks")
+    for worker_id in members:
+        heartbeat = _read_json(os.path.join(membership.members_dir, f"{worker_id}.json")) or {}
+        partial = _read_json(os.path.join(shard_dir, 'results', f"{worker_id}.json")) or {}
+        age = time.time() - heartbeat.get('heartbeat_at', 0)
+        last = partial.get('sweep_seconds')
+        print(f"   • {worker_id}: {len(shards[worker_id])} networks, heartbeat {age:.0f}s ago"
+              + (f", last sweep {last:.1f}s with {len(partial.get('live_streams', []))} live" if last else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded Sweeps')
+    parser.add_argument('command', choices=['worker', 'merge', 'status'],
+                        help='worker = scan this shard repeatedly, merge = assemble latest results, status = show members')
+    parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR,
+                        help='Directory shared by all workers (a network filesystem for multiple nodes)')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--worker-id', help='Stable worker name (default: host-pid)')
+    parser.add_argument('--interval', type=float, default=15, help='Minutes between sweeps')
+    parser.add_argument('--once', action='store_true', help='Run a single sweep and exit')
+    parser.add_argument('--full', action='store_true', help='Check 15 videos per channel instead of 5')
+    parser.add_argument('--concurrency', type=int, default=1, help='Pages fetched in parallel by this worker')
+    parser.add_argument('--requests-per-minute', type=float, default=0,
+                        help="This worker's request budget (0 = unlimited)")
+    parser.add_argument('--base-url', help='Fetch from this host instead of YouTube')
+    parser.add_argument('--output', default='latest_live_streams.json', help='Merged results file')
+    parser.add_argument('--max-age', type=float, default=30,
+                        help='Minutes a partial result stays eligible for merging')
+    parser.add_argument('--no-merge', action='store_true', help="Don't merge after each of this worker's sweeps")
+
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status(args.shard_dir, args.network_list)
+        return
+
+    if args.command == 'merge':
+        results = merge_partials(args.shard_dir, args.network_list, args.output, args.max_age * 60)
+        info = results['scan_info']
+        print(f"🧩 Merged {info['shards']} partial results: {info['total_live_streams']} live streams -> {args.output}")
+        if info['missing_networks']:
+            print(f"⚠️ Not covered by a fresh partial: {', '.join(info['missing_networks'])}")
+        return
+
+    engine = ScanEngine(fetch_threads=max(args.concurrency, 1), base_url=args.base_url)
+    if args.requests_per_minute:
+        engine.fetcher.rate_limiter = RateBudget(args.requests_per_minute, sleep=engine.pause)
+    scanner = AutoRefreshLiveStreamScanner(engine, concurrency=args.concurrency)
+    worker = ShardWorker(scanner, args.shard_dir, args.worker_id, args.network_list)
+    worker.membership.start()
+    print(f"🚀 Shard worker {worker.worker_id} joined {args.shard_dir}")
+
+    try:
+        while True:
+            worker.sweep(quick_mode=not args.full)
+            if not args.no_merge:
+                info = merge_partials(args.shard_dir, args.network_list, args.output, args.max_age * 60)['scan_info']
+                print(f"🧩 Merged {info['shards']} shards: {info['total_live_streams']} live streams, "
+                      f"{len(info['missing_networks'])} networks not yet covered")
+            if args.once:
+                break
+            print(f"\n⏰ Next sweep in {args.interval} minutes...")
+            time.sleep(args.interval * 60)
+    except KeyboardInterrupt:
+        print(f"\n🛑 Worker {worker.worker_id} stopping")
+    finally:
+        worker.membership.leave()
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Spike Detector
+Flags sudden viewer surges and newly started high-viewer streams per network from online EWMA statistics
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+from scan_archive import DEFAULT_ARCHIVE_DIR, DEFAULT_SNAPSHOT_PATTERN, ScanArchive, read_snapshot
+from stream_record import LiveStream
+
+DEFAULT_STATE_FILE = 'spike_state.json'
+DEFAULT_EVENTS_FILE = 'spike_events.jsonl'
+DEFAULT_PROMOTED_FILE = 'promoted_streams.json'
+
+
+class SeriesStats:
+    """Exponentially weighted mean and variance of one network's combined viewers"""
+
+    __slots__ = ('mean', 'variance', 'count', 'last_at', 'cooldown_until', 'live_videos')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.variance = 0.0
+        self.count = 0
+        self.last_at = 0
+        self.cooldown_until = 0
+        self.live_videos = ()
+
+    def update(self, value, alpha):
+        if self.count == 0:
+            self.mean = float(value)
+        else:
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.count += 1
+
+    def to_list(self):
+        return [self.mean, self.variance, self.count, self.last_at, self.cooldown_until, list(self.live_videos)]
+
+    @classmethod
+    def from_list(cls, values):
+        stats = cls()
+        stats.mean, stats.variance, stats.count, stats.last_at, stats.cooldown_until, live_videos = values
+        stats.live_videos = tuple(live_videos)
+        return stats
+
+
+class SpikeDetector:
+    """Per-network surge detection in constant memory per series
+
+    Each sweep's combined viewers are scored against the network's EWMA baseline before being
+    folded into it. A 'spike' is a z-score over z_threshold that is also at least jump_ratio
+    times the baseline; a 'new_live' is a video that wasn't live last sweep and starts with at
+    least new_live_viewers. After an event the network is quiet for cooldown_seconds.
+    Out-of-cycle re-scans are scored with update_baseline=False: they follow a spike, so
+    folding them in would pull the baseline toward it.
+    """
+
+    def __init__(self, state_path=DEFAULT_STATE_FILE, alpha=0.2, z_threshold=3.5, jump_ratio=1.5,
+                 min_viewers=5000, new_live_viewers=20000, warmup=4, cooldown_seconds=1800):
+        self.state_path = state_path
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.jump_ratio = jump_ratio
+        self.min_viewers = min_viewers
+        self.new_live_viewers = new_live_viewers
+        self.warmup = warmup
+        self.cooldown_seconds = cooldown_seconds
+        self.series = {}
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def score_deviation(self, stats):
+        # A floor on the deviation keeps a flat baseline (e.g. a steady 24/7 stream) from
+        # turning every small wobble into a huge z-score
+        return max(math.sqrt(stats.variance), stats.mean * 0.05, 100)
+
+    def score(self, stats, value):
+        return (value - stats.mean) / self.score_deviation(stats)
+
+    def observe_network(self, network, streams, at=None, update_baseline=True):
+        """Score one network's streams from a sweep; returns a list of events (usually empty)"""
+        at = int(at if at is not None else time.time())
+        stats = self.series.get(network)
+        if stats is None:
+            stats = self.series[network] = SeriesStats()
+        viewers = sum(stream.viewers or 0 for stream in streams)
+        previously_live = set(stats.live_videos)
+        z = self.score(stats, viewers)
+        baseline = stats.mean
+
+        events = []
+        if stats.count >= self.warmup and at >= stats.cooldown_until:
+            new_streams = [stream for stream in streams if stream.video_id not in previously_live
+                           and (stream.viewers or 0) >= self.new_live_viewers]
+            if new_streams:
+                for stream in new_streams:
+                    events.append(self._event('new_live', network, stream, viewers, baseline, z, at))
+            elif z >= self.z_threshold and viewers >= self.min_viewers and viewers >= baseline * self.jump_ratio:
+                top = max(streams, key=lambda stream: stream.viewers or 0)
+                events.append(self._event('spike', network, top, viewers, baseline, z, at))
+        if events:
+            stats.cooldown_until = at + self.cooldown_seconds
+
+        if update_baseline:
+            # Fold outliers in clipped, so one surge doesn't inflate the baseline and mask the next
+            limit = stats.mean + self.z_threshold * self.score_deviation(stats)
+            stats.update(min(viewers, limit) if stats.count >= self.warmup else viewers, self.alpha)
+        stats.last_at = at
+        stats.live_videos = tuple(stream.video_id for stream in streams)
+        return events
+
+    def observe_sweep(self, live_streams, network_names, at=None, update_baseline=True):
+        """Score every scanned network (networks with no live streams count as zero viewers)"""
+        by_network = {name: [] for name in network_names}
+        for stream in live_streams:
+            by_network.setdefault(stream.network, []).append(stream)
+        events = []
+        for network, streams in by_network.items():
+            events.extend(self.observe_network(network, streams, at, update_baseline))
+        return events
+
+    def _event(self, kind, network, stream, viewers, baseline, z, at):
+        return {
+            'type': kind,
+            'network': network,
+            'video_id': stream.video_id,
+            'url': stream.url,
+            'title': stream.title,
+            'stream_viewers': stream.viewers,
+            'network_viewers': viewers,
+            'baseline': round(baseline),
+            'z': round(z, 2) if math.isfinite(z) else None,
+            'detected_at': datetime.fromtimestamp(at).isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        if not self.state_path:
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({network: stats.to_list() for network, stats in self.series.items()}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.state_path)
+
+    def load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self.series = {network: SeriesStats.from_list(values) for network, values in data.items()}
+
+
+def record_events(events, events_path=DEFAULT_EVENTS_FILE, promoted_path=DEFAULT_PROMOTED_FILE,
+                  promote_minutes=60):
+    """Append events to the event log and refresh the list of streams to put at the front of the wall"""
+    now = time.time()
+    promoted = []
+    if promoted_path and os.path.exists(promoted_path):
+        try:
+            with open(promoted_path, 'r', encoding='utf-8') as f:
+                promoted = json.load(f).get('promoted', [])
+        except (OSError, json.JSONDecodeError):
+            promoted = []
+    promoted = [entry for entry in promoted if entry['promote_until'] > now]
+
+    if events and events_path:
+        with open(events_path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    if promoted_path:
+        current = {entry['video_id']: entry for entry in promoted}
+        for event in events:
+            current[event['video_id']] = dict(event, promote_until=now + promote_minutes * 60)
+        ordered = sorted(current.values(), key=lambda entry: entry['detected_at'], reverse=True)
+        temp_path = promoted_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': datetime.now().isoformat(timespec='seconds'), 'promoted': ordered}, f,
+                      indent=2, ensure_ascii=False)
+        os.replace(temp_path, promoted_path)
+        promoted = ordered
+    return promoted
+
+
+def format_event(event):
+    if event['type'] == 'new_live':
+        summary = f"🆕 New high-viewer stream on {event['network']}: {event['stream_viewers']:,} viewers"
+    else:
+        summary = f"🚨 Viewer spike on {event['network']}: {event['network_viewers']:,} viewers"
+    return f"{summary} (baseline {event['baseline']:,}) - {event['title'][:60]} {event['url']}"
+
+
+def history_sweeps(archive_dir=DEFAULT_ARCHIVE_DIR, pattern=DEFAULT_SNAPSHOT_PATTERN):
+    """Yield (epoch, [LiveStream]) for every archived and raw snapshot, oldest first"""
+    sweeps = {}
+    for snapshot in ScanArchive(archive_dir).snapshots():
+        at = int(datetime.fromisoformat(snapshot['scan_info']['timestamp']).timestamp())
+        sweeps[at] = [LiveStream.from_dict(data) for data in snapshot['live_streams']]
+    for path in glob.glob(pattern):
+        try:
+            at, _, streams = read_snapshot(path)
+        except (OSError, ValueError, KeyError):
+            continue
+        sweeps.setdefault(at, streams)
+    for at in sorted(sweeps):
+        yield at, sweeps[at]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spike Detector')
+    parser.add_argument('command', choices=['replay', 'events', 'promoted'],
+                        help='replay = run the detector over scan history, events = recent events, '
+                             'promoted = streams currently promoted to the front of the wall')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR, help='Archive segments to replay')
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOT_PATTERN, help='Glob of snapshot files to replay')
+    parser.add_argument('--z-threshold', type=float, default=3.5, help='Standard deviations above baseline')
+    parser.add_argument('--jump-ratio', type=float, default=1.5, help='Minimum multiple of the baseline')
+    parser.add_argument('--new-live-viewers', type=int, default=20000,
+                        help='Viewers for a newly started stream to count as an event')
+    parser.add_argument('--events-file', default=DEFAULT_EVENTS_FILE, help='Event log')
+    parser.add_argument('--promoted-file', default=DEFAULT_PROMOTED_FILE, help='Promoted streams file')
+    parser.add_argument('--limit', type=int, default=20, help='Events to show')
+
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        detector = SpikeDetector(None, z_threshold=args.z_threshold, jump_ratio=args.jump_ratio,
+                                 new_live_viewers=args.new_live_viewers)
+        networks = set()
+        sweeps = events = 0
+        for at, streams in history_sweeps(args.archive_dir, args.snapshots):
+            networks.update(stream.network for stream in streams)
+            for event in detector.observe_sweep(streams, networks, at):
+                print(f"{event['detected_at']}  {format_event(event)}")
+                events += 1
+            sweeps += 1
+        print(f"\n📈 {events} events over {sweeps} sweeps of {len(networks)} networks")
+    elif args.command == 'events':
+        if not os.path.exists(args.events_file):
+            print(f"⚪ No events in {args.events_file}")
+            return
+        with open(args.events_file, 'r', encoding='utf-8') as f:
+            lines = f.readlines()[-args.limit:]
+        for line in lines:
+            event = json.loads(line)
+            print(f"{event['detected_at']}  {format_event(event)}")
+    elif args.command == 'promoted':
+        promoted = record_events([], None, args.promoted_file) if os.path.exists(args.promoted_file) else []
+        if not promoted:
+            print("⚪ Nothing promoted right now")
+        for entry in promoted:
+            remaining = (entry['promote_until'] - time.time()) / 60
+            print(f"{format_event(entry)}  ({remaining:.0f} min left)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Local Stand-in YouTube Server
+Serves channel, /streams, watch and Atom feed pages for the network list (recorded or synthetic) with configurable latency, errors, 429 bursts and live-status churn
+"""
+
+import argparse
+import base64
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from detectors import classify_url
+from scan_engine import YOUTUBE_BASE_URL, parse_network_list
+
+
+def _stable_id(*parts, length=11):
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')[:length]
+
+
+def _atom_time(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec='seconds')
+
+
+class FaultPolicy:
+    """Latency, random 5xx errors and periodic 429 bursts applied to every response"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, burst_every=0, burst_length=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.started = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, (self.latency_ms + jitter) / 1000)
+
+    def in_burst(self):
+        if not self.burst_every or not self.burst_length:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_length
+
+    def forced_status(self):
+        """Status code to fail this request with, or None to serve it normally"""
+        if self.in_burst():
+            return 429
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice([500, 502, 503])
+        return None
+
+
+class StandInYouTube:
+    """In-memory channel universe with churning live status and detection-latency tracking"""
+
+    def __init__(self, networks, synthetic=0, videos_per_channel=15, live_fraction=0.3,
+                 churn_seconds=0, churn_rate=0.1, corpus=None, seed=1):
+        self.corpus = corpus
+        self.churn_seconds = churn_seconds
+        self.churn_rate = churn_rate
+        self.channels = {}
+        self.channel_ids = {}
+        self.videos = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_churn = time.monotonic() + churn_seconds if churn_seconds else None
+
+        self.started_at = time.time()
+        self.requests = {}
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.detection_latencies = deque(maxlen=10000)
+        self.missed_lives = 0
+
+        all_networks = list(networks)
+        for i in range(synthetic):
+            all_networks.append((f"Synthetic News {i + 1:05d}", f"{YOUTUBE_BASE_URL}/@synthetic{i + 1:05d}"))
+
+        for network_name, channel_url in all_networks:
+            self._add_channel(network_name, channel_url, videos_per_channel, live_fraction)
+
+    def _add_channel(self, network_name, channel_url, videos_per_channel, live_fraction):
+        handle = channel_url.rstrip('/').rsplit('/', 1)[-1]
+        channel = {
+            'name': network_name,
+            'handle': handle,
+            'url': channel_url,
+            'channel_id': 'UC' + _stable_id(handle, length=22),
+            'videos': [],
+        }
+
+        now = time.time()
+        for i in range(videos_per_channel):
+            video_id = _stable_id(handle, i)
+            is_live = self._random.random() < (live_fraction if i == 0 else 0.05)
+            self.videos[video_id] = {
+                'video_id': video_id,
+                'handle': handle.lower(),
+                'title': f"{network_name} {'Live' if i == 0 else 'Report'} #{i + 1}",
+                'live': is_live,
+                'viewers': self._random.randint(50, 50000),
+                'views': self._random.randint(1000, 2000000),
+                'live_since': now if is_live else None,
+                'published': now - i * 3600,
+                'updated': now - i * 3600,
+                'detected': False,
+            }
+            channel['videos'].append(video_id)
+
+        self.channels[handle.lower()] = channel
+        self.channel_ids[channel['channel_id']] = channel
+
+    def network_list_lines(self):
+        lines = ['Network\tYouTube Channel URL', '']
+        lines.extend(f"{channel['name']}\t{channel['url']}" for channel in self.channels.values())
+        return '\n'.join(lines) + '\n'
+
+    def churn(self):
+        """Flip live status of a random share of videos once per churn interval"""
+        if self._next_churn is None or time.monotonic() < self._next_churn:
+            return
+
+        with self._lock:
+            if time.monotonic() < self._next_churn:
+                return
+            self._next_churn = time.monotonic() + self.churn_seconds
+
+            now = time.time()
+            for video in self.videos.values():
+                if self._random.random() >= self.churn_rate:
+                    continue
+                if video['live'] and not video['detected']:
+                    self.missed_lives += 1
+                video['live'] = not video['live']
+                video['live_since'] = now if video['live'] else None
+                video['updated'] = now
+                video['detected'] = False
+                if video['live']:
+                    video['viewers'] = self._random.randint(50, 50000)
+
+    def record_request(self, endpoint, status, size):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.bytes_sent += size
+
+    def mark_seen_live(self, video):
+        with self._lock:
+            if video['live'] and not video['detected']:
+                video['detected'] = True
+                self.detection_latencies.append(time.time() - video['live_since'])
+
+    def stats(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        total = sum(self.requests.values())
+        latencies = sorted(self.detection_latencies)
+
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3) if latencies else None
+
+        return {
+            'uptime_s': round(elapsed, 1),
+            'channels': len(self.channels),
+            'videos': len(self.videos),
+            'live_now': sum(1 for video in self.videos.values() if video['live']),
+            'requests': dict(self.requests),
+            'statuses': dict(self.statuses),
+            'requests_per_s': round(total / elapsed, 2),
+            'bytes_sent': self.bytes_sent,
+            'detection_latency_s': {
+                'count': len(latencies),
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 3) if latencies else None,
+            },
+            'missed_lives': self.missed_lives,
+        }
+
+    # -- page rendering -----------------------------------------------------
+
+    def _renderer(self, video):
+        renderer = {
+            'videoId': video['video_id'],
+            'title': {'runs': [{'text': video['title']}]},
+        }
+        if video['live']:
+            renderer['badges'] = [{'metadataBadgeRenderer': {'label': 'LIVE', 'style': 'BADGE_STYLE_TYPE_LIVE_NOW'}}]
+            renderer['viewCountText'] = {'runs': [{'text': f"{video['viewers']:,}"}, {'text': ' watching now'}]}
+        else:
+            renderer['viewCountText'] = {'simpleText': f"{video['views']:,} views"}
+        return {'videoRenderer': renderer}
+
+    def channel_page(self, channel, streams_only=False):
+        videos = [self.videos[video_id] for video_id in channel['videos']]
+        if streams_only:
+            videos = [video for video in videos if video['live']] + videos[:3]
+
+        links = []
+        for video in videos:
+            badge = '<div class="badge-shape-wiz__text">LIVE</div>' if video['live'] else ''
+            links.append(f'<div class="item"><a href="/watch?v={video["video_id"]}" '
+                         f'title="{html.escape(video["title"])}">{html.escape(video["title"])}</a>{badge}</div>')
+
+        initial_data = {
+            'metadata': {'channelMetadataRenderer': {
+                'title': channel['name'],
+                'externalId': channel['channel_id'],
+                'channelUrl': f"{YOUTUBE_BASE_URL}/channel/{channel['channel_id']}",
+            }},
+            'contents': [self._renderer(video) for video in videos],
+        }
+
+        return (
+            '<!DOCTYPE html><html><head>'
+            f'<title>{html.escape(channel["name"])} - YouTube</title>'
+            f'<meta property="og:url" content="{YOUTUBE_BASE_URL}/channel/{channel["channel_id"]}">'
+            '</head><body>'
+            + ''.join(links) +
+            f'<script>var ytInitialData = {json.dumps(initial_data, separators=(",", ":"))};</script>'
+            '</body></html>'
+        )
+
+    def watch_page(self, video):
+        details = {
+            'videoId': video['video_id'],
+            'title': video['title'],
+            'isLiveContent': video['live'],
+            'viewCount': str(video['views']),
+        }
+        extra = ''
+        if video['live']:
+            details['isLive'] = True
+            player = {'videoDetails': details,
+                      'microformat': {'liveBroadcastDetails': {'isLiveNow': True}},
+                      'concurrentViewers': str(video['viewers'])}
+            extra = f'<span class="view-count">{video["viewers"]:,} watching now</span>'
+        else:
+            player = {'videoDetails': details}
+
+        return (
+            '<!DOCTYPE html><html><head>'
+            f'<title>{html.escape(video["title"])} - YouTube</title>'
+            '</head><body>'
+            f'<script>var ytInitialPlayerResponse = {json.dumps(player, separators=(",", ":"))};</script>'
+            f'{extra}</body></html>'
+        )
+
+    def feed(self, channel):
+        """(Atom feed of a channel's uploads, last update epoch); an entry's <updated> moves when it goes live or ends"""
+        videos = [self.videos[video_id] for video_id in channel['videos']]
+        entries = ''.join(
+            '<entry>'
+            f'<id>yt:video:{video["video_id"]}</id>'
+            f'<yt:videoId>{video["video_id"]}</yt:videoId>'
+            f'<yt:channelId>{channel["channel_id"]}</yt:channelId>'
+            f'<title>{html.escape(video["title"])}</title>'
+            f'<link rel="alternate" href="{YOUTUBE_BASE_URL}/watch?v={video["video_id"]}"/>'
+            f'<published>{_atom_time(video["published"])}</published>'
+            f'<updated>{_atom_time(video["updated"])}</updated>'
+            '</entry>'
+            for video in videos)
+        updated = max((video['updated'] for video in videos), default=self.started_at)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+            f'<id>yt:channel:{channel["channel_id"]}</id>'
+            f'<yt:channelId>{channel["channel_id"]}</yt:channelId>'
+            f'<title>{html.escape(channel["name"])}</title>'
+            f'<link rel="alternate" href="{channel["url"]}"/>'
+            + entries +
+            '</feed>'
+        ), updated
+
+    def recorded_page(self, path):
+        if self.corpus is None:
+            return None
+        page = self.corpus.load(YOUTUBE_BASE_URL + path)
+        return page[1].decode('utf-8', errors='replace') if page and page[0] == 200 else None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server_version = 'StandInYouTube/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', endpoint='other', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.site.record_request(endpoint, status, len(data))
+
+    def do_GET(self):
+        site = self.server.site
+        parsed = urlparse(self.path)
+
+        if parsed.path == '/__stats':
+            return self._send(200, json.dumps(site.stats(), indent=2), 'application/json', endpoint='stats')
+
+        delay = self.server.faults.delay()
+        if delay:
+            time.sleep(delay)
+
+        site.churn()
+
+        status = self.server.faults.forced_status()
+        if status:
+            endpoint = classify_url(self.path)
+            if status == 429:
+                return self._send(429, 'Too Many Requests', 'text/plain', endpoint, {'Retry-After': '5'})
+            return self._send(status, 'Server Error', 'text/plain', endpoint)
+
+        if parsed.path == '/feeds/videos.xml':
+            return self._send_feed(site, parsed)
+
+        endpoint, page = self._route(site, parsed)
+        if page is None:
+            return self._send(404, 'Not Found', 'text/plain', endpoint)
+        self._send(200, page, endpoint=endpoint)
+
+    def _send_feed(self, site, parsed):
+        """Channel feed with ETag/Last-Modified validators, answering 304 when the client's copy is current"""
+        channel = site.channel_ids.get(parse_qs(parsed.query).get('channel_id', [''])[0])
+        if channel is None:
+            return self._send(404, 'Not Found', 'text/plain', 'feed')
+        body, updated = site.feed(channel)
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"'
+        headers = {'ETag': etag, 'Last-Modified': formatdate(updated, usegmt=True)}
+        content_type = 'application/atom+xml; charset=utf-8'
+
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_none_match:
+            not_modified = etag in [tag.strip() for tag in if_none_match.split(',')]
+        elif if_modified_since:
+            try:
+                not_modified = int(updated) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                not_modified = False
+        else:
+            not_modified = False
+        if not_modified:
+            return self._send(304, '', content_type, 'feed', headers)
+        self._send(200, body, content_type, 'feed', headers)
+
+    def _route(self, site, parsed):
+        path = parsed.path.rstrip('/')
+
+        if path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [''])[0]
+            video = site.videos.get(video_id)
+            if video is None:
+                return 'watch', None
+            recorded = site.recorded_page(self.path)
+            if recorded is not None:
+                return 'watch', recorded
+            site.mark_seen_live(video)
+            return 'watch', site.watch_page(video)
+
+        parts = path.strip('/').split('/')
+        channel = site.channels.get(parts[0].lower()) if parts and parts[0] else None
+        if channel is None:
+            return 'other', None
+
+        tab = parts[1] if len(parts) > 1 else ''
+        endpoint = 'streams' if tab == 'streams' else 'channel'
+        recorded = site.recorded_page(path)
+        if recorded is not None:
+            return endpoint, recorded
+        return endpoint, site.channel_page(channel, streams_only=(tab == 'streams'))
+
+
+def make_server(site, faults, host='127.0.0.1', port=8765, verbose=False):
+    """Build (but do not start) a threaded stand-in server"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.site = site
+    server.faults = faults
+    server.verbose = verbose
+    return server
+
+
+def start_background(site, faults=None, host='127.0.0.1', port=0):
+    """Start a stand-in server on a daemon thread; returns (server, base_url)"""
+    server = make_server(site, faults or FaultPolicy(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Stand-in YouTube Server')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--network-list', default='network_list.txt', help='Network list file')
+    parser.add_argument('--synthetic', type=int, default=0, help='Extra synthetic channels to serve')
+    parser.add_argument('--videos', type=int, default=15, help='Videos per channel')
+    parser.add_argument('--live-fraction', type=float, default=0.3, help='Share of channels with a live main stream')
+    parser.add_argument('--fixtures', help='Serve recorded pages from this fixture corpus when available')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random +/- latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 5xx')
+    parser.add_argument('--burst-every', type=float, default=0, help='Seconds between 429 bursts (0 = never)')
+    parser.add_argument('--burst-length', type=float, default=0, help='Length of each 429 burst in seconds')
+    parser.add_argument('--churn-seconds', type=float, default=0, help='Live-status churn interval (0 = static)')
+    parser.add_argument('--churn-rate', type=float, default=0.1, help='Share of videos flipped per churn')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for reproducible runs')
+    parser.add_argument('--write-network-list', help='Write a network list covering every served channel')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    args = parser.parse_args()
+
+    corpus = None
+    if args.fixtures:
+        from fixture_corpus import FixtureCorpus
+        corpus = FixtureCorpus(args.fixtures)
+
+    site = StandInYouTube(parse_network_list(args.network_list), synthetic=args.synthetic,
+                          videos_per_channel=args.videos, live_fraction=args.live_fraction,
+                          churn_seconds=args.churn_seconds, churn_rate=args.churn_rate,
+                          corpus=corpus, seed=args.seed)
+    faults = FaultPolicy(args.latency_ms, args.jitter_ms, args.error_rate,
+                         args.burst_every, args.burst_length, seed=args.seed)
+
+    if args.write_network_list:
+        with open(args.write_network_list, 'w', encoding='utf-8') as f:
+            f.write(site.network_list_lines())
+        print(f"📝 Network list for {len(site.channels)} channels written to {args.write_network_list}")
+
+    server = make_server(site, faults, args.host, args.port, args.verbose)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+
+    print("🧪 Stand-in YouTube Server")
+    print("=" * 60)
+    print(f"Serving {len(site.channels)} channels / {len(site.videos)} videos at {base_url}")
+    print(f"Stats: {base_url}/__stats")
+    print(f"Point scanners here with: SCANNER_BASE_URL={base_url}")
+    print("Press Ctrl+C to stop")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 Stopped at {datetime.now().strftime('%H:%M:%S')}")
+        print(json.dumps(site.stats(), indent=2))
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
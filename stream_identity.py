@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Stream Identity
+One canonical record per live video across networks, plus MinHash grouping of streams with near-identical titles
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import unicodedata
+
+from stream_record import LiveStream
+
+# Mersenne prime for the universal hash family standing in for random permutations
+_PRIME = (1 << 61) - 1
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 32
+DEFAULT_TITLE_THRESHOLD = 0.5
+
+# Words that carry no identity in a live title
+_BOILERPLATE = {'live', 'watch', 'now', 'stream', 'streaming', 'news', '24', '7', 'breaking', 'update', 'updates',
+                'coverage', 'full', 'the', 'on', 'in', 'of', 'and', 'a'}
+_WORD = re.compile(r"[\w']+")
+
+
+def dedupe_streams(live_streams):
+    """(one stream per video ID, {video_id: [networks]} for videos surfaced by several networks)
+
+    The first network to surface a video (network-list order) keeps it.
+    """
+    canonical = {}
+    surfaced_by = {}
+    for stream in live_streams:
+        if stream.video_id not in canonical:
+            canonical[stream.video_id] = stream
+            surfaced_by[stream.video_id] = [stream.network]
+        elif stream.network not in surfaced_by[stream.video_id]:
+            surfaced_by[stream.video_id].append(stream.network)
+    shared = {video_id: networks for video_id, networks in surfaced_by.items() if len(networks) > 1}
+    return list(canonical.values()), shared
+
+
+def normalize_title(title, network=''):
+    """Lower-case words of a title without accents, boilerplate or the network's own name"""
+    text = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode('ascii').lower()
+    skip = _BOILERPLATE | set(_WORD.findall(network.lower()))
+    return ' '.join(word for word in _WORD.findall(text) if word not in skip)
+
+
+def shingles(text, size=4):
+    """Character n-grams, which tolerate the small rewordings networks make to shared feeds"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHashIndex:
+    """Locality-sensitive index of MinHash signatures with banding
+
+    Items sharing any band of their signature become candidates; candidates are kept if their
+    estimated Jaccard similarity reaches the threshold.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, threshold=DEFAULT_TITLE_THRESHOLD, seed=1):
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, _PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _PRIME) for _ in range(num_perm)]
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.signatures = {}
+        self._buckets = {}
+
+    def signature(self, items):
+        if not items:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for item in items]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in zip(self._a, self._b))
+
+    @staticmethod
+    def similarity(first, second):
+        return sum(x == y for x, y in zip(first, second)) / len(first)
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def query(self, signature):
+        """[(key, estimated similarity)] of indexed items similar to a signature"""
+        candidates = set()
+        for band_key in self._bands(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = [(key, self.similarity(signature, self.signatures[key])) for key in candidates]
+        return [(key, score) for key, score in matches if score >= self.threshold]
+
+    def add(self, key, items):
+        """Index an item; returns its matches among the items already indexed"""
+        signature = self.signature(items)
+        if signature is None:
+            return []
+        matches = self.query(signature)
+        self.signatures[key] = signature
+        for band_key in self._bands(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+        return matches
+
+
+def group_by_title(live_streams, threshold=DEFAULT_TITLE_THRESHOLD, min_words=3):
+    """Groups (lists, most-watched first) of two or more streams whose normalized titles look alike
+
+    Titles with fewer than min_words identifying words (placeholders such as 'Unknown Title',
+    bare network names) are left ungrouped.
+    """
+    index = MinHashIndex(threshold=threshold)
+    parent = list(range(len(live_streams)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, stream in enumerate(live_streams):
+        title = normalize_title(stream.title, stream.network)
+        if title.count(' ') + 1 < min_words:
+            continue
+        for j, _ in index.add(i, shingles(title)):
+            parent[root(i)] = root(j)
+
+    groups = {}
+    for i, stream in enumerate(live_streams):
+        groups.setdefault(root(i), []).append(stream)
+    return [sorted(group, key=lambda stream: stream.viewers or 0, reverse=True)
+            for group in groups.values() if len(group) > 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream Identity')
+    parser.add_argument('results', nargs='?', default='latest_live_streams.json', help='Results file to examine')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_TITLE_THRESHOLD,
+                        help='Estimated title similarity (Jaccard) for grouping')
+
+    args = parser.parse_args()
+
+    with open(args.results, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    streams = [LiveStream.from_dict(stream) for stream in data.get('live_streams', [])]
+    unique, shared = dedupe_streams(streams)
+    # Results written by the refresh daemon are already deduplicated and list sharing networks
+    shared = {**data.get('scan_info', {}).get('surfaced_by', {}), **shared}
+
+    print(f"🆔 {len(streams)} entries, {len(unique)} distinct videos")
+    for video_id, networks in shared.items():
+        print(f"   🔗 {video_id}: {', '.join(networks)}")
+
+    groups = group_by_title(unique, args.threshold)
+    if groups:
+        print(f"\n🧬 {len(groups)} groups of similar titles:")
+    for group in groups:
+        print(f"   • {group[0].title[:70]}")
+        for stream in group:
+            viewers = '' if stream.viewers is None else f" ({stream.viewers:,} viewers)"
+            print(f"       {stream.network}: {stream.video_id}{viewers}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Live Stream Records
+A compact, slotted record for one detected live stream, shared by the scanners and serialized to the existing JSON schema
+"""
+
+import sys
+import time
+from datetime import datetime
+
+from detectors import watch_url
+
+
+def _to_epoch(value):
+    """Integer Unix time from an epoch number, an ISO timestamp string or a datetime"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+class LiveStream:
+    """One detected live stream
+
+    Network names and detection methods are interned, the detection time is an integer
+    epoch and the watch URL is derived from the video ID, so a long-running daemon can hold
+    many observations cheaply. to_dict() produces the same keys the JSON results always had.
+    """
+
+    __slots__ = ('video_id', 'title', 'viewers', 'network', 'detected_epoch',
+                 'detection_method', 'has_live_badge')
+
+    def __init__(self, video_id, title='', viewers=None, network='', detected_at=None,
+                 detection_method=None, has_live_badge=None):
+        self.video_id = video_id
+        self.title = title
+        self.viewers = viewers
+        self.network = sys.intern(network) if network else network
+        self.detected_epoch = None if detected_at is None else _to_epoch(detected_at)
+        self.detection_method = sys.intern(detection_method) if detection_method else None
+        self.has_live_badge = has_live_badge
+
+    @classmethod
+    def detected_now(cls, video_id, title, viewers, network, **kwargs):
+        """A stream detected at the current time"""
+        return cls(video_id, title, viewers, network, detected_at=time.time(), **kwargs)
+
+    @property
+    def url(self):
+        return watch_url(self.video_id)
+
+    @property
+    def detected_at(self):
+        """ISO timestamp of the detection, or None if not recorded"""
+        if self.detected_epoch is None:
+            return None
+        return datetime.fromtimestamp(self.detected_epoch).isoformat()
+
+    def to_dict(self):
+        result = {
+            'video_id': self.video_id,
+            'url': self.url,
+            'title': self.title,
+        }
+        if self.viewers is not None:
+            result['viewers'] = self.viewers
+        result['network'] = self.network
+        if self.detected_epoch is not None:
+            result['detected_at'] = self.detected_at
+        if self.detection_method is not None:
+            result['detection_method'] = self.detection_method
+        if self.has_live_badge is not None:
+            result['has_live_badge'] = self.has_live_badge
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['video_id'], data.get('title', ''), data.get('viewers'), data.get('network', ''),
+                   data.get('detected_at'), data.get('detection_method'), data.get('has_live_badge'))
+
+    def __eq__(self, other):
+        if not isinstance(other, LiveStream):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"LiveStream({self.video_id!r}, {self.network!r}, viewers={self.viewers!r})"
+
+
+def streams_to_dicts(streams):
+    """Serialize records for the JSON result files"""
+    return [stream.to_dict() for stream in streams]
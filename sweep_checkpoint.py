@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Sweep Checkpoints
+Persists completed channels and checked videos incrementally so an interrupted sweep can resume without re-fetching
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from stream_record import LiveStream
+
+DEFAULT_FRESHNESS_MINUTES = 30
+
+
+class SweepCheckpoint:
+    """Append-only JSONL log of one sweep's progress
+
+    The first line describes the sweep; every later line is a completed channel (with its
+    live streams) or a checked video (with its watch-page status). Entries older than the
+    freshness window are ignored when resuming.
+    """
+
+    def __init__(self, path, scan_type, freshness_minutes=DEFAULT_FRESHNESS_MINUTES, resume=False):
+        self.path = path
+        self.scan_type = scan_type
+        self.freshness_seconds = freshness_minutes * 60
+        self.channels = {}
+        self.videos = {}
+        self.resumed = False
+
+        if resume and os.path.exists(path):
+            self.resumed = self._load()
+
+        if not self.resumed:
+            self.channels.clear()
+            self.videos.clear()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'type': 'sweep', 'scan_type': scan_type,
+                                    'started_at': datetime.now().isoformat()}) + '\n')
+
+        self._file = open(path, 'a', encoding='utf-8')
+        if self.resumed and not self._ends_with_newline():
+            self._file.write('\n')
+
+    def _load(self):
+        """Read a previous checkpoint; False if it belongs to a different kind of sweep"""
+        cutoff = time.time() - self.freshness_seconds
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    if i == 0:
+                        # Without its header the sweep's type is unknown, so it can't be resumed
+                        return False
+                    # A line cut short by a crash
+                    continue
+                if i == 0:
+                    if entry.get('type') != 'sweep' or entry.get('scan_type') != self.scan_type:
+                        return False
+                    continue
+                if entry.get('completed_at', 0) < cutoff:
+                    continue
+                if entry['type'] == 'channel':
+                    self.channels[entry['url']] = entry
+                elif entry['type'] == 'video':
+                    self.videos[entry['url']] = entry
+        return True
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def channel_streams(self, channel_url, network_name=None):
+        """Live streams of a channel completed in the freshness window, or None
+
+        With network_name the streams are attributed to that network, for a channel listed
+        under more than one name.
+        """
+        entry = self.channels.get(channel_url)
+        if entry is None:
+            return None
+        streams = [LiveStream.from_dict(stream) for stream in entry['streams']]
+        if network_name:
+            for stream in streams:
+                stream.network = network_name
+        return streams
+
+    def record_channel(self, network_name, channel_url, live_streams):
+        entry = {
+            'type': 'channel',
+            'network': network_name,
+            'url': channel_url,
+            'completed_at': int(time.time()),
+            'streams': [stream.to_dict() for stream in live_streams],
+        }
+        self.channels[channel_url] = entry
+        self._append(entry)
+
+    def video_status(self, video_url):
+        """Watch-page status of a video checked in the freshness window, or None"""
+        entry = self.videos.get(video_url)
+        return None if entry is None else entry['status']
+
+    def record_video(self, video_url, status):
+        entry = {'type': 'video', 'url': video_url, 'completed_at': int(time.time()), 'status': status}
+        self.videos[video_url] = entry
+        self._append(entry)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def complete(self):
+        """The sweep finished: nothing is left to resume"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def summary(self):
+        return f"{len(self.channels)} channels and {len(self.videos)} videos from {self.path}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep Checkpoints')
+    parser.add_argument('checkpoint', help='Checkpoint file to inspect')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.checkpoint):
+        print(f"⚪ No checkpoint at {args.checkpoint} - the last sweep completed or none was started")
+        return
+
+    channels = videos = live = 0
+    newest = None
+    with open(args.checkpoint, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry['type'] == 'channel':
+                channels += 1
+                live += len(entry['streams'])
+            else:
+                videos += 1
+            newest = max(newest or entry['completed_at'], entry['completed_at'])
+
+    print(f"💾 {header['scan_type']} sweep started {header['started_at']}")
+    print(f"   Channels completed: {channels} ({live} live streams)")
+    print(f"   Videos checked: {videos}")
+    if newest:
+        print(f"   Last progress: {datetime.fromtimestamp(newest).isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
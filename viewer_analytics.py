@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Viewer Analytics
+Columnar NumPy analysis of scan history: peak hours, growth, percentiles and cross-network correlation
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from scan_archive import DEFAULT_ARCHIVE_DIR, ScanArchive
+
+DEFAULT_SNAPSHOT_PATTERN = 'live_streams_refresh_*.json'
+DEFAULT_HISTORY_CACHE = 'viewer_history.npz'
+
+HOUR = 3600
+DAY = 86400
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Viewer analytics needs NumPy: pip install numpy")
+
+
+class ViewerHistory:
+    """Viewer observations as parallel columns: timestamp, network id, video id, viewers
+
+    Network and video ids index into the `networks` and `videos` name lists. Every stream in a
+    snapshot shares the snapshot's timestamp, so (network, timestamp) groups are whole sweeps.
+    """
+
+    def __init__(self, timestamps, network_ids, video_ids, viewers, networks, videos, sources=()):
+        self.timestamps = timestamps
+        self.network_ids = network_ids
+        self.video_ids = video_ids
+        self.viewers = viewers
+        self.networks = list(networks)
+        self.videos = list(videos)
+        self.sources = list(sources)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls):
+        _require_numpy()
+        return cls(np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.int64), [], [])
+
+    @classmethod
+    def from_snapshots(cls, paths, base=None):
+        """Parse snapshot files, appending to `base` (reusing its name dictionaries) if given"""
+        _require_numpy()
+        base = base or cls.empty()
+        network_index = {name: i for i, name in enumerate(base.networks)}
+        video_index = {video_id: i for i, video_id in enumerate(base.videos)}
+        timestamps, network_ids, video_ids, viewers, sources = [], [], [], [], []
+
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+            stamp = data.get('scan_info', {}).get('timestamp')
+            at = int(datetime.fromisoformat(stamp).timestamp()) if stamp else int(os.path.getmtime(path))
+            for stream in data.get('live_streams', []):
+                timestamps.append(at)
+                network_ids.append(network_index.setdefault(stream.get('network', ''), len(network_index)))
+                video_ids.append(video_index.setdefault(stream['video_id'], len(video_index)))
+                viewers.append(stream.get('viewers') or 0)
+            sources.append(os.path.basename(path))
+
+        return cls(np.concatenate([base.timestamps, np.array(timestamps, np.int64)]),
+                   np.concatenate([base.network_ids, np.array(network_ids, np.int32)]),
+                   np.concatenate([base.video_ids, np.array(video_ids, np.int32)]),
+                   np.concatenate([base.viewers, np.array(viewers, np.int64)]),
+                   list(network_index), list(video_index), base.sources + sources)
+
+    def save(self, path):
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, timestamps=self.timestamps, network_ids=self.network_ids, video_ids=self.video_ids,
+                 viewers=self.viewers, networks=np.array(self.networks, dtype=str),
+                 videos=np.array(self.videos, dtype=str), sources=np.array(self.sources, dtype=str))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        _require_numpy()
+        with np.load(path) as data:
+            return cls(data['timestamps'], data['network_ids'], data['video_ids'], data['viewers'],
+                       data['networks'].tolist(), data['videos'].tolist(), data['sources'].tolist())
+
+    def select(self, since=None, until=None, networks=None):
+        """Observations in [since, until) epoch seconds, optionally only for some network names"""
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= self.timestamps >= since
+        if until is not None:
+            mask &= self.timestamps < until
+        if networks:
+            wanted = [self.networks.index(name) for name in networks if name in self.networks]
+            mask &= np.isin(self.network_ids, wanted)
+        return ViewerHistory(self.timestamps[mask], self.network_ids[mask], self.video_ids[mask],
+                             self.viewers[mask], self.networks, self.videos, self.sources)
+
+    @classmethod
+    def from_archive(cls, archive, base=None, skip_sources=()):
+        """Append archived snapshots (except skip_sources) straight from the segments' column files"""
+        _require_numpy()
+        base = base or cls.empty()
+        networks, videos, sources = list(base.networks), list(base.videos), list(base.sources)
+        network_index = {name: i for i, name in enumerate(networks)}
+        video_index = {video_id: i for i, video_id in enumerate(videos)}
+        parts = [(base.timestamps, base.network_ids, base.video_ids, base.viewers)]
+
+        for segment in archive.segments():
+            wanted = [entry for entry in segment.meta['snapshots'] if entry['source'] not in skip_sources]
+            if not wanted or not segment.rows:
+                sources.extend(entry['source'] for entry in wanted)
+                segment.close()
+                continue
+            timestamps = np.frombuffer(segment.column('timestamps'), np.int64)
+            # Select rows by snapshot, not timestamp: two snapshots can share a second
+            mask = np.zeros(len(timestamps), bool)
+            for entry, first, end in segment.snapshot_rows():
+                if entry['source'] not in skip_sources:
+                    mask[first:end] = True
+            # Translate the segment's dictionary ids into this history's ids
+            network_map = np.array([network_index.setdefault(name, len(network_index))
+                                    for name in segment.dictionary['networks']], np.int32)
+            video_map = np.array([video_index.setdefault(video_id, len(video_index))
+                                  for video_id in segment.dictionary['videos']], np.int32)
+            parts.append((timestamps[mask].copy(),
+                          network_map[np.frombuffer(segment.column('network_ids'), np.int32)[mask]],
+                          video_map[np.frombuffer(segment.column('video_ids'), np.int32)[mask]],
+                          np.maximum(np.frombuffer(segment.column('viewers'), np.int64)[mask], 0)))
+            sources.extend(entry['source'] for entry in wanted)
+            del timestamps
+            segment.close()
+
+        return cls(*(np.concatenate(column) for column in zip(*parts)),
+                   list(network_index), list(video_index), sources)
+
+
+def load_history(pattern=DEFAULT_SNAPSHOT_PATTERN, cache=DEFAULT_HISTORY_CACHE, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """History from the cache plus any archived or raw snapshots the cache hasn't seen yet (then re-saved)"""
+    _require_numpy()
+    history = ViewerHistory.load(cache) if cache and os.path.exists(cache) else ViewerHistory.empty()
+    loaded = len(history.sources)
+    if archive_dir and os.path.isdir(archive_dir):
+        history = ViewerHistory.from_archive(ScanArchive(archive_dir), history, set(history.sources))
+    seen = set(history.sources)
+    new_paths = [path for path in sorted(glob.glob(pattern)) if os.path.basename(path) not in seen]
+    if new_paths:
+        history = ViewerHistory.from_snapshots(new_paths, history)
+    if cache and len(history.sources) > loaded:
+        history.save(cache)
+    return history
+
+
+def group_reduce(keys, values, how='sum'):
+    """(unique keys, reduced values) for sum, mean, max, min or count, without a Python loop per group"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    if how == 'count':
+        return unique, np.bincount(inverse, minlength=len(unique))
+    if how in ('sum', 'mean'):
+        totals = np.bincount(inverse, weights=values, minlength=len(unique))
+        if how == 'mean':
+            totals = totals / np.bincount(inverse, minlength=len(unique))
+        return unique, totals
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(len(unique)))
+    ufunc = {'max': np.maximum, 'min': np.minimum}[how]
+    return unique, ufunc.reduceat(values[order], starts) if len(order) else values[:0]
+
+
+def group_percentiles(keys, values, quantiles):
+    """(unique keys, array[group, quantile]) using linear interpolation within each group"""
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    positions = starts[:, None] + (counts[:, None] - 1) * np.asarray(quantiles)[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, (starts + counts - 1)[:, None])
+    fraction = positions - lower
+    return unique, values[lower] * (1 - fraction) + values[upper] * fraction
+
+
+def network_sweep_totals(history):
+    """(network ids, timestamps, combined viewers) - one row per network per sweep"""
+    keys = history.network_ids.astype(np.int64) << 40 | history.timestamps
+    unique, totals = group_reduce(keys, history.viewers, 'sum')
+    return (unique >> 40).astype(np.int32), unique & ((1 << 40) - 1), totals
+
+
+def resample(history, bucket_seconds):
+    """(bucket starts, matrix[network, bucket]) of mean combined viewers; 0 where a network wasn't live"""
+    network_ids, timestamps, totals = network_sweep_totals(history)
+    if not len(timestamps):
+        return np.empty(0, np.int64), np.zeros((len(history.networks), 0))
+    first = timestamps.min() // bucket_seconds
+    buckets = timestamps // bucket_seconds - first
+    width = int(buckets.max()) + 1
+    cells = network_ids.astype(np.int64) * width + buckets
+    unique, means = group_reduce(cells, totals, 'mean')
+    matrix = np.zeros((len(history.networks), width))
+    matrix.flat[unique] = means
+    return (first + np.arange(width)) * bucket_seconds, matrix
+
+
+def _local_offsets(timestamps):
+    """UTC offset of each timestamp in local time, looked up once per distinct hour"""
+    hours, inverse = np.unique(timestamps // HOUR, return_inverse=True)
+    offsets = np.array([time.localtime(int(hour) * HOUR).tm_gmtoff for hour in hours], np.int64)
+    return offsets[inverse]
+
+
+def peak_hours(history):
+    """[(network, peak local hour, mean viewers at that hour, mean over all hours)] by mean viewers"""
+    network_ids, timestamps, totals = network_sweep_totals(history)
+    local_hours = (timestamps + _local_offsets(timestamps)) // HOUR % 24
+    cells, means = group_reduce(network_ids.astype(np.int64) * 24 + local_hours, totals, 'mean')
+    table = np.full((len(history.networks), 24), np.nan)
+    table.flat[cells] = means
+    present = ~np.all(np.isnan(table), axis=1)
+    rows = []
+    for network_id in np.flatnonzero(present):
+        hour = int(np.nanargmax(table[network_id]))
+        rows.append((history.networks[network_id], hour, table[network_id, hour], np.nanmean(table[network_id])))
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def growth_rates(history, bucket_seconds=DAY):
+    """[(network, buckets, first mean, last mean, % change per bucket)] from a least-squares trend"""
+    network_ids, timestamps, totals = network_sweep_totals(history)
+    if not len(timestamps):
+        return []
+    buckets = (timestamps - timestamps.min()) // bucket_seconds
+    width = int(buckets.max()) + 1
+    cells, means = group_reduce(network_ids.astype(np.int64) * width + buckets, totals, 'mean')
+    cell_networks, x = cells // width, (cells % width).astype(float)
+
+    # Per-network linear regression of bucket means on bucket index, all networks at once
+    n = np.bincount(cell_networks, minlength=len(history.networks)).astype(float)
+    sx = np.bincount(cell_networks, x, len(history.networks))
+    sy = np.bincount(cell_networks, means, len(history.networks))
+    sxx = np.bincount(cell_networks, x * x, len(history.networks))
+    sxy = np.bincount(cell_networks, x * means, len(history.networks))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        relative = 100 * slope / (sy / n)
+
+    order = np.argsort(cells)
+    first_last = {}
+    for cell, mean in zip(cells[order], means[order]):
+        network_id = int(cell // width)
+        first_last.setdefault(network_id, [mean, mean])[1] = mean
+    rows = []
+    for network_id, (first, last) in first_last.items():
+        if n[network_id] >= 2 and np.isfinite(relative[network_id]):
+            rows.append((history.networks[network_id], int(n[network_id]), first, last, relative[network_id]))
+    return sorted(rows, key=lambda row: row[4], reverse=True)
+
+
+def viewer_percentiles(history, quantiles=(0.5, 0.9, 0.99)):
+    """[(network, sweeps, percentile values...)] of combined viewers per sweep"""
+    network_ids, _, totals = network_sweep_totals(history)
+    if not len(totals):
+        return []
+    unique, values = group_percentiles(network_ids, totals, quantiles)
+    _, counts = group_reduce(network_ids, totals, 'count')
+    rows = [(history.networks[network_id], int(count), *row) for network_id, count, row in zip(unique, counts, values)]
+    return sorted(rows, key=lambda row: row[-1], reverse=True)
+
+
+def correlations(history, bucket_seconds=900, min_buckets=4, limit=20):
+    """[(network a, network b, Pearson r)] of bucketed viewers for every pair that was live in the window"""
+    _, matrix = resample(history, bucket_seconds)
+    active = np.flatnonzero((matrix > 0).sum(axis=1) >= min_buckets)
+    active = active[matrix[active].std(axis=1) > 0]
+    if len(active) < 2:
+        return []
+    r = np.corrcoef(matrix[active])
+    a, b = np.triu_indices(len(active), k=1)
+    order = np.argsort(-np.abs(r[a, b]))[:limit]
+    return [(history.networks[active[a[i]]], history.networks[active[b[i]]], r[a[i], b[i]]) for i in order]
+
+
+def synthetic_history(observations, networks=40, videos_per_network=25, seed=7):
+    """Random history for timing: one sweep every 15 minutes covering every network"""
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    per_sweep = networks * 3
+    sweeps = max(observations // per_sweep, 1)
+    timestamps = np.repeat(int(time.time()) - sweeps * 900 + np.arange(sweeps, dtype=np.int64) * 900, per_sweep)
+    network_ids = np.tile(np.repeat(np.arange(networks, dtype=np.int32), 3), sweeps)
+    video_ids = network_ids * videos_per_network + rng.integers(0, videos_per_network, len(timestamps), dtype=np.int32)
+    daily = 1 + 0.5 * np.sin(2 * np.pi * (timestamps % DAY) / DAY)
+    viewers = (rng.lognormal(8, 1.5, len(timestamps)) * daily).astype(np.int64)
+    return ViewerHistory(timestamps, network_ids, video_ids, viewers,
+                         [f"Network {i}" for i in range(networks)],
+                         [f"video{i:07d}" for i in range(networks * videos_per_network)])
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def print_report(history, report, args):
+    if report == 'peak-hours':
+        print(f"{'Network':<32} {'Peak hour':>9} {'Mean at peak':>14} {'Mean overall':>14}")
+        for network, hour, peak, overall in peak_hours(history)[:args.limit]:
+            print(f"{network[:32]:<32} {hour:>7}:00 {peak:>14,.0f} {overall:>14,.0f}")
+    elif report == 'growth':
+        unit = {'day': DAY, 'week': 7 * DAY}[args.per]
+        print(f"{'Network':<32} {args.per.title() + 's':>6} {'First':>12} {'Last':>12} {'%/' + args.per:>8}")
+        for network, buckets, first, last, rate in growth_rates(history, unit)[:args.limit]:
+            print(f"{network[:32]:<32} {buckets:>6} {first:>12,.0f} {last:>12,.0f} {rate:>+8.1f}")
+    elif report == 'percentiles':
+        quantiles = [float(q) / 100 for q in args.percentiles.split(',')]
+        print(f"{'Network':<32} {'Sweeps':>7} " + ' '.join(f"{'p' + format(q * 100, 'g'):>10}" for q in quantiles))
+        for network, sweeps, *values in viewer_percentiles(history, quantiles)[:args.limit]:
+            print(f"{network[:32]:<32} {sweeps:>7} " + ' '.join(f"{value:>10,.0f}" for value in values))
+    elif report == 'correlation':
+        print(f"{'Network':<32} {'Network':<32} {'r':>6}")
+        for a, b, r in correlations(history, args.bucket_minutes * 60, limit=args.limit):
+            print(f"{a[:32]:<32} {b[:32]:<32} {r:>+6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Viewer Analytics')
+    parser.add_argument('report', choices=['peak-hours', 'growth', 'percentiles', 'correlation', 'summary'],
+                        help='Report to print')
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOT_PATTERN, help='Glob of snapshot files to load')
+    parser.add_argument('--cache', default=DEFAULT_HISTORY_CACHE,
+                        help="Columnar history cache; only snapshots it hasn't seen are parsed ('' to disable)")
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR, help="Also load this scan archive ('' to skip)")
+    parser.add_argument('--since', help='Only observations from this ISO time on')
+    parser.add_argument('--until', help='Only observations before this ISO time')
+    parser.add_argument('--network', action='append', help='Only this network (repeatable)')
+    parser.add_argument('--per', choices=['day', 'week'], default='day', help='Growth rate unit')
+    parser.add_argument('--percentiles', default='50,90,99', help='Comma-separated percentiles')
+    parser.add_argument('--bucket-minutes', type=int, default=15, help='Resampling bucket for correlation')
+    parser.add_argument('--limit', type=int, default=20, help='Rows to show')
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help='Analyse this many random observations instead (for timing)')
+
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ Viewer analytics needs NumPy: pip install numpy")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    if args.synthetic:
+        history = synthetic_history(args.synthetic)
+    else:
+        history = load_history(args.snapshots, args.cache or None, args.archive_dir or None)
+    loaded = time.perf_counter()
+    history = history.select(_parse_time(args.since), _parse_time(args.until), args.network)
+
+    if not len(history):
+        print(f"⚪ No observations (snapshots: {args.snapshots})")
+        return
+
+    if args.report == 'summary':
+        first, last = datetime.fromtimestamp(history.timestamps.min()), datetime.fromtimestamp(history.timestamps.max())
+        print(f"Observations: {len(history):,}")
+        print(f"Sweeps: {len(np.unique(history.timestamps)):,} from {first:%Y-%m-%d %H:%M} to {last:%Y-%m-%d %H:%M}")
+        print(f"Networks: {len(np.unique(history.network_ids))}, videos: {len(np.unique(history.video_ids)):,}")
+        print(f"Peak single stream: {history.viewers.max():,} viewers")
+    else:
+        print_report(history, args.report, args)
+    print(f"\n⏱️ {len(history):,} observations: loaded in {loaded - start:.2f}s, "
+          f"analysed in {time.perf_counter() - loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
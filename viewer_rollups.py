@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Viewer Rollups
+Per-minute, per-hour and per-day viewer aggregates for every live video and network, updated in O(1) per observation
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+DEFAULT_ROLLUPS_FILE = 'viewer_rollups.json'
+
+# Bucket size in seconds and how many buckets of each resolution are kept
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+RETENTION = {'minute': 180, 'hour': 24 * 14, 'day': 400}
+
+# Observations further apart than this don't count as continuous uptime
+DEFAULT_GAP_SECONDS = 1800
+
+
+def bucket_start(at, size):
+    """Start of the local-time bucket containing `at` (days begin at local midnight)"""
+    offset = time.localtime(at).tm_gmtoff
+    return int((at + offset) // size * size - offset)
+
+
+class Rollup:
+    """Running min / max / mean / last viewers and uptime for one video or network in one bucket"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'last', 'first_at', 'last_at', 'uptime')
+
+    def __init__(self, viewers, at):
+        self.count = 1
+        self.total = viewers
+        self.min = viewers
+        self.max = viewers
+        self.last = viewers
+        self.first_at = at
+        self.last_at = at
+        self.uptime = 0
+
+    def observe(self, viewers, at, live_seconds):
+        self.count += 1
+        self.total += viewers
+        if viewers < self.min:
+            self.min = viewers
+        if viewers > self.max:
+            self.max = viewers
+        self.last = viewers
+        self.last_at = at
+        self.uptime += live_seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    def to_list(self):
+        return [self.count, self.total, self.min, self.max, self.last, self.first_at, self.last_at, self.uptime]
+
+    @classmethod
+    def from_list(cls, values):
+        rollup = cls.__new__(cls)
+        (rollup.count, rollup.total, rollup.min, rollup.max, rollup.last,
+         rollup.first_at, rollup.last_at, rollup.uptime) = values
+        return rollup
+
+
+class ViewerRollups:
+    """Rollups keyed by resolution -> bucket start -> (scope, key), scope being 'video' or 'network'
+
+    Buckets arrive in time order, so expiring the oldest bucket is a pop from the front of an
+    insertion-ordered dict. Uptime adds the time since the previous observation of the same
+    video or network when it is within gap_seconds.
+    """
+
+    def __init__(self, path=DEFAULT_ROLLUPS_FILE, gap_seconds=DEFAULT_GAP_SECONDS):
+        self.path = path
+        self.gap_seconds = gap_seconds
+        self.buckets = {resolution: {} for resolution in RESOLUTIONS}
+        self.titles = {}
+        self._last_seen = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def observe(self, scope, key, viewers, at=None):
+        at = int(at if at is not None else time.time())
+        viewers = viewers or 0
+        previous = self._last_seen.get((scope, key))
+        live_seconds = at - previous if previous is not None and 0 < at - previous <= self.gap_seconds else 0
+        self._last_seen[(scope, key)] = at
+
+        for resolution, size in RESOLUTIONS.items():
+            buckets = self.buckets[resolution]
+            start = bucket_start(at, size)
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = {}
+                while len(buckets) > RETENTION[resolution]:
+                    del buckets[next(iter(buckets))]
+            rollup = bucket.get((scope, key))
+            if rollup is None:
+                rollup = bucket[(scope, key)] = Rollup(viewers, at)
+                rollup.uptime = live_seconds
+            else:
+                rollup.observe(viewers, at, live_seconds)
+
+    def observe_sweep(self, live_streams, at=None, network_streams=None):
+        """Record one sweep: every live video, plus each network's combined viewers
+
+        live_streams should list each video once; network_streams (default: live_streams) is
+        every network's own streams, so a video several networks surface counts toward each.
+        """
+        at = int(at if at is not None else time.time())
+        for stream in live_streams:
+            self.observe('video', stream.video_id, stream.viewers, at)
+            self.titles[stream.video_id] = (stream.title, stream.network)
+        networks = {}
+        for stream in live_streams if network_streams is None else network_streams:
+            networks[stream.network] = networks.get(stream.network, 0) + (stream.viewers or 0)
+        for network, viewers in networks.items():
+            self.observe('network', network, viewers, at)
+
+    def bucket(self, resolution, at=None):
+        """{(scope, key): Rollup} for the bucket containing `at` (default: now)"""
+        at = at if at is not None else time.time()
+        return self.buckets[resolution].get(bucket_start(at, RESOLUTIONS[resolution]), {})
+
+    def series(self, scope, key, resolution):
+        """[(bucket start, Rollup)] oldest first"""
+        return [(start, bucket[(scope, key)]) for start, bucket in self.buckets[resolution].items()
+                if (scope, key) in bucket]
+
+    def top(self, scope, resolution, at=None, limit=10):
+        rollups = [(key, rollup) for (rollup_scope, key), rollup in self.bucket(resolution, at).items()
+                   if rollup_scope == scope]
+        return sorted(rollups, key=lambda item: item[1].max, reverse=True)[:limit]
+
+    def save(self):
+        # Titles are only kept for videos that still appear in a retained bucket
+        retained = {key for bucket in self.buckets['day'].values() for scope, key in bucket if scope == 'video'}
+        self.titles = {video_id: title for video_id, title in self.titles.items() if video_id in retained}
+        data = {
+            'buckets': {
+                resolution: [[start, [[scope, key] + rollup.to_list() for (scope, key), rollup in bucket.items()]]
+                             for start, bucket in buckets.items()]
+                for resolution, buckets in self.buckets.items()
+            },
+            'titles': self.titles,
+            'last_seen': [[scope, key, at] for (scope, key), at in self._last_seen.items()
+                          if time.time() - at <= self.gap_seconds],
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for resolution, buckets in data.get('buckets', {}).items():
+            if resolution not in self.buckets:
+                continue
+            self.buckets[resolution] = {
+                start: {(row[0], row[1]): Rollup.from_list(row[2:]) for row in rows}
+                for start, rows in buckets
+            }
+        self.titles = {video_id: tuple(value) for video_id, value in data.get('titles', {}).items()}
+        self._last_seen = {(scope, key): at for scope, key, at in data.get('last_seen', [])}
+
+
+def format_duration(seconds):
+    hours, remainder = divmod(int(seconds), 3600)
+    return f"{hours}h{remainder // 60:02d}m"
+
+
+def print_rollups(rollups, scope, resolution, at=None, limit=10):
+    size = RESOLUTIONS[resolution]
+    start = bucket_start(at if at is not None else time.time(), size)
+    label = datetime.fromtimestamp(start).strftime('%Y-%m-%d' if resolution == 'day' else '%Y-%m-%d %H:%M')
+    print(f"📈 {scope.title()} viewers for {resolution} {label}")
+    entries = rollups.top(scope, resolution, at, limit)
+    if not entries:
+        print("   (no observations)")
+        return
+    for key, rollup in entries:
+        name = key
+        if scope == 'video':
+            title, network = rollups.titles.get(key, ('', ''))
+            name = f"{network}: {title[:50]}" if title else key
+        print(f"   • {name}")
+        print(f"     peak {rollup.max:,}  mean {rollup.mean:,.0f}  min {rollup.min:,}  last {rollup.last:,}  "
+              f"uptime {format_duration(rollup.uptime)}  ({rollup.count} observations)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Viewer Rollups')
+    parser.add_argument('--file', default=DEFAULT_ROLLUPS_FILE, help='Rollups file written by the refresh daemon')
+    parser.add_argument('--resolution', choices=list(RESOLUTIONS), default='day', help='Bucket size to show')
+    parser.add_argument('--scope', choices=['network', 'video'], default='network', help='Networks or videos')
+    parser.add_argument('--ago', type=int, default=0, help='Show the bucket this many buckets back')
+    parser.add_argument('--series', help='Print every retained bucket for one network name or video ID')
+    parser.add_argument('--limit', type=int, default=10, help='Entries to show')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"⚪ No rollups at {args.file} - the refresh daemon writes them after each sweep")
+        return
+    rollups = ViewerRollups(args.file)
+
+    if args.series:
+        for start, rollup in rollups.series(args.scope, args.series, args.resolution):
+            print(f"{datetime.fromtimestamp(start).isoformat(timespec='minutes')}  peak {rollup.max:>9,}  "
+                  f"mean {rollup.mean:>11,.0f}  last {rollup.last:>9,}  uptime {format_duration(rollup.uptime)}")
+        return
+
+    at = time.time() - args.ago * RESOLUTIONS[args.resolution]
+    print_rollups(rollups, args.scope, args.resolution, at, args.limit)
+
+
+if __name__ == "__main__":
+    main()